@@ -0,0 +1,25 @@
+def pytest_addoption(parser):
+    parser.addoption(
+        "--update-baseline",
+        action="store_true",
+        default=False,
+        help="write the measured benchmark results to benchmarks/baseline.json instead of comparing against it",
+    )
+    parser.addoption(
+        "--exponent-tolerance",
+        type=float,
+        default=0.25,
+        help="absolute increase in a fitted scaling exponent that counts as a regression",
+    )
+    parser.addoption(
+        "--time-tolerance",
+        type=float,
+        default=0.5,
+        help="fractional increase in the time at the largest size that counts as a regression",
+    )
+    parser.addoption(
+        "--memory-tolerance",
+        type=float,
+        default=0.25,
+        help="fractional increase in the peak memory of an example reactor that counts as a regression",
+    )
@@ -0,0 +1,28 @@
+import pytest
+
+from .utils import EXAMPLE_REACTORS, load_baseline, measure_example_memory, update_baseline
+
+
+@pytest.mark.parametrize("example", EXAMPLE_REACTORS)
+def test_peak_memory(example, request, tmp_path):
+    """Tracks the peak memory of building each standard example reactor."""
+
+    result = measure_example_memory(example, tmp_path)
+    print(
+        f"{example}: peak {result['peak_rss'] / 2**20:.0f} MiB, reactor B-rep ~{result['estimated_bytes'] / 2**20:.1f} MiB "
+        f"plus {result['retained_shapes']} retained shapes ~{result['retained_estimated_bytes'] / 2**20:.1f} MiB"
+    )
+
+    if request.config.getoption("--update-baseline"):
+        update_baseline("memory", example, result)
+        return
+
+    baseline = load_baseline().get("memory", {}).get(example)
+    if baseline is None:
+        pytest.skip(f"no stored baseline for {example}, run with --update-baseline to record one")
+
+    tolerance = request.config.getoption("--memory-tolerance")
+    assert result["peak_rss"] <= baseline["peak_rss"] * (1 + tolerance), (
+        f"{example} peak memory rose from {baseline['peak_rss'] / 2**20:.0f} MiB to "
+        f"{result['peak_rss'] / 2**20:.0f} MiB (tolerance {tolerance:.0%})"
+    )
@@ -0,0 +1,45 @@
+import pytest
+
+from .utils import (
+    SCALING_CASES,
+    find_scaling_regressions,
+    fit_power_law,
+    load_baseline,
+    time_call,
+    update_baseline,
+)
+
+
+@pytest.mark.parametrize("dimension", list(SCALING_CASES))
+def test_scaling(dimension, request):
+    """Sweeps one model dimension, fits the empirical complexity and compares
+    it with the stored baseline."""
+
+    builder, sizes = SCALING_CASES[dimension]
+    timings = [time_call(builder, size) for size in sizes]
+    exponent, coefficient = fit_power_law(sizes, timings)
+
+    result = {
+        "sizes": sizes,
+        "timings": timings,
+        "exponent": exponent,
+        "coefficient": coefficient,
+        "largest_time": timings[-1],
+    }
+    print(f"{dimension}: time ~ {coefficient:.3g} * n ** {exponent:.2f}, {timings[-1]:.2f}s at n={sizes[-1]}")
+
+    if request.config.getoption("--update-baseline"):
+        update_baseline("scaling", dimension, result)
+        return
+
+    baseline = load_baseline().get("scaling", {}).get(dimension)
+    if baseline is None:
+        pytest.skip(f"no stored baseline for {dimension}, run with --update-baseline to record one")
+
+    regressions = find_scaling_regressions(
+        result,
+        baseline,
+        exponent_tolerance=request.config.getoption("--exponent-tolerance"),
+        time_tolerance=request.config.getoption("--time-tolerance"),
+    )
+    assert not regressions, f"{dimension} scaling regressed: " + "; ".join(regressions)
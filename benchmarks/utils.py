@@ -0,0 +1,244 @@
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+import paramak
+from paramak.cost import CALIBRATION_PATH, calibrate
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+EXAMPLES_PATH = Path(__file__).parent.parent / "examples"
+
+# the standard example reactors tracked by the memory benchmark
+EXAMPLE_REACTORS = [
+    "tokamak_minimal.py",
+    "tokamak_from_plasma_minimal.py",
+    "spherical_tokamak_minimal.py",
+    "spherical_tokamak_from_plasma_minimal.py",
+]
+
+# runs an example in a fresh interpreter and reports its peak resident set
+# size along with the memory paramak estimates the returned reactor holds
+_MEASURE_EXAMPLE = """
+import json, resource, runpy, sys
+reactor = runpy.run_path(sys.argv[1], run_name="__main__")["my_reactor"]
+report = reactor.memory_report()
+print(json.dumps({
+    "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    "estimated_bytes": sum(part["estimated_bytes"] for part in report.values()),
+    "retained_estimated_bytes": sum(part["retained_estimated_bytes"] for part in report.values()),
+    "retained_shapes": sum(part["retained_shapes"] for part in report.values()),
+    "parts": len(report),
+}))
+"""
+
+
+def time_call(function, *args, repeats=1, **kwargs):
+    """Returns the fastest wall time (s) of ``repeats`` calls to function."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def fit_power_law(sizes, timings):
+    """Fits timings = coefficient * sizes ** exponent with a least squares
+    fit in log-log space.
+
+    Returns:
+        (float, float): the exponent and the coefficient of the fit.
+    """
+    exponent, log_coefficient = np.polyfit(np.log(sizes), np.log(timings), 1)
+    return float(exponent), float(np.exp(log_coefficient))
+
+
+def tokamak_with_layers(number_of_layers):
+    """A tokamak with one center column layer and number_of_layers blanket
+    layers surrounding the plasma."""
+    solids = [(paramak.LayerType.SOLID, 10)] * number_of_layers
+    return paramak.tokamak(
+        radial_build=[
+            (paramak.LayerType.GAP, 10),
+            (paramak.LayerType.SOLID, 30),
+            *solids,
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.PLASMA, 300),
+            (paramak.LayerType.GAP, 50),
+            *solids,
+        ],
+        vertical_build=[
+            *solids,
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.PLASMA, 700),
+            (paramak.LayerType.GAP, 50),
+            *solids,
+        ],
+        rotation_angle=90,
+    )
+
+
+def tokamak_with_rotation_angle(rotation_angle):
+    """The two blanket layer tokamak of tokamak_with_layers revolved by
+    rotation_angle degrees."""
+    solids = [(paramak.LayerType.SOLID, 10)] * 2
+    return paramak.tokamak(
+        radial_build=[
+            (paramak.LayerType.GAP, 10),
+            (paramak.LayerType.SOLID, 30),
+            *solids,
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.PLASMA, 300),
+            (paramak.LayerType.GAP, 50),
+            *solids,
+        ],
+        vertical_build=[
+            *solids,
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.PLASMA, 700),
+            (paramak.LayerType.GAP, 50),
+            *solids,
+        ],
+        rotation_angle=rotation_angle,
+    )
+
+
+def toroidal_field_coils(number_of_coils):
+    """Rectangular toroidal field coils equally spaced around 360 degrees,
+    this exercises the serial unions in paramak.utils.rotate_solid."""
+    angles = np.linspace(0, 360, number_of_coils, endpoint=False)
+    return paramak.toroidal_field_coil_rectangle(
+        horizontal_start_point=(10, 520),
+        vertical_mid_point=(860, 0),
+        thickness=50,
+        distance=40,
+        azimuthal_placement_angles=angles.tolist(),
+        rotation_angle=360,
+    )
+
+
+def tokamak_with_cutters(number_of_cutters, rotation_angle=90):
+    """A small tokamak revolved by rotation_angle degrees and cut by
+    number_of_cutters port shaped boxes spread over the angle, this
+    exercises the layer by cutter loop in the assemblies."""
+    angles = np.linspace(5, rotation_angle - 5, number_of_cutters)
+    cutters = [
+        paramak.poloidal_field_coil(height=60, width=60, center_point=(640, 0), rotation_angle=4).rotate(
+            (0, 0, 0), (0, 0, 1), angle
+        )
+        for angle in angles
+    ]
+    return paramak.tokamak(
+        radial_build=[
+            (paramak.LayerType.GAP, 10),
+            (paramak.LayerType.SOLID, 30),
+            (paramak.LayerType.SOLID, 20),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.PLASMA, 300),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.SOLID, 20),
+        ],
+        vertical_build=[
+            (paramak.LayerType.SOLID, 20),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.PLASMA, 700),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.SOLID, 20),
+        ],
+        rotation_angle=rotation_angle,
+        extra_cut_shapes=cutters,
+    )
+
+
+def tokamak_with_cutters_revolved(rotation_angle):
+    """The tokamak of tokamak_with_cutters with eight cutters, revolved by
+    rotation_angle degrees, so that the angle changes the cut layers."""
+    return tokamak_with_cutters(8, rotation_angle)
+
+
+# each dimension is swept independently of the others
+SCALING_CASES = {
+    "layers": (tokamak_with_layers, [1, 2, 4, 8]),
+    "tf_coils": (toroidal_field_coils, [2, 4, 8, 16]),
+    "cutters": (tokamak_with_cutters, [1, 2, 4, 8]),
+    "rotation_angle": (tokamak_with_rotation_angle, [45, 90, 180, 360]),
+    "cutters_rotation_angle": (tokamak_with_cutters_revolved, [90, 180, 360]),
+}
+
+
+def measure_example_memory(example, working_directory):
+    """Builds an example reactor in a subprocess so that its peak memory is
+    not mixed up with that of the test session.
+
+    Args:
+        example: the filename of the example script.
+        working_directory: where any files written by the example are saved.
+
+    Returns:
+        dict: the "peak_rss" in bytes and the totals of the reactor's
+        Assembly.memory_report().
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", _MEASURE_EXAMPLE, str(EXAMPLES_PATH / example)],
+        cwd=working_directory,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def load_baseline():
+    if not BASELINE_PATH.exists():
+        return {}
+    with open(BASELINE_PATH) as file:
+        return json.load(file)
+
+
+def update_baseline(section, key, value):
+    """Replaces one entry of the stored baseline file and refits the build
+    cost model shipped with paramak to the new baseline."""
+    baseline = load_baseline()
+    baseline.setdefault(section, {})[key] = value
+    with open(BASELINE_PATH, "w") as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+        file.write("\n")
+    try:
+        calibration = calibrate(baseline)
+    except KeyError:
+        # the baseline does not hold every benchmark yet
+        return
+    with open(CALIBRATION_PATH, "w") as file:
+        json.dump(calibration, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def find_scaling_regressions(result, baseline, exponent_tolerance, time_tolerance):
+    """Compares a scaling result with its stored baseline.
+
+    Args:
+        result: dictionary with the "exponent" of the fit and the "largest_time".
+        baseline: the stored dictionary for the same dimension.
+        exponent_tolerance: absolute increase allowed in the fitted exponent.
+        time_tolerance: fractional increase allowed in the time taken at the
+            largest size.
+
+    Returns:
+        list: a message for each regression found, empty if there are none.
+    """
+    regressions = []
+    if result["exponent"] > baseline["exponent"] + exponent_tolerance:
+        regressions.append(
+            f"fitted exponent rose from {baseline['exponent']:.2f} to {result['exponent']:.2f} "
+            f"(tolerance {exponent_tolerance})"
+        )
+    if result["largest_time"] > baseline["largest_time"] * (1 + time_tolerance):
+        regressions.append(
+            f"time at the largest size rose from {baseline['largest_time']:.2f}s to "
+            f"{result['largest_time']:.2f}s (tolerance {time_tolerance:.0%})"
+        )
+    return regressions
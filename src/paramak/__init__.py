@@ -1,7 +1,11 @@
 from importlib.metadata import version
 
-from .assemblies.spherical_tokamak import spherical_tokamak, spherical_tokamak_from_plasma
-from .assemblies.tokamak import tokamak, tokamak_from_plasma
+from .assemblies.spherical_tokamak import (
+    iter_spherical_tokamak_parts,
+    spherical_tokamak,
+    spherical_tokamak_from_plasma,
+)
+from .assemblies.tokamak import iter_tokamak_parts, tokamak, tokamak_from_plasma
 
 from .workplanes.blanket_constant_thickness_arc_h import blanket_constant_thickness_arc_h
 from .workplanes.blanket_from_plasma import blanket_from_plasma
@@ -17,29 +21,51 @@ from .workplanes.toroidal_field_coil_rectangle import toroidal_field_coil_rectan
 from .workplanes.u_shaped_dome import u_shaped_dome
 from .workplanes.toroidal_field_coil_princeton_d import toroidal_field_coil_princeton_d
 
-from .utils import LayerType
+from .aio import aspherical_tokamak, aspherical_tokamak_from_plasma, atokamak, atokamak_from_plasma
+from .cost import estimate_cost
+from .feasibility import check_feasibility
+from .isolation import BuildTimeoutError
+from .profiling import BuildReport, record_build, trace_build
+from .sweep import sweep
+from .specs import ReactorSpec
+from .utils import LayerType, RadialBuild
 
 __version__ = version("paramak")
 
 
 __all__ = [
     "__version__",
+    "aspherical_tokamak",
+    "aspherical_tokamak_from_plasma",
+    "atokamak",
+    "atokamak_from_plasma",
     "blanket_constant_thickness_arc_h",
     "blanket_from_plasma",
+    "BuildReport",
+    "BuildTimeoutError",
     "center_column_shield_cylinder",
+    "check_feasibility",
     "constant_thickness_dome",
     "cutting_wedge",
     "dished_vacuum_vessel",
+    "estimate_cost",
+    "iter_spherical_tokamak_parts",
+    "iter_tokamak_parts",
     "LayerType",
     "plasma_simplified",
     "poloidal_field_coil",
     "poloidal_field_coil_case",
+    "RadialBuild",
+    "ReactorSpec",
+    "record_build",
     "revolved_shape",
     "spherical_tokamak",
     "spherical_tokamak_from_plasma",
+    "sweep",
     "tokamak",
     "tokamak_from_plasma",
     "toroidal_field_coil_princeton_d",
     "toroidal_field_coil_rectangle",
+    "trace_build",
     "u_shaped_dome",
 ]
@@ -0,0 +1,92 @@
+# Async counterparts of the reactor builders for asyncio applications. The
+# builds run in a pool of worker processes so the event loop stays
+# responsive, and many designs can be built at once with asyncio.gather.
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+
+from .assemblies.assembly import Assembly
+from .isolation import run_isolated
+from .profiling import worker_function, worker_result
+from .specs import BUILDERS, builder_name
+
+_executor = None
+_manager = None
+
+
+def default_executor() -> ProcessPoolExecutor:
+    """Returns the pool of worker processes shared by the async builders,
+    with one worker per CPU, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor()
+    return _executor
+
+
+def _cancel_event():
+    # the events are shared with the worker processes through a manager
+    # process, started on first use
+    global _manager
+    if _manager is None:
+        _manager = multiprocessing.Manager()
+    return _manager.Event()
+
+
+async def abuild(builder, timeout: float = None, executor: Executor = None, **kwargs) -> Assembly:
+    """Builds a reactor in a worker process without blocking the event loop.
+
+    The worker builds the reactor in a process of its own, see
+    paramak.isolation.run_isolated, which is killed when the task is
+    cancelled or the timeout is reached so that the worker is free for the
+    next build. Cancelling a build that is still waiting for a worker
+    removes it from the queue.
+
+    Args:
+        builder: a reactor builder, for example paramak.tokamak, or its name.
+        timeout: seconds after which the build is stopped, raising a
+            paramak.BuildTimeoutError, which is also an asyncio.TimeoutError.
+            Time spent waiting for a worker is not counted. Defaults to None
+            which waits for as long as the build takes.
+        executor: the executor to build in. Defaults to None which uses the
+            process pool shared by the async builders.
+        kwargs: the builder arguments.
+
+    Returns:
+        Assembly: the reactor.
+    """
+    function = BUILDERS[builder_name(builder)]
+    cancel = _cancel_event()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        executor or default_executor(), partial(worker_function(run_isolated), function, kwargs, timeout, cancel)
+    )
+    try:
+        return worker_result(await future)
+    except asyncio.CancelledError:
+        cancel.set()
+        raise
+
+
+async def atokamak(timeout: float = None, executor: Executor = None, **kwargs) -> Assembly:
+    """Builds paramak.tokamak in a worker process, see paramak.aio.abuild."""
+    return await abuild("tokamak", timeout, executor, **kwargs)
+
+
+async def atokamak_from_plasma(timeout: float = None, executor: Executor = None, **kwargs) -> Assembly:
+    """Builds paramak.tokamak_from_plasma in a worker process, see
+    paramak.aio.abuild."""
+    return await abuild("tokamak_from_plasma", timeout, executor, **kwargs)
+
+
+async def aspherical_tokamak(timeout: float = None, executor: Executor = None, **kwargs) -> Assembly:
+    """Builds paramak.spherical_tokamak in a worker process, see
+    paramak.aio.abuild."""
+    return await abuild("spherical_tokamak", timeout, executor, **kwargs)
+
+
+async def aspherical_tokamak_from_plasma(timeout: float = None, executor: Executor = None, **kwargs) -> Assembly:
+    """Builds paramak.spherical_tokamak_from_plasma in a worker process, see
+    paramak.aio.abuild."""
+    return await abuild("spherical_tokamak_from_plasma", timeout, executor, **kwargs)
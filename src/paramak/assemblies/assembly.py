@@ -1,8 +1,176 @@
 # Creates an assembly class that inherits from cadquery's assembly class
 # and adds a few convenience methods remove() and names()
+#
+# Methods returning a modified assembly (edit, remove, rename, split_solids)
+# share the nodes of unchanged parts with the original assembly instead of
+# copying them, so chained edits cost time proportional to the parts they
+# touch. Shared nodes are read only, changes go through edit.
 
+import json
 import warnings
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
 import cadquery as cq
+import numpy as np
+from cadquery.utils import BiDict
+
+from ..export import PART_FORMATS, content_hash, export_part, file_hash, source_hash
+from ..memory import brep_statistics, retained_objects
+from ..mesh import tessellate_shape, write_mesh
+from ..profiling import stage, worker_function, worker_result
+from ..serialization import (
+    attribute_from_json,
+    attribute_to_json,
+    color_from_tuple,
+    color_to_tuple,
+    location_from_list,
+    location_to_list,
+    part_from_state,
+    part_to_state,
+    plane_from_dict,
+    plane_to_dict,
+    read_container,
+    shape_from_bytes,
+    shape_to_bytes,
+    subshapes_from_state,
+    subshapes_to_state,
+    write_container,
+)
+
+
+def _part_shape(obj):
+    """Returns the final shape of an assembly part without its Workplane
+    history, a compound if the Workplane holds several shapes."""
+    if isinstance(obj, cq.Shape):
+        return obj
+    shapes = [item for item in obj.vals() if isinstance(item, cq.Shape)]
+    if len(shapes) == 1:
+        return shapes[0]
+    return cq.Compound.makeCompound(shapes)
+
+
+def _shape_properties(shape, name: str = None) -> dict:
+    """Computes the geometric properties of a part that are cached by the
+    assembly and stored in saved assembly files."""
+    with stage("properties", name):
+        bounding_box = shape.BoundingBox()
+        return {
+            "volume": shape.Volume(),
+            "bounding_box": [
+                bounding_box.xmin,
+                bounding_box.ymin,
+                bounding_box.zmin,
+                bounding_box.xmax,
+                bounding_box.ymax,
+                bounding_box.zmax,
+            ],
+            "center_of_mass": list(cq.Shape.centerOfMass(shape).toTuple()),
+            "faces": len(shape.Faces()),
+        }
+
+
+def _tessellate_part(name: str, shape, tolerance: float, angular_tolerance: float):
+    with stage("tessellate", name, tolerance=tolerance, angular_tolerance=angular_tolerance):
+        return tessellate_shape(shape, tolerance, angular_tolerance)
+
+
+def _iter_part_nodes(node):
+    """Yields the nodes holding an object in the same order as iterating over
+    the assembly, without loading the objects of lazily loaded parts."""
+    if node._holds_object():
+        yield node
+    for child in node.children:
+        yield from _iter_part_nodes(child)
+
+
+def _iter_part_paths(node, path: str = None, loc: cq.Location = None):
+    """Yields the (path, node, location) of the nodes holding an object in the
+    same order as _iter_part_nodes. The path is the key of the node in the
+    objects index of the assembly the walk starts from and the location is
+    that of the node combined with those of the sub assemblies holding it."""
+    loc = node.loc if loc is None else loc * node.loc
+    if node._holds_object():
+        yield node.name if path is None else path, node, loc
+    for child in node.children:
+        yield from _iter_part_paths(child, child.name if path is None else f"{path}/{child.name}", loc)
+
+
+def _same_location(first: cq.Location, second: cq.Location) -> bool:
+    return first is second or first.toTuple() == second.toTuple()
+
+
+def _adopt(node, children):
+    """Adds child nodes to a node without copying them. New nodes are
+    parented to it, nodes shared with another assembly keep their parent."""
+    for child in children:
+        if child.parent is None:
+            child.parent = node
+        node.children.append(child)
+        node.objects.update(child._flatten())
+
+
+def _compacted(node):
+    """Returns a copy of a node and its children where each object is
+    replaced by its final shape."""
+    copy = node._bare_copy()
+    if node.obj is not None:
+        copy.obj = _part_shape(node.obj)
+    _adopt(copy, [_compacted(child) for child in node.children])
+    return copy
+
+
+def _node_to_state(node) -> dict:
+    """Encodes an assembly node and its children without any Workplane history."""
+    obj = node.obj
+    subshapes = None
+    if obj is not None and (node._subshape_names or node._subshape_colors or node._subshape_layers):
+        colors = {subshape: color_to_tuple(color) for subshape, color in node._subshape_colors.items()}
+        subshapes = {
+            "names": subshapes_to_state(obj, node._subshape_names),
+            "colors": subshapes_to_state(obj, colors),
+            "layers": subshapes_to_state(obj, node._subshape_layers),
+        }
+    return {
+        "name": node.name,
+        "obj": None if obj is None else part_to_state(obj),
+        "color": color_to_tuple(node.color),
+        "material": node.material,
+        "loc": node.loc,
+        "metadata": node.metadata,
+        "subshapes": subshapes,
+        "children": [_node_to_state(child) for child in node.children],
+    }
+
+
+def _node_from_state(cls, state):
+    node = cls(
+        None if state["obj"] is None else part_from_state(state["obj"]),
+        loc=state["loc"],
+        name=state["name"],
+        color=color_from_tuple(state["color"]),
+        material=state["material"],
+        metadata=state["metadata"],
+    )
+    subshapes = state["subshapes"]
+    if subshapes is not None:
+        node._subshape_names.update(subshapes_from_state(node.obj, subshapes["names"]))
+        colors = subshapes_from_state(node.obj, subshapes["colors"])
+        node._subshape_colors.update({subshape: color_from_tuple(rgba) for subshape, rgba in colors.items()})
+        node._subshape_layers.update(subshapes_from_state(node.obj, subshapes["layers"]))
+    for child_state in state["children"]:
+        node.add(_node_from_state(cls, child_state))
+    return node
+
+
+def _assembly_from_state(cls, state, metadata):
+    """Rebuilds an Assembly pickled by Assembly.__reduce__."""
+    assembly = _node_from_state(cls, state)
+    for attribute, value in metadata.items():
+        setattr(assembly, attribute, value)
+    return assembly
 
 
 class Assembly(cq.Assembly):
@@ -12,32 +180,723 @@ class Assembly(cq.Assembly):
     triangularity = None
     major_radius = None
     minor_radius = None
+    # a paramak.profiling.BuildReport when the assembly was built with profile=True
+    build_report = None
+    # the recipe_keys, or a function returning them
+    _recipe_keys = None
+
+    _metadata_attributes = (
+        "elongation",
+        "triangularity",
+        "major_radius",
+        "minor_radius",
+        "build_report",
+        "recipe_keys",
+    )
+
+    @property
+    def recipe_keys(self) -> dict:
+        """Maps part names to a key of the inputs each part was built from,
+        set by the reactor builders so that a later build can reuse
+        unchanged parts. The keys hash the B-rep of the extra shapes, so the
+        builders set a function that is only called when the keys are first
+        read. Edited assemblies do not keep them as their parts may no
+        longer be the parts the keys were made for."""
+        if callable(self._recipe_keys):
+            self._recipe_keys = self._recipe_keys()
+        return self._recipe_keys
+
+    @recipe_keys.setter
+    def recipe_keys(self, value):
+        self._recipe_keys = value
 
     def _copy_metadata(self, target):
         """Copies tokamak geometry metadata to another Assembly instance."""
-        target.elongation = self.elongation
-        target.triangularity = self.triangularity
-        target.major_radius = self.major_radius
-        target.minor_radius = self.minor_radius
+        for attribute in self._metadata_attributes:
+            if attribute == "recipe_keys":
+                # copied without making keys that may never be read
+                target._recipe_keys = self._recipe_keys
+            else:
+                setattr(target, attribute, getattr(self, attribute))
 
-    def remove(self, name: str):
-        new_assembly = Assembly()
-        part_found = False
-        for part in self:
-            if part[1].endswith(f'/{name}'):
-                part_found = True
+    def __reduce__(self):
+        """Pickles the assembly as the binary B-rep of each part's final shape
+        along with its name, color, material, location, metadata, subshape
+        names, colors and layers, and the tokamak metadata. The Workplane
+        construction history is not kept, which makes sending assemblies
+        between processes fast. Constraints are not kept either, they are
+        only used by solve() whose result is kept in each part's location."""
+        metadata = {attribute: getattr(self, attribute) for attribute in self._metadata_attributes}
+        return (_assembly_from_state, (self.__class__, _node_to_state(self), metadata))
+
+    # (obj, loc, properties) cached by _part_properties for the object and
+    # location they describe
+    _properties_cache = None
+
+    def _holds_object(self) -> bool:
+        return self.obj is not None
+
+    def _has_current_properties(self, loc: cq.Location = None) -> bool:
+        cache = self._properties_cache
+        return cache is not None and cache[0] is self.obj and _same_location(cache[1], loc or self.loc)
+
+    def _part_properties(self, loc: cq.Location = None) -> dict:
+        """Returns the cached geometric properties of this node's own object
+        placed at loc, by default its own location, recomputing them if the
+        object or the location has changed. Nodes shared by sub assemblies
+        placed at different locations are recomputed for each location."""
+        loc = loc or self.loc
+        if not self._has_current_properties(loc):
+            properties = _shape_properties(_part_shape(self.obj).moved(loc), self.name)
+            self._properties_cache = (self.obj, loc, properties)
+        return self._properties_cache[2]
+
+    def _location(self, path: str) -> cq.Location:
+        """Returns the location of the node at path combined with those of
+        the sub assemblies holding it and of this assembly."""
+        node = self.objects[path]
+        loc = self.loc
+        if node is not self:
+            for holder in self._ancestors(path) + [node]:
+                loc = loc * holder.loc
+        return loc
+
+    def part_properties(self, name: str) -> dict:
+        """Returns the volume, bounding box (xmin, ymin, zmin, xmax, ymax,
+        zmax), center of mass and face count of a part. The values are
+        computed once and cached, for assemblies loaded from a .paramak file
+        they are read from the file without loading the part's B-rep.
+
+        Args:
+            name: the name of the part, the path of parts nested in sub
+                assemblies, for example "magnets/tf_coil".
+        """
+        node = self.objects.get(name)
+        if node is None or not node._holds_object():
+            raise KeyError(f"Part with name {name} not found")
+        return node._part_properties(self._location(name))
+
+    def properties(self, format: str = "columns", workers: int = None):
+        """Returns the volume, bounding box, center of mass and face count of
+        every part as a table.
+
+        The properties are those of each part placed at its location within
+        any sub assemblies holding it. They are computed once and cached on
+        the part until its object or location is replaced, so repeated calls,
+        and assemblies made from this one by edit(), only compute the
+        properties of new parts.
+
+        Args:
+            format: "columns" for a dictionary of columns or "structured" for
+                a NumPy structured array with one row per part.
+            workers: the number of processes used to compute the properties
+                of parts that are not cached yet. Defaults to None which
+                computes them in this process.
+
+        Returns:
+            dict or numpy.ndarray: the "name", "volume", "bounding_box" (xmin,
+            ymin, zmin, xmax, ymax, zmax), "center_of_mass" and "faces" of
+            each part, in the order of names(). Parts nested in sub
+            assemblies are named by their path, for example "magnets/tf_coil".
+        """
+        if format not in ("columns", "structured"):
+            raise ValueError(f'format should be either "columns" or "structured", not {format}')
+
+        parts = list(_iter_part_paths(self))
+        pending = [(node, loc) for _, node, loc in parts if not node._has_current_properties(loc)]
+        if workers is not None and workers > 1 and len(pending) > 1:
+            shapes = [_part_shape(node.obj).moved(loc) for node, loc in pending]
+            names = [node.name for node, _ in pending]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(worker_function(_shape_properties), shapes, names)
+                for (node, loc), properties in zip(pending, results):
+                    node._properties_cache = (node.obj, loc, worker_result(properties))
+
+        names = [path for path, _, _ in parts]
+        rows = [node._part_properties(loc) for _, node, loc in parts]
+        columns = {
+            "name": names,
+            "volume": np.array([row["volume"] for row in rows], dtype=float),
+            "bounding_box": np.array([row["bounding_box"] for row in rows], dtype=float).reshape(-1, 6),
+            "center_of_mass": np.array([row["center_of_mass"] for row in rows], dtype=float).reshape(-1, 3),
+            "faces": np.array([row["faces"] for row in rows], dtype=int),
+        }
+        if format == "columns":
+            return columns
+
+        table = np.zeros(
+            len(rows),
+            dtype=[
+                ("name", f"U{max([len(name) for name in names], default=1)}"),
+                ("volume", float),
+                ("bounding_box", float, (6,)),
+                ("center_of_mass", float, (3,)),
+                ("faces", int),
+            ],
+        )
+        for key, column in columns.items():
+            table[key] = column
+        return table
+
+    # (obj, loc, vertices, triangles) cached by tessellate for each
+    # (tolerance, angular_tolerance)
+    _mesh_cache = None
+
+    def _cached_mesh(self, key, loc: cq.Location = None):
+        entry = (self._mesh_cache or {}).get(key)
+        if entry is None or entry[0] is not self.obj or not _same_location(entry[1], loc or self.loc):
+            return None
+        return entry[2:]
+
+    def tessellate(self, tolerance: float = 0.1, angular_tolerance: float = 0.1, workers: int = None) -> dict:
+        """Triangulates every part of the assembly.
+
+        Each part is placed at its location within any sub assemblies
+        holding it. The mesh of each part is cached for each pair of
+        tolerances until the part's object or location is replaced, so
+        exporting the same assembly to several mesh formats only
+        triangulates it once.
+
+        Args:
+            tolerance: the maximum linear deflection of the mesh from the surface.
+            angular_tolerance: the maximum angular deflection in radians.
+            workers: the number of processes used to triangulate parts that are
+                not cached yet. Defaults to None which triangulates them in this
+                process.
+
+        Returns:
+            dict: maps each part name to its (n, 3) float vertex coordinates and
+            (m, 3) integer triangle vertex indices, in the order of names().
+            Parts nested in sub assemblies are named by their path, for
+            example "magnets/tf_coil".
+        """
+        key = (tolerance, angular_tolerance)
+        parts = list(_iter_part_paths(self))
+        pending = [(node, loc) for _, node, loc in parts if node._cached_mesh(key, loc) is None]
+        names = [node.name for node, _ in pending]
+        shapes = [_part_shape(node.obj).moved(loc) for node, loc in pending]
+        if workers is not None and workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                meshes = [
+                    worker_result(mesh)
+                    for mesh in executor.map(
+                        worker_function(_tessellate_part), names, shapes, repeat(tolerance), repeat(angular_tolerance)
+                    )
+                ]
+        else:
+            meshes = [_tessellate_part(*arguments, tolerance, angular_tolerance) for arguments in zip(names, shapes)]
+
+        for (node, loc), (vertices, triangles) in zip(pending, meshes):
+            if node._mesh_cache is None:
+                node._mesh_cache = {}
+            node._mesh_cache[key] = (node.obj, loc, vertices, triangles)
+
+        return {path: node._cached_mesh(key, loc) for path, node, loc in parts}
+
+    def export_mesh(
+        self,
+        filename: str,
+        tolerance: float = 0.1,
+        angular_tolerance: float = 0.1,
+        workers: int = None,
+        format: str = None,
+    ):
+        """Writes the triangulated parts to a single STL, OBJ or VTK file,
+        reusing any cached tessellation (see tessellate).
+
+        Args:
+            filename: the file to write.
+            tolerance: the maximum linear deflection of the mesh from the surface.
+            angular_tolerance: the maximum angular deflection in radians.
+            workers: the number of processes used to triangulate parts that are
+                not cached yet.
+            format: "stl", "obj" or "vtk", inferred from the filename extension
+                if not given.
+        """
+        write_mesh(filename, self.tessellate(tolerance, angular_tolerance, workers), format)
+        return self
+
+    def export_parts(
+        self,
+        directory,
+        formats=("step", "brep", "stl"),
+        workers: int = None,
+        tolerance: float = 0.1,
+        angular_tolerance: float = 0.1,
+    ) -> dict:
+        """Writes each part to its own <name>.<format> file in directory along
+        with a manifest.json listing the name, color, volume, content hash and
+        files of every part.
+
+        Parts whose content hash matches the manifest of a previous export,
+        and whose files are unchanged on disk, are not written again, so
+        repeated exports of similar reactors only write the parts that
+        changed.
+
+        Args:
+            directory: the directory to write to, created if needed.
+            formats: any of "step", "brep" and "stl".
+            workers: the number of processes used to write the parts.
+                Defaults to None which writes them in this process.
+            tolerance: the linear deflection used for STL files.
+            angular_tolerance: the angular deflection used for STL files.
+
+        Returns:
+            dict: the manifest.
+        """
+        formats = tuple(formats)
+        for format in formats:
+            if format not in PART_FORMATS:
+                raise ValueError(f"format should be one of {PART_FORMATS}, not {format}")
+
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        manifest_path = directory / "manifest.json"
+        previous = {}
+        if manifest_path.exists():
+            with open(manifest_path) as file:
+                previous = {part["name"]: part for part in json.load(file)["parts"]}
+
+        parts = []
+        jobs = []
+        for node in _iter_part_nodes(self):
+            name = node.name.split('/')[-1]
+            shape = _part_shape(node.obj).moved(node.loc)
+            part = {
+                "name": name,
+                "color": color_to_tuple(node.color),
+                "volume": node._part_properties()["volume"],
+                "content_hash": content_hash(shape),
+                "files": {},
+            }
+            stem = directory / name.replace("/", "_")
+            previous_files = previous.get(name, {}).get("files", {})
+            stale = []
+            for format in formats:
+                entry = {
+                    "filename": f"{stem.name}.{format}",
+                    "source_hash": source_hash(part["content_hash"], format, tolerance, angular_tolerance),
+                }
+                previous_entry = previous_files.get(format)
+                filename = directory / entry["filename"]
+                if (
+                    previous_entry is not None
+                    and previous_entry["source_hash"] == entry["source_hash"]
+                    and filename.exists()
+                    and file_hash(filename) == previous_entry["sha256"]
+                ):
+                    entry["sha256"] = previous_entry["sha256"]
+                else:
+                    stale.append(format)
+                part["files"][format] = entry
+            parts.append(part)
+            if stale:
+                mesh = node._cached_mesh((tolerance, angular_tolerance))
+                jobs.append((part, (shape, stem, stale, tolerance, angular_tolerance, mesh)))
+
+        if workers is not None and workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = [executor.submit(worker_function(export_part), *arguments) for _, arguments in jobs]
+                results = [worker_result(result.result()) for result in results]
+        else:
+            results = [export_part(*arguments) for _, arguments in jobs]
+
+        for (part, _), hashes in zip(jobs, results):
+            for format, digest in hashes.items():
+                part["files"][format]["sha256"] = digest
+
+        manifest = {
+            "formats": list(formats),
+            "tolerance": tolerance,
+            "angular_tolerance": angular_tolerance,
+            "parts": parts,
+        }
+        with open(manifest_path, "w") as file:
+            json.dump(manifest, file, indent=2)
+        return manifest
+
+    def save(self, path: str, exportType: str = None, **kwargs):
+        """Saves the assembly to a file.
+
+        Files ending in .paramak (or exportType="PARAMAK") are written as a
+        single file container holding an index of the parts, with their
+        names, colors, locations, bounding boxes and volumes, followed by the
+        binary B-rep of each part. These files keep the tokamak metadata and
+        can be reopened quickly with Assembly.load. Any other format is
+        exported by cadquery.
+
+        Args:
+            path: the filename to write.
+            exportType: the export format, inferred from the filename if not
+                provided.
+            kwargs: passed to cadquery for other export formats.
+        """
+        if exportType is None and str(path).lower().endswith(".paramak"):
+            exportType = "PARAMAK"
+        if exportType != "PARAMAK":
+            return self.export(str(path), exportType, **kwargs)
+
+        entries = []
+        blobs = []
+        offset = 0
+
+        def add_entry(node, parent_index, loc):
+            nonlocal offset
+            entry = {
+                "name": node.name,
+                "parent": parent_index,
+                "location": location_to_list(node.loc),
+                "color": color_to_tuple(node.color),
+                "metadata": node.metadata,
+                "part": None,
+            }
+            if node._holds_object():
+                obj = node.obj
+                shapes = (
+                    [obj] if isinstance(obj, cq.Shape) else [val for val in obj.vals() if isinstance(val, cq.Shape)]
+                )
+                part = {
+                    "kind": "shape" if isinstance(obj, cq.Shape) else "workplane",
+                    "blobs": [],
+                    "properties": node._part_properties(loc),
+                }
+                if isinstance(obj, cq.Workplane):
+                    part["plane"] = plane_to_dict(obj.plane)
+                    part["attributes"] = {
+                        key: attribute_to_json(getattr(obj, key)) for key in ("name", "color") if hasattr(obj, key)
+                    }
+                for shape in shapes:
+                    blob = shape_to_bytes(shape)
+                    part["blobs"].append([offset, len(blob)])
+                    blobs.append(blob)
+                    offset += len(blob)
+                entry["part"] = part
+            index = len(entries)
+            entries.append(entry)
+            for child in node.children:
+                add_entry(child, index, loc * child.loc)
+
+        add_entry(self, None, self.loc)
+        index = {
+            "metadata": {
+                attribute: getattr(self, attribute)
+                for attribute in self._metadata_attributes
+                if attribute != "build_report"
+            },
+            "nodes": entries,
+        }
+        write_container(path, index, blobs)
+        return self
+
+    @classmethod
+    def load(cls, path: str, importType: str = None, **kwargs):
+        """Loads an assembly from a file.
+
+        Files ending in .paramak (or importType="PARAMAK") are memory mapped
+        and only the index is read, each part's B-rep is decoded when the part
+        is first accessed. Names, metadata and part_properties are available
+        without decoding any B-rep. The file is closed once every part has
+        been decoded, for example by materialize(). Other formats are
+        imported by cadquery.
+
+        Args:
+            path: the filename to read.
+            importType: the import format, inferred from the filename if not
+                provided.
+            kwargs: passed to cadquery for other import formats.
+        """
+        if importType is None and str(path).lower().endswith(".paramak"):
+            importType = "PARAMAK"
+        if importType != "PARAMAK":
+            return super().load(str(path), importType, **kwargs)
+
+        index, blobs = read_container(path)
+        container = _PartBlobs(blobs, sum(entry["part"] is not None for entry in index["nodes"]))
+        nodes = []
+        # the location of each node combined with those holding it, which
+        # the saved part properties were computed at
+        locations = []
+        for entry in index["nodes"]:
+            loc = location_from_list(entry["location"])
+            locations.append(loc if entry["parent"] is None else locations[entry["parent"]] * loc)
+            color = color_from_tuple(entry["color"])
+            part = entry["part"]
+            if entry["parent"] is None:
+                node = cls(None, loc=loc, name=entry["name"], color=color, metadata=entry["metadata"])
+                if part is not None:
+                    node.obj = container.loader(part)()
+            elif part is None:
+                node = cls(None, loc=loc, name=entry["name"], color=color, metadata=entry["metadata"])
             else:
-                new_assembly.add(part[0], name=part[1], color=part[3], loc=part[2])
-        if not part_found:
-            warnings.warn(f'Part with name {name} not found')
+                node = _LazyPart(
+                    container.loader(part),
+                    part["properties"],
+                    locations[-1],
+                    loc=loc,
+                    name=entry["name"],
+                    color=color,
+                    metadata=entry["metadata"],
+                )
+            if entry["parent"] is not None:
+                node.parent = nodes[entry["parent"]]
+                node.parent.children.append(node)
+            nodes.append(node)
+
+        # index every descendant by its path, deepest nodes first as cadquery does
+        for node in reversed(nodes):
+            for child in node.children:
+                node.objects.update(child._flatten())
+
+        container.close_if_decoded()
+        assembly = nodes[0]
+        for attribute, value in index["metadata"].items():
+            setattr(assembly, attribute, value)
+        return assembly
+
+    # names() of the assembly, reset whenever a part is added
+    _names_cache = None
+
+    def add(self, *args, **kwargs):
+        self._names_cache = None
+        return super().add(*args, **kwargs)
+
+    def _child(self, name: str):
+        """Returns the top level part called name, or None, from the name
+        index that cadquery maintains in self.objects. Nested parts are
+        indexed by their path which contains a "/"."""
+        node = self.objects.get(name)
+        if node is None or node is self or "/" in name:
+            return None
+        return node
+
+    def _find(self, name: str) -> list:
+        """Returns the (path, node) of the parts called name. A top level
+        part is looked up in the name index, otherwise the whole index is
+        walked for parts nested in sub assemblies whose path ends in /name."""
+        node = self._child(name)
+        if node is not None:
+            return [(name, node)]
+        return [
+            (path, node) for path, node in self.objects.items() if node is not self and path.rpartition("/")[2] == name
+        ]
+
+    def _ancestors(self, path: str) -> list:
+        """Returns the nodes of the sub assemblies holding the part at path."""
+        names = path.split("/")
+        return [self.objects["/".join(names[:depth])] for depth in range(1, len(names))]
+
+    def _view(self, children):
+        """Returns a new Assembly holding the given child nodes and the
+        tokamak metadata of this assembly.
+
+        The child nodes are shared rather than copied, so building a view
+        only costs a reference per part. Shared nodes are not re-parented,
+        their parent stays the assembly they were first added to. The recipe
+        keys are not kept so the parts of a view are never reused by a
+        rebuild.
+        """
+        new_assembly = Assembly()
+        _adopt(new_assembly, children)
         self._copy_metadata(new_assembly)
+        new_assembly.recipe_keys = None
         return new_assembly
 
-    def names(self):
+    def _bare_copy(self):
+        """Returns a new node holding the same object, location, color,
+        material, metadata and subshape data as this node, without children."""
+        node = Assembly(
+            self.obj, loc=self.loc, name=self.name, color=self.color, material=self.material, metadata=self.metadata
+        )
+        node._subshape_names = BiDict(self._subshape_names)
+        node._subshape_colors = BiDict(self._subshape_colors)
+        node._subshape_layers = BiDict(self._subshape_layers)
+        return node
+
+    def _edited(self, name: str = None, color: cq.Color = None, children: list = None):
+        """Returns a new node holding the same object and location as this
+        node with a different name, color and/or children. The children are
+        shared, by default those of this node."""
+        node = self._bare_copy()
+        # the geometry is unchanged so the cached properties still apply
+        node._properties_cache = self._properties_cache
+        node._mesh_cache = self._mesh_cache
+        if color is not None:
+            node.color = color
+        if name is not None:
+            node.name = name
+            node.objects = {name: node}
+        _adopt(node, self.children if children is None else children)
+        return node
+
+    def _solids(self) -> tuple:
+        """Returns the solids of this node's object and the plane of a
+        Workplane object, or None."""
+        obj = self.obj
+        if isinstance(obj, cq.Workplane):
+            return obj.solids().vals(), obj.plane
+        if isinstance(obj, cq.Shape):
+            return obj.Solids(), None
+        return [], None
+
+    def _split_names(self, name: str) -> list:
+        """Returns the names _split gives this node if it is called name."""
+        count = len(self._solids()[0])
+        if count <= 1:
+            return [name]
+        return [f"{name}_{idx}" for idx in range(1, count + 1)]
+
+    def _split(self) -> list:
+        """Returns this node, or a new node for each solid if its object holds
+        several solids, named <name>_1, <name>_2 ... <name>_N. Any children
+        are kept under the first of the new nodes, which has the location of
+        this node."""
+        solids, plane = self._solids()
+        if len(solids) <= 1:
+            return [self]
+
+        nodes = []
+        for idx, solid in enumerate(solids, start=1):
+            new_obj = cq.Workplane(plane).add(solid) if plane is not None else solid
+            nodes.append(Assembly(new_obj, name=f"{self.name}_{idx}", color=self.color, loc=self.loc))
+        _adopt(nodes[0], self.children)
+        return nodes
+
+    def _rename_map(self, old: str, new: str) -> list:
+        """Returns the (path, node, new name) of the part(s) called ``old``,
+        or else of the split_solids() group sharing ``old`` as base name."""
+        matches = self._find(old)
+        if matches:
+            return [(path, node, new) for path, node in matches]
+
+        # fall back to a split_solids() group sharing ``old`` as base name
+        remap = []
+        for path, node in self.objects.items():
+            base, separator, suffix = path.rpartition("/")[2].rpartition("_")
+            if node is not self and separator and base == old and suffix.isdigit():
+                remap.append((path, node, f"{new}_{suffix}"))
+        return remap
+
+    def _edited_children(self, node, removed, new_names, new_colors, ancestors, split) -> list:
+        """Returns the children of node after the edits, keyed by node id,
+        sharing the children and grandchildren that are not edited."""
+        children = []
+        for child in node.children:
+            if id(child) in removed:
+                continue
+            grandchildren = None
+            if split or id(child) in ancestors:
+                grandchildren = self._edited_children(child, removed, new_names, new_colors, ancestors, split)
+                if len(grandchildren) == len(child.children) and all(
+                    new is old for new, old in zip(grandchildren, child.children)
+                ):
+                    grandchildren = None
+            if grandchildren is not None or id(child) in new_names or id(child) in new_colors:
+                child = child._edited(new_names.get(id(child)), new_colors.get(id(child)), grandchildren)
+            children.extend(child._split() if split else [child])
+        return children
+
+    def _check_unique_names(self, node, removed, new_names, ancestors, split):
+        """Raises a ValueError, before any node is made, if the edits would
+        give two children of node, or of a sub assembly within it that is
+        rebuilt, the same name. Split parts are counted under their
+        <name>_1 ... <name>_N names."""
         names = []
-        for part in self:
-            names.append(part[1].split('/')[-1])
-        return names
+        for child in node.children:
+            if id(child) in removed:
+                continue
+            name = new_names.get(id(child), child.name)
+            names.extend(child._split_names(name) if split else [name])
+            if split or id(child) in ancestors:
+                self._check_unique_names(child, removed, new_names, ancestors, split)
+
+        for name, count in Counter(names).items():
+            if count > 1:
+                raise ValueError(
+                    f'Cannot edit the assembly, {name!r} would be the name of more than one part '
+                    'and assembly names must be unique.'
+                )
+
+    def edit(self, remove=(), rename: dict = None, colors: dict = None, split: bool = False):
+        """Returns a new Assembly with several edits applied in one pass over
+        the parts. The whole edit set is checked before anything is changed.
+
+        All names refer to the parts of this assembly before the edit. A name
+        matches a top level part, or else every part of that name nested in
+        sub assemblies, which are found by walking the whole assembly.
+
+        Parts that are not edited are shared with this assembly rather than
+        copied, and keep this assembly as their parent. Treat the parts of
+        both assemblies as read only: setting an attribute of a shared part
+        in place, for example its color or loc, changes it in both
+        assemblies. Make such changes with edit, which creates new nodes for
+        the parts it changes.
+
+        Args:
+            remove: the names of the parts to leave out.
+            rename: maps existing part names (or split_solids() base names,
+                see rename) to their new names.
+            colors: maps part names to their new color, either a cq.Color, a
+                color name or an (r, g, b) or (r, g, b, a) tuple.
+            split: explode parts containing several solids as split_solids
+                does, after renaming.
+
+        Raises:
+            ValueError: if a resulting name, including the names of split
+                parts, would collide with another part, because cadquery
+                assembly names must be unique.
+        """
+        rename = rename or {}
+        colors = colors or {}
+        # nodes holding an edited part, which are rebuilt around the edit
+        ancestors = set()
+
+        removed = set()
+        for name in remove:
+            matches = self._find(name)
+            if not matches:
+                warnings.warn(f'Part with name {name} not found')
+            for path, node in matches:
+                removed.add(id(node))
+                ancestors.update(id(ancestor) for ancestor in self._ancestors(path))
+
+        new_names = {}
+        for old, new in rename.items():
+            matches = self._rename_map(old, new)
+            if not matches:
+                warnings.warn(f'Part with name {old} not found')
+            for path, node, new_name in matches:
+                new_names[id(node)] = new_name
+                ancestors.update(id(ancestor) for ancestor in self._ancestors(path))
+
+        new_colors = {}
+        for name, color in colors.items():
+            matches = self._find(name)
+            if not matches:
+                warnings.warn(f'Part with name {name} not found')
+            if isinstance(color, str):
+                color = cq.Color(color)
+            elif not isinstance(color, cq.Color):
+                color = cq.Color(*color)
+            for path, node in matches:
+                new_colors[id(node)] = color
+                ancestors.update(id(ancestor) for ancestor in self._ancestors(path))
+
+        self._check_unique_names(self, removed, new_names, ancestors, split)
+        return self._view(self._edited_children(self, removed, new_names, new_colors, ancestors, split))
+
+    def remove(self, name: str):
+        """Returns a new Assembly without the part named ``name``, the other
+        parts are shared with this assembly rather than copied, see edit.
+
+        Args:
+            name: the name of the part to leave out.
+        """
+        return self.edit(remove=[name])
+
+    def names(self):
+        if self._names_cache is None:
+            self._names_cache = tuple(node.name.split('/')[-1] for node in _iter_part_nodes(self))
+        return list(self._names_cache)
 
     def rename(self, old: str, new: str):
         """Returns a new Assembly with the part(s) named ``old`` renamed to ``new``.
@@ -55,39 +914,7 @@ class Assembly(cq.Assembly):
             ValueError: if a resulting name would collide with another part,
                 because cadquery assembly names must be unique.
         """
-        leaf_names = self.names()
-
-        if old in leaf_names:
-            remap = {old: new}
-        else:
-            # fall back to a split_solids() group sharing ``old`` as base name
-            remap = {}
-            for leaf in leaf_names:
-                base, separator, suffix = leaf.rpartition('_')
-                if separator and base == old and suffix.isdigit():
-                    remap[leaf] = f'{new}_{suffix}'
-
-        if not remap:
-            warnings.warn(f'Part with name {old} not found')
-            return self
-
-        # assembly names must stay unique
-        unchanged = [name for name in leaf_names if name not in remap]
-        targets = list(remap.values())
-        for target in targets:
-            if target in unchanged or targets.count(target) > 1:
-                raise ValueError(
-                    f'Cannot rename to {target!r}, that name already exists in the '
-                    'assembly and assembly names must be unique.'
-                )
-
-        new_assembly = Assembly()
-        for obj, full_path, loc, color in self:
-            leaf = full_path.split('/')[-1]
-            new_assembly.add(obj, name=remap.get(leaf, leaf), color=color, loc=loc)
-
-        self._copy_metadata(new_assembly)
-        return new_assembly
+        return self.edit(rename={old: new})
 
     def split_solids(self):
         """
@@ -101,29 +928,174 @@ class Assembly(cq.Assembly):
           'add_extra_cut_shape_1' with 16 solids becomes:
           'add_extra_cut_shape_1_1' through 'add_extra_cut_shape_1_16'
         """
-        new_assembly = Assembly()
+        return self.edit(split=True)
 
-        for part in self:
-            obj, full_path, loc, color = part
-            leaf_name = full_path.split('/')[-1]
+    def compact(self):
+        """Returns a new Assembly where each Workplane part is replaced by its
+        final shape, dropping the construction history (wires, revolves and
+        each successive cut) that the Workplane keeps alive. This reduces the
+        memory held by the assembly and the time taken to pickle it. Sub
+        assemblies, locations, materials, metadata and subshape data are kept.
+        """
+        new_assembly = _compacted(self)
+        self._copy_metadata(new_assembly)
+        return new_assembly
 
-            if isinstance(obj, cq.Workplane):
-                solids = obj.solids().vals()
-                plane = obj.plane
-            elif isinstance(obj, cq.Shape):
-                solids = obj.Solids()
-                plane = None
-            else:
-                new_assembly.add(obj, name=leaf_name, color=color, loc=loc)
+    def materialize(self):
+        """Builds, or loads, every part of the assembly that has not been
+        built yet. Parts of assemblies made with lazy=True or loaded from a
+        .paramak file are otherwise built when first accessed."""
+        for node in _iter_part_nodes(self):
+            node.obj
+        return self
+
+    def memory_report(self) -> dict:
+        """Estimates the memory held by each part of the assembly.
+
+        Returns:
+            dict: keyed by part name, each value holds the B-rep statistics of
+            the part (see paramak.memory.brep_statistics) along with the
+            number of intermediate "retained_workplanes" and
+            "retained_shapes" kept alive by the part's construction history
+            and their "retained_estimated_bytes".
+        """
+        report = {}
+        for _, node in self.traverse():
+            if node.obj is None:
                 continue
+            retained = retained_objects(node.obj)
+            report[node.name] = {
+                **brep_statistics(_part_shape(node.obj)),
+                "retained_workplanes": retained["workplanes"],
+                "retained_shapes": retained["shapes"],
+                "retained_estimated_bytes": retained["estimated_bytes"],
+            }
+        return report
 
-            if len(solids) <= 1:
-                new_assembly.add(obj, name=leaf_name, color=color, loc=loc)
-            else:
-                for idx, solid in enumerate(solids, start=1):
-                    split_name = f"{leaf_name}_{idx}"
-                    new_obj = cq.Workplane(plane).add(solid) if plane is not None else solid
-                    new_assembly.add(new_obj, name=split_name, color=color, loc=loc)
 
-        self._copy_metadata(new_assembly)
-        return new_assembly
+class _LazyPart(Assembly):
+    """An assembly node whose object is only built when first accessed.
+
+    Args:
+        loader: called without arguments to build the object.
+        properties: the known part_properties of the object, returned without
+            building it. Defaults to None.
+        properties_location: the location the properties were computed at,
+            defaults to the location of the part.
+    """
+
+    def __init__(self, loader, properties=None, properties_location=None, **kwargs):
+        super().__init__(None, **kwargs)
+        self._loader = loader
+        self._saved_properties = properties
+        self._saved_location = properties_location or self.loc
+
+    @property
+    def obj(self):
+        if self._loader is not None:
+            loader = self._loader
+            self._loader = None
+            self._obj = loader()
+            if self._saved_properties is not None:
+                self._properties_cache = (self._obj, self._saved_location, self._saved_properties)
+        return self._obj
+
+    @obj.setter
+    def obj(self, value):
+        self._obj = value
+        if value is not None:
+            self._loader = None
+
+    @property
+    def materialized(self) -> bool:
+        return getattr(self, "_loader", None) is None
+
+    def _holds_object(self) -> bool:
+        return self._loader is not None or self._obj is not None
+
+    def _has_current_properties(self, loc: cq.Location = None) -> bool:
+        if self._loader is not None:
+            return self._saved_properties is not None and _same_location(self._saved_location, loc or self.loc)
+        return super()._has_current_properties(loc)
+
+    def _part_properties(self, loc: cq.Location = None) -> dict:
+        if self._loader is not None and self._has_current_properties(loc):
+            return self._saved_properties
+        return super()._part_properties(loc)
+
+    def _bare_copy(self):
+        # copies the loader rather than building the part
+        rv = _LazyPart(
+            self._loader,
+            self._saved_properties,
+            self._saved_location,
+            loc=self.loc,
+            name=self.name,
+            color=self.color,
+            material=self.material,
+            metadata=self.metadata,
+        )
+        if self._loader is None:
+            rv.obj = self._obj
+        rv._subshape_names = BiDict(self._subshape_names)
+        rv._subshape_colors = BiDict(self._subshape_colors)
+        rv._subshape_layers = BiDict(self._subshape_layers)
+        return rv
+
+    def _copy(self):
+        rv = self._bare_copy()
+        for child in self.children:
+            child_copy = child._copy()
+            child_copy.parent = rv
+            rv.children.append(child_copy)
+            rv.objects[child_copy.name] = child_copy
+            rv.objects.update(child_copy.objects)
+        return rv
+
+
+class _PartBlobs:
+    """The memory mapped B-rep blobs of a .paramak file opened by
+    Assembly.load, closed once all of its parts have been decoded.
+
+    Args:
+        blobs: the view of the blobs returned by read_container.
+        parts: the number of parts stored in the file.
+    """
+
+    def __init__(self, blobs, parts: int):
+        self._blobs = blobs
+        self._pending = parts
+
+    @property
+    def closed(self) -> bool:
+        return self._blobs is None
+
+    def loader(self, part):
+        """Returns a loader decoding a part. The part is only decoded once,
+        so copies of a lazily loaded node share the loader and its result."""
+        decoded = []
+
+        def loader():
+            if not decoded:
+                decoded.append(self._decode(part))
+                self._pending -= 1
+                self.close_if_decoded()
+            return decoded[0]
+
+        return loader
+
+    def _decode(self, part):
+        shapes = [shape_from_bytes(self._blobs[offset : offset + length]) for offset, length in part["blobs"]]
+        if part["kind"] == "shape":
+            return shapes[0]
+        workplane = cq.Workplane(plane_from_dict(part["plane"])).add(shapes)
+        for key, value in part["attributes"].items():
+            setattr(workplane, key, attribute_from_json(value))
+        return workplane
+
+    def close_if_decoded(self):
+        if self._pending == 0 and self._blobs is not None:
+            mapped = self._blobs.obj
+            self._blobs.release()
+            self._blobs = None
+            mapped.close()
@@ -0,0 +1,215 @@
+# Recipes for the parts of the reactor assemblies. Each recipe holds the
+# name and color of a part and a build() function that makes it, so the
+# reactor builders can make parts one at a time in build order instead of
+# holding every part in memory at once. The build functions are partials
+# of module level functions, so a key of everything a part depends on can be
+# read from them and used to reuse unchanged parts between builds.
+
+import hashlib
+from enum import Enum
+from functools import lru_cache, partial
+from typing import Callable, NamedTuple
+
+import cadquery as cq
+
+from ..export import content_hash
+from ..profiling import stage
+from ..utils import get_assembly_names, validate_unique_assembly_names
+from .assembly import Assembly, _LazyPart, _part_shape
+
+DEFAULT_COLOR = (0.5, 0.5, 0.5)
+
+
+class PartRecipe(NamedTuple):
+    name: str
+    build: Callable[[], cq.Workplane]
+    color: cq.Color
+
+
+def _existing(entry):
+    return entry
+
+
+def _union(builds, name):
+    reactor_compound = builds[0]()
+    with stage("union", name):
+        for build in builds[1:]:
+            reactor_compound = reactor_compound.union(build())
+    return reactor_compound
+
+
+def _intersect(entry, build_compound, name):
+    reactor_compound = build_compound()
+    with stage("intersect", name):
+        return entry.intersect(reactor_compound)
+
+
+def _cut(build, cutters, name):
+    entry = build()
+    for cutter in cutters:
+        with stage("cut", name, cutter=getattr(cutter, "name", None)):
+            entry = entry.cut(cutter)
+    return entry
+
+
+def reactor_part_recipes(
+    layer_recipes, plasma_build, extra_cut_shapes, extra_intersect_shapes, colors, reactor_name
+) -> list:
+    """Returns the recipes of every part of a reactor in build order: the
+    extra cut shapes, the intersections of the extra intersect shapes with
+    the layers, the layers cut by all the extra shapes and then the plasma.
+
+    Args:
+        layer_recipes: (name, build) pairs for the center column and blanket
+            layers in order.
+        plasma_build: builds the plasma.
+        extra_cut_shapes: Workplanes to cut the layers with.
+        extra_intersect_shapes: Workplanes to intersect with the layers, these
+            also cut the layers.
+        colors: maps part names to RGB or RGBA tuples.
+        reactor_name: the builder name used in error messages.
+    """
+    cut_names, intersect_names, _ = get_assembly_names(extra_cut_shapes, extra_intersect_shapes, [], [])
+    layer_names = [name for name, _ in layer_recipes]
+
+    validate_unique_assembly_names([*cut_names, *intersect_names, *layer_names, "plasma"], reactor_name)
+
+    for entry in extra_cut_shapes:
+        if not isinstance(entry, cq.Workplane):
+            raise ValueError(f"extra_cut_shapes should only contain cadquery Workplanes, not {type(entry)}")
+
+    def color(name):
+        return cq.Color(*colors.get(name, DEFAULT_COLOR))
+
+    layer_builds = [build for _, build in layer_recipes]
+    recipes = [
+        PartRecipe(name, partial(_existing, entry), color(name)) for entry, name in zip(extra_cut_shapes, cut_names)
+    ]
+
+    if len(extra_intersect_shapes) > 0:
+        # each layer is needed for the union and again to be cut, so the
+        # layers are kept once built
+        layer_builds = [lru_cache(maxsize=None)(build) for build in layer_builds]
+        build_compound = lru_cache(maxsize=None)(partial(_union, layer_builds, "reactor_compound"))
+        for entry, name in zip(extra_intersect_shapes, intersect_names):
+            recipes.append(PartRecipe(name, partial(_intersect, entry, build_compound, name), color(name)))
+
+    # cut the core layers with any extra shapes (a no-op when there are none)
+    cutters = list(extra_cut_shapes) + list(extra_intersect_shapes)
+    for build, name in zip(layer_builds, layer_names):
+        recipes.append(PartRecipe(name, partial(_cut, build, cutters, name), color(name)))
+
+    recipes.append(PartRecipe("plasma", plasma_build, color("plasma")))
+    return recipes
+
+
+def _compact(build):
+    return _part_shape(build())
+
+
+def _key_structure(value, workplane_hashes):
+    if isinstance(value, partial):
+        return (
+            _key_structure(value.func, workplane_hashes),
+            tuple(_key_structure(arg, workplane_hashes) for arg in value.args),
+            tuple(sorted((key, _key_structure(arg, workplane_hashes)) for key, arg in value.keywords.items())),
+        )
+    if hasattr(value, "__wrapped__"):
+        # functools.lru_cache wrappers
+        return _key_structure(value.__wrapped__, workplane_hashes)
+    if isinstance(value, cq.Workplane):
+        if id(value) not in workplane_hashes:
+            workplane_hashes[id(value)] = content_hash(_part_shape(value))
+        return ("workplane", workplane_hashes[id(value)])
+    if isinstance(value, (list, tuple)):
+        return tuple(_key_structure(item, workplane_hashes) for item in value)
+    if isinstance(value, Enum):
+        return str(value)
+    if callable(value):
+        return f"{value.__module__}.{value.__qualname__}"
+    return value
+
+
+def recipe_keys(recipes, compact: bool = False) -> dict:
+    """Returns a key for each part that changes whenever anything the part
+    is built from changes (dimensions, cutters given by their B-rep content
+    and the functions used), keyed by part name."""
+    workplane_hashes = {}
+    keys = {}
+    for recipe in recipes:
+        structure = _key_structure(recipe.build, workplane_hashes)
+        keys[recipe.name] = hashlib.sha256(repr((structure, compact)).encode("utf-8")).hexdigest()
+    return keys
+
+
+def _reusable_node(previous, my_assembly, name):
+    """Returns the part called name of a previous assembly if it was built
+    with the same recipe key as in my_assembly, otherwise None."""
+    if previous is None or (previous.recipe_keys or {}).get(name) != my_assembly.recipe_keys[name]:
+        return None
+    return previous._child(name)
+
+
+def iter_parts(recipes):
+    """Builds the parts one at a time, yielding (name, part, color)."""
+    for recipe in recipes:
+        yield recipe.name, recipe.build(), recipe.color
+
+
+def _add_reused(my_assembly, node, color):
+    if node.color is None or node.color.toTuple() != color.toTuple():
+        node = node._edited(color=color)
+    my_assembly.children.append(node)
+    my_assembly.objects.update(node._flatten())
+
+
+def assembly_from_recipes(recipes, metadata: dict, previous: Assembly = None, compact: bool = False) -> Assembly:
+    """Builds every part into an Assembly holding the tokamak metadata.
+
+    Args:
+        recipes: the PartRecipe of each part.
+        metadata: the tokamak metadata to set on the assembly.
+        previous: an assembly built earlier from recipes, its parts with
+            unchanged recipe keys are shared instead of being built again.
+        compact: store only the final shape of each part built, dropping
+            the Workplane construction history. Part of the recipe keys.
+    """
+    my_assembly = Assembly()
+    # only made when a rebuild reads them, see Assembly.recipe_keys
+    my_assembly.recipe_keys = partial(recipe_keys, recipes, compact)
+    for recipe in recipes:
+        node = _reusable_node(previous, my_assembly, recipe.name)
+        if node is not None:
+            with stage("reuse", recipe.name):
+                _add_reused(my_assembly, node, recipe.color)
+            continue
+        part = recipe.build()
+        if compact:
+            with stage("compact", recipe.name):
+                part = _part_shape(part)
+        with stage("assembly", recipe.name):
+            my_assembly.add(part, name=recipe.name, color=recipe.color)
+    for attribute, value in metadata.items():
+        setattr(my_assembly, attribute, value)
+    return my_assembly
+
+
+def lazy_assembly_from_recipes(
+    recipes, metadata: dict, previous: Assembly = None, compact: bool = False
+) -> Assembly:
+    """Returns an Assembly holding the tokamak metadata whose parts are each
+    built from their recipe when first accessed. Arguments are as for
+    assembly_from_recipes."""
+    my_assembly = Assembly()
+    # only made when a rebuild reads them, see Assembly.recipe_keys
+    my_assembly.recipe_keys = partial(recipe_keys, recipes, compact)
+    for recipe in recipes:
+        node = _reusable_node(previous, my_assembly, recipe.name)
+        if node is not None:
+            _add_reused(my_assembly, node, recipe.color)
+            continue
+        build = partial(_compact, recipe.build) if compact else recipe.build
+        my_assembly.add(_LazyPart(build, name=recipe.name, color=recipe.color))
+    for attribute, value in metadata.items():
+        setattr(my_assembly, attribute, value)
+    return my_assembly
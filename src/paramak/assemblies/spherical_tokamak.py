@@ -1,18 +1,21 @@
-from typing import Optional, Sequence, Tuple, Union
+from functools import lru_cache, partial
+from typing import Iterator, Optional, Sequence, Tuple, Union
 
 import cadquery as cq
 from .assembly import Assembly
+from .parts import assembly_from_recipes, iter_parts, lazy_assembly_from_recipes, reactor_part_recipes
+from ..isolation import run_isolated
+from ..profiling import record_build, stage
 
 from ..utils import (
     get_plasma_index,
     get_plasma_value,
     get_layer_name,
-    get_assembly_names,
     sum_up_to_gap_before_plasma,
     sum_up_to_plasma,
     sum_before_after_plasma,
     validate_vertical_build_names,
-    validate_unique_assembly_names,
+    RadialBuild,
     LayerType,
 )
 from ..workplanes.blanket_from_plasma import blanket_from_plasma
@@ -20,10 +23,53 @@ from ..workplanes.center_column_shield_cylinder import center_column_shield_cyli
 from ..workplanes.plasma_simplified import plasma_simplified
 
 
-def create_blanket_layers_after_plasma(
+def blanket_layer_after_plasma(
+    name,
+    minor_radius,
+    major_radius,
+    triangularity,
+    elongation,
+    rotation_angle,
+    thicknesses,
+    offsets,
+    center_column,
+):
+    """Builds a blanket layer on the outboard side of the plasma and removes
+    the part overlapping the center column.
+
+    Args:
+        thicknesses: the lower, radial and upper thickness of the layer.
+        offsets: the lower, radial and upper distance from the plasma.
+        center_column: returns the Workplane cut from the layer.
+    """
+    layer = blanket_from_plasma(
+        minor_radius=minor_radius,
+        major_radius=major_radius,
+        triangularity=triangularity,
+        elongation=elongation,
+        thickness=list(thicknesses),
+        offset_from_plasma=list(offsets),
+        start_angle=-90,
+        stop_angle=90,
+        rotation_angle=rotation_angle,
+        color=(0.5, 0.5, 0.5),
+        name=name,
+        allow_overlapping_shape=True,
+        connect_to_center=True,
+    )
+    center_column = center_column()
+    with stage("cut", name, cutter=center_column.name):
+        layer = layer.cut(center_column)
+    layer.name = name
+    return layer
+
+
+def blanket_layers_after_plasma_recipes(
     radial_build, vertical_build, minor_radius, major_radius, triangularity, elongation, rotation_angle, center_column, layer_count=0
 ):
-    layers = []
+    """Returns a (name, build) pair for each blanket layer after the plasma.
+    center_column is called to get the Workplane cut from each layer."""
+    recipes = []
     cumulative_thickness_rb = 0
     cumulative_thickness_uvb = 0
     cumulative_thickness_lvb = 0
@@ -45,41 +91,46 @@ def create_blanket_layers_after_plasma(
         layer_count += 1
         layer_name = get_layer_name(item, layer_count)
 
-        layer = blanket_from_plasma(
+        build = partial(
+            blanket_layer_after_plasma,
+            name=layer_name,
             minor_radius=minor_radius,
             major_radius=major_radius,
             triangularity=triangularity,
             elongation=elongation,
-            thickness=[
-                lower_thickness,
-                radial_thickness,
-                upper_thickness,
-            ],
-            offset_from_plasma=[
-                cumulative_thickness_lvb,
-                cumulative_thickness_rb,
-                cumulative_thickness_uvb,
-            ],
-            start_angle=-90,
-            stop_angle=90,
             rotation_angle=rotation_angle,
-            color=(0.5, 0.5, 0.5),
-            name=layer_name,
-            allow_overlapping_shape=True,
-            connect_to_center=True,
+            thicknesses=(lower_thickness, radial_thickness, upper_thickness),
+            offsets=(cumulative_thickness_lvb, cumulative_thickness_rb, cumulative_thickness_uvb),
+            center_column=center_column,
         )
-        layer = layer.cut(center_column)
-        layer.name = layer_name
         cumulative_thickness_rb += radial_thickness
         cumulative_thickness_uvb += upper_thickness
         cumulative_thickness_lvb += lower_thickness
-        layers.append(layer)
+        recipes.append((layer_name, build))
 
-    return layers
+    return recipes
 
 
-def create_center_column_shield_cylinders(radial_build, vertical_build, rotation_angle):
-    cylinders = []
+def create_blanket_layers_after_plasma(
+    radial_build, vertical_build, minor_radius, major_radius, triangularity, elongation, rotation_angle, center_column, layer_count=0
+):
+    recipes = blanket_layers_after_plasma_recipes(
+        radial_build,
+        vertical_build,
+        minor_radius,
+        major_radius,
+        triangularity,
+        elongation,
+        rotation_angle,
+        lambda: center_column,
+        layer_count,
+    )
+    return [build() for _, build in recipes]
+
+
+def center_column_shield_cylinder_recipes(radial_build, vertical_build, rotation_angle):
+    """Returns a (name, build) pair for each center column shield cylinder."""
+    recipes = []
     total_sum = 0
     layer_count = 0
 
@@ -98,7 +149,8 @@ def create_center_column_shield_cylinders(radial_build, vertical_build, rotation
         layer_count += 1
         layer_name = get_layer_name(item, layer_count)
 
-        cylinder = center_column_shield_cylinder(
+        build = partial(
+            center_column_shield_cylinder,
             inner_radius=total_sum,
             thickness=item[1],
             name=layer_name,
@@ -106,39 +158,114 @@ def create_center_column_shield_cylinders(radial_build, vertical_build, rotation
             height=center_column_shield_height,
             reference_point=("lower", -before),
         )
-        cylinders.append(cylinder)
+        recipes.append((layer_name, build))
         total_sum += item[1]
 
-    return cylinders
+    return recipes
 
 
-def spherical_tokamak_from_plasma(
+def create_center_column_shield_cylinders(radial_build, vertical_build, rotation_angle):
+    return [build() for _, build in center_column_shield_cylinder_recipes(radial_build, vertical_build, rotation_angle)]
+
+
+def spherical_tokamak_recipes(
+    radial_build, vertical_build, triangularity, rotation_angle, extra_cut_shapes, extra_intersect_shapes, colors
+):
+    """Returns the PartRecipe of each spherical tokamak part in build order
+    along with the tokamak metadata, without building any part."""
+
+    radial_build = RadialBuild(radial_build)
+    vertical_build = RadialBuild(vertical_build)
+    validate_vertical_build_names(vertical_build, "spherical_tokamak()")
+
+    inner_equatorial_point = sum_up_to_plasma(radial_build)
+    plasma_radial_thickness = get_plasma_value(radial_build)
+    plasma_vertical_thickness = get_plasma_value(vertical_build)
+    outer_equatorial_point = inner_equatorial_point + plasma_radial_thickness
+
+    # sets major radius and minor radius from equatorial_points to allow a
+    # radial build. This helps avoid the plasma overlapping the center
+    # column and other components
+    major_radius = (outer_equatorial_point + inner_equatorial_point) / 2
+    minor_radius = major_radius - inner_equatorial_point
+
+    # vertical build
+    elongation = (plasma_vertical_thickness / 2) / minor_radius
+    blanket_rear_wall_end_height = vertical_build.total
+
+    plasma_build = partial(
+        plasma_simplified,
+        major_radius=major_radius,
+        minor_radius=minor_radius,
+        elongation=elongation,
+        triangularity=triangularity,
+        rotation_angle=rotation_angle,
+        name="plasma",
+    )
+
+    layer_recipes = center_column_shield_cylinder_recipes(
+        radial_build=radial_build,
+        vertical_build=vertical_build,
+        rotation_angle=rotation_angle,
+    )
+
+    # built once, when the first blanket layer is built
+    blanket_cutting_cylinder = lru_cache(maxsize=None)(
+        partial(
+            center_column_shield_cylinder,
+            inner_radius=0,
+            thickness=sum_up_to_gap_before_plasma(radial_build),
+            rotation_angle=360,
+            height=2 * blanket_rear_wall_end_height,
+            name="blanket_cutting_cylinder",
+        )
+    )
+
+    layer_recipes += blanket_layers_after_plasma_recipes(
+        radial_build=radial_build,
+        vertical_build=vertical_build,
+        minor_radius=minor_radius,
+        major_radius=major_radius,
+        triangularity=triangularity,
+        elongation=elongation,
+        rotation_angle=rotation_angle,
+        center_column=blanket_cutting_cylinder,
+        layer_count=len(layer_recipes),
+    )
+
+    recipes = reactor_part_recipes(
+        layer_recipes, plasma_build, extra_cut_shapes, extra_intersect_shapes, colors, "spherical_tokamak()"
+    )
+    metadata = {
+        "elongation": elongation,
+        "triangularity": triangularity,
+        "major_radius": major_radius,
+        "minor_radius": minor_radius,
+    }
+    return recipes, metadata
+
+
+def iter_spherical_tokamak_parts(
     radial_build: Sequence[Tuple[LayerType, float] | Tuple[LayerType, float, str]],
-    elongation: float = 2.0,
+    vertical_build: Sequence[Tuple[LayerType, float] | Tuple[LayerType, float, str]],
     triangularity: float = 0.55,
     rotation_angle: float = 180.0,
     extra_cut_shapes: Sequence[cq.Workplane] = None,
     extra_intersect_shapes: Sequence[cq.Workplane] = None,
     colors: dict = None,
-) -> Assembly:
-    """Creates a spherical tokamak fusion reactor from a radial build and plasma parameters.
+) -> Iterator[Tuple[str, cq.Workplane, cq.Color]]:
+    """Builds the parts of a spherical tokamak one at a time, in the order
+    spherical_tokamak() adds them to its assembly, so that each part can be
+    exported or meshed and then dropped before the next is built. The
+    arguments are the same as for spherical_tokamak() and are checked before
+    the first part is built.
 
-    Args:
-        radial_build: sequence of tuples containing the radial build of the
-            reactor. Each tuple should contain a LayerType, a float and the string is optional.
-        elongation: The elongation of the plasma. Defaults to 2.0.
-        triangularity: The triangularity of the plasma. Defaults to 0.55.
-        rotation_angle: The rotation angle of the reactor in degrees. Defaults to 180.0.
-        extra_cut_shapes: A list of extra shapes to cut the reactor with. Defaults to [].
-        colors: the colors to assign to the assembly parts. Defaults to {}.
-            Each dictionary entry should be a key that matches the assembly part name
-            (e.g. 'plasma', or 'layer_1') and a tuple of 3 or 4 floats between 0 and 1
-            representing the RGB or RGBA values.
+    When extra_intersect_shapes are given every layer is needed to make the
+    intersections, so the layers are all kept in memory.
 
     Returns:
-        CadQuery.Assembly: A CadQuery Assembly object representing the spherical tokamak fusion reactor.
+        Iterator: yields the (name, Workplane, cadquery.Color) of each part.
     """
-
     if extra_cut_shapes is None:
         extra_cut_shapes = []
     if extra_intersect_shapes is None:
@@ -146,6 +273,16 @@ def spherical_tokamak_from_plasma(
     if colors is None:
         colors = {}
 
+    recipes, _ = spherical_tokamak_recipes(
+        radial_build, vertical_build, triangularity, rotation_angle, extra_cut_shapes, extra_intersect_shapes, colors
+    )
+    return iter_parts(recipes)
+
+
+def spherical_tokamak_vertical_build(radial_build, elongation: float) -> list:
+    """Returns the vertical build spherical_tokamak_from_plasma makes from
+    the outer radial build, with a plasma of the given elongation."""
+    radial_build = RadialBuild(radial_build)
     inner_equatorial_point = sum_up_to_plasma(radial_build)
     plasma_radial_thickness = get_plasma_value(radial_build)
     outer_equatorial_point = inner_equatorial_point + plasma_radial_thickness
@@ -163,7 +300,70 @@ def spherical_tokamak_from_plasma(
 
     plasma_height = 2 * minor_radius * elongation
     # slice operation reverses the list and removes the last value to avoid two plasmas
-    vertical_build = upper_vertical_build[::-1][:-1] + [(LayerType.PLASMA, plasma_height)] + upper_vertical_build[1:]
+    return upper_vertical_build[::-1][:-1] + [(LayerType.PLASMA, plasma_height)] + upper_vertical_build[1:]
+
+
+def spherical_tokamak_from_plasma(
+    radial_build: Sequence[Tuple[LayerType, float] | Tuple[LayerType, float, str]],
+    elongation: float = 2.0,
+    triangularity: float = 0.55,
+    rotation_angle: float = 180.0,
+    extra_cut_shapes: Sequence[cq.Workplane] = None,
+    extra_intersect_shapes: Sequence[cq.Workplane] = None,
+    colors: dict = None,
+    profile: bool = False,
+    compact: bool = False,
+    lazy: bool = False,
+    previous: Assembly = None,
+    timeout: float = None,
+) -> Assembly:
+    """Creates a spherical tokamak fusion reactor from a radial build and plasma parameters.
+
+    Args:
+        radial_build: sequence of tuples containing the radial build of the
+            reactor. Each tuple should contain a LayerType, a float and the string is optional.
+            A paramak.RadialBuild can also be given.
+        elongation: The elongation of the plasma. Defaults to 2.0.
+        triangularity: The triangularity of the plasma. Defaults to 0.55.
+        rotation_angle: The rotation angle of the reactor in degrees. Defaults to 180.0.
+        extra_cut_shapes: A list of extra shapes to cut the reactor with. Defaults to [].
+        colors: the colors to assign to the assembly parts. Defaults to {}.
+            Each dictionary entry should be a key that matches the assembly part name
+            (e.g. 'plasma', or 'layer_1') and a tuple of 3 or 4 floats between 0 and 1
+            representing the RGB or RGBA values.
+        profile: record the wall time and call count of each build stage and
+            part, the report is attached to the returned assembly as
+            build_report. Can not be used with lazy. Defaults to False.
+        compact: store only the final shape of each part in the assembly,
+            dropping the Workplane construction history to reduce memory
+            use. Defaults to False.
+        lazy: return an assembly whose parts are only built when first
+            accessed, by name, by iterating over the assembly or with
+            Assembly.materialize(). names() and the tokamak metadata are
+            available straight away. Defaults to False.
+        previous: an assembly returned by an earlier call to this builder.
+            Parts built from unchanged inputs are shared from it rather
+            than built again, for example changing the thickness of an
+            outer layer does not rebuild the plasma or the inner layers.
+            Defaults to None.
+        timeout: build in a separate process that is killed after this many
+            seconds, raising a paramak.BuildTimeoutError that names the stage
+            and part that was running. Can not be used with lazy. Defaults
+            to None which builds in this process without a time limit.
+
+    Returns:
+        CadQuery.Assembly: A CadQuery Assembly object representing the spherical tokamak fusion reactor.
+    """
+
+    if extra_cut_shapes is None:
+        extra_cut_shapes = []
+    if extra_intersect_shapes is None:
+        extra_intersect_shapes = []
+    if colors is None:
+        colors = {}
+
+    radial_build = RadialBuild(radial_build)
+    vertical_build = spherical_tokamak_vertical_build(radial_build, elongation)
 
     return spherical_tokamak(
         radial_build=radial_build,
@@ -173,6 +373,11 @@ def spherical_tokamak_from_plasma(
         extra_cut_shapes=extra_cut_shapes,
         extra_intersect_shapes=extra_intersect_shapes,
         colors=colors,
+        profile=profile,
+        compact=compact,
+        lazy=lazy,
+        previous=previous,
+        timeout=timeout,
     )
 
 
@@ -184,14 +389,21 @@ def spherical_tokamak(
     extra_cut_shapes: Sequence[cq.Workplane] = None,
     extra_intersect_shapes: Sequence[cq.Workplane] = None,
     colors: dict = None,
+    profile: bool = False,
+    compact: bool = False,
+    lazy: bool = False,
+    previous: Assembly = None,
+    timeout: float = None,
 ) -> Assembly:
     """Creates a spherical tokamak fusion reactor from a radial build and vertical build.
 
     Args:
         radial_build: sequence of tuples containing the radial build of the
             reactor. Each tuple should contain a LayerType, a float and the string is optional.
+            A paramak.RadialBuild can also be given.
         vertical_build: sequence of tuples containing the vertical build of the
             reactor. Each tuple should contain a LayerType, a float and the string is optional.
+            A paramak.RadialBuild can also be given.
         triangularity: The triangularity of the plasma. Defaults to 0.55.
         rotation_angle: The rotation angle of the reactor in degrees. Defaults to 180.0.
         extra_cut_shapes: A list of extra shapes to cut the reactor with. Defaults to [].
@@ -200,6 +412,25 @@ def spherical_tokamak(
             Each dictionary entry should be a key that matches the assembly part name
             (e.g. 'plasma', or 'layer_1') and a tuple of 3 or 4 floats between 0 and 1
             representing the RGB or RGBA values.
+        profile: record the wall time and call count of each build stage and
+            part, the report is attached to the returned assembly as
+            build_report. Can not be used with lazy. Defaults to False.
+        compact: store only the final shape of each part in the assembly,
+            dropping the Workplane construction history to reduce memory
+            use. Defaults to False.
+        lazy: return an assembly whose parts are only built when first
+            accessed, by name, by iterating over the assembly or with
+            Assembly.materialize(). names() and the tokamak metadata are
+            available straight away. Defaults to False.
+        previous: an assembly returned by an earlier call to this builder.
+            Parts built from unchanged inputs are shared from it rather
+            than built again, for example changing the thickness of an
+            outer layer does not rebuild the plasma or the inner layers.
+            Defaults to None.
+        timeout: build in a separate process that is killed after this many
+            seconds, raising a paramak.BuildTimeoutError that names the stage
+            and part that was running. Can not be used with lazy. Defaults
+            to None which builds in this process without a time limit.
 
     Returns:
         CadQuery.Assembly: A CadQuery Assembly object representing the spherical tokamak fusion reactor.
@@ -212,94 +443,57 @@ def spherical_tokamak(
     if colors is None:
         colors = {}
 
-    validate_vertical_build_names(vertical_build, "spherical_tokamak()")
-
-    inner_equatorial_point = sum_up_to_plasma(radial_build)
-    plasma_radial_thickness = get_plasma_value(radial_build)
-    plasma_vertical_thickness = get_plasma_value(vertical_build)
-    outer_equatorial_point = inner_equatorial_point + plasma_radial_thickness
-
-    # sets major radius and minor radius from equatorial_points to allow a
-    # radial build. This helps avoid the plasma overlapping the center
-    # column and other components
-    major_radius = (outer_equatorial_point + inner_equatorial_point) / 2
-    minor_radius = major_radius - inner_equatorial_point
-
-    # vertical build
-    elongation = (plasma_vertical_thickness / 2) / minor_radius
-    blanket_rear_wall_end_height = sum([item[1] for item in vertical_build])
-
-    plasma = plasma_simplified(
-        major_radius=major_radius,
-        minor_radius=minor_radius,
-        elongation=elongation,
-        triangularity=triangularity,
-        rotation_angle=rotation_angle,
-    )
-
-    inner_radial_build = create_center_column_shield_cylinders(
-        radial_build=radial_build,
-        vertical_build=vertical_build,
-        rotation_angle=rotation_angle,
-    )
-
-    blanket_cutting_cylinder = center_column_shield_cylinder(
-        inner_radius=0,
-        thickness=sum_up_to_gap_before_plasma(radial_build),
-        rotation_angle=360,
-        height=2 * blanket_rear_wall_end_height,
-    )
+    if timeout is not None:
+        if lazy:
+            raise ValueError("timeout can not be used with lazy, the parts of a lazy assembly are built when accessed")
+        return run_isolated(
+            spherical_tokamak,
+            dict(
+                radial_build=radial_build,
+                vertical_build=vertical_build,
+                triangularity=triangularity,
+                rotation_angle=rotation_angle,
+                extra_cut_shapes=extra_cut_shapes,
+                extra_intersect_shapes=extra_intersect_shapes,
+                colors=colors,
+                profile=profile,
+                compact=compact,
+                previous=previous,
+            ),
+            timeout,
+        )
 
-    blanket_layers = create_blanket_layers_after_plasma(
+    if profile:
+        if lazy:
+            raise ValueError(
+                "profile can not be used with lazy, the parts of a lazy assembly are built when accessed so "
+                "record them with paramak.record_build() around the accesses instead"
+            )
+        with record_build() as report:
+            my_assembly = spherical_tokamak(
+                radial_build=radial_build,
+                vertical_build=vertical_build,
+                triangularity=triangularity,
+                rotation_angle=rotation_angle,
+                extra_cut_shapes=extra_cut_shapes,
+                extra_intersect_shapes=extra_intersect_shapes,
+                colors=colors,
+                compact=compact,
+                lazy=lazy,
+                previous=previous,
+            )
+        my_assembly.build_report = report
+        return my_assembly
+
+    recipes, metadata = spherical_tokamak_recipes(
         radial_build=radial_build,
         vertical_build=vertical_build,
-        minor_radius=minor_radius,
-        major_radius=major_radius,
         triangularity=triangularity,
-        elongation=elongation,
         rotation_angle=rotation_angle,
-        center_column=blanket_cutting_cylinder,
-        layer_count=len(inner_radial_build)
-    )
-
-    cut_names, intersect_names, layer_names = get_assembly_names(
-        extra_cut_shapes, extra_intersect_shapes, inner_radial_build, blanket_layers
+        extra_cut_shapes=extra_cut_shapes,
+        extra_intersect_shapes=extra_intersect_shapes,
+        colors=colors,
     )
-
-    validate_unique_assembly_names([*cut_names, *intersect_names, *layer_names, "plasma"], "spherical_tokamak()")
-
-    my_assembly = Assembly()
-
-    for entry, name in zip(extra_cut_shapes, cut_names):
-        if not isinstance(entry, cq.Workplane):
-            raise ValueError(f"extra_cut_shapes should only contain cadquery Workplanes, not {type(entry)}")
-        my_assembly.add(entry, name=name, color=cq.Color(*colors.get(name, (0.5,0.5,0.5))))
-
-    # builds up the intersect shapes
-    if len(extra_intersect_shapes) > 0:
-        # makes a union of the the radial build to use as a base for the intersect shapes
-        reactor_compound = inner_radial_build[0]
-        for entry in inner_radial_build[1:] + blanket_layers:
-            reactor_compound = reactor_compound.union(entry)
-
-        # adds the extra intersect shapes to the assembly
-        for entry, name in zip(extra_intersect_shapes, intersect_names):
-            reactor_entry_intersection = entry.intersect(reactor_compound)
-            my_assembly.add(reactor_entry_intersection, name=name, color=cq.Color(*colors.get(name, (0.5,0.5,0.5))))
-
-    # cut the core layers with any extra shapes (a no-op when there are none)
-    cutters = extra_cut_shapes + extra_intersect_shapes
-    for entry, name in zip(inner_radial_build + blanket_layers, layer_names):
-        # TODO track the names of shapes, even when extra shapes are made due to splitting
-        for cutter in cutters:
-            entry = entry.cut(cutter)
-        my_assembly.add(entry, name=name, color=cq.Color(*colors.get(name, (0.5,0.5,0.5))))
-
-    my_assembly.add(plasma, name="plasma", color=cq.Color(*colors.get("plasma", (0.5,0.5,0.5))))
-
-    my_assembly.elongation = elongation
-    my_assembly.triangularity = triangularity
-    my_assembly.major_radius = major_radius
-    my_assembly.minor_radius = minor_radius
-
-    return my_assembly
+    if lazy:
+        return lazy_assembly_from_recipes(recipes, metadata, previous=previous, compact=compact)
+    return assembly_from_recipes(recipes, metadata, previous=previous, compact=compact)
@@ -1,14 +1,17 @@
-from typing import Sequence, Tuple
+from functools import partial
+from typing import Iterator, Sequence, Tuple
 
 import cadquery as cq
 from .assembly import Assembly
+from .parts import assembly_from_recipes, iter_parts, lazy_assembly_from_recipes, reactor_part_recipes
+from ..isolation import run_isolated
+from ..profiling import record_build, stage
 
 from ..utils import (
     get_plasma_index, 
     get_layer_name, 
-    get_assembly_names, 
-    validate_vertical_build_names, 
-    validate_unique_assembly_names, 
+    validate_vertical_build_names,
+    RadialBuild,
     LayerType
 )
 from ..workplanes.blanket_from_plasma import blanket_from_plasma
@@ -34,8 +37,9 @@ def count_cylinder_layers(radial_build):
     return before_plasma - after_plasma
 
 
-def create_center_column_shield_cylinders(radial_build, rotation_angle, center_column_shield_height):
-    cylinders = []
+def center_column_shield_cylinder_recipes(radial_build, rotation_angle, center_column_shield_height):
+    """Returns a (name, build) pair for each center column shield cylinder."""
+    recipes = []
     total_sum = 0
     layer_count = 0
 
@@ -57,7 +61,8 @@ def create_center_column_shield_cylinders(radial_build, rotation_angle, center_c
 
         layer_name = get_layer_name(item, layer_count)
 
-        cylinder = center_column_shield_cylinder(
+        build = partial(
+            center_column_shield_cylinder,
             inner_radius=total_sum,
             thickness=item[1],
             name=layer_name,
@@ -65,8 +70,15 @@ def create_center_column_shield_cylinders(radial_build, rotation_angle, center_c
             height=center_column_shield_height,
         )
         total_sum += thickness
-        cylinders.append(cylinder)
-    return cylinders
+        recipes.append((layer_name, build))
+    return recipes
+
+
+def create_center_column_shield_cylinders(radial_build, rotation_angle, center_column_shield_height):
+    return [
+        build()
+        for _, build in center_column_shield_cylinder_recipes(radial_build, rotation_angle, center_column_shield_height)
+    ]
 
 
 def distance_to_plasma(radial_build, index):
@@ -78,14 +90,77 @@ def distance_to_plasma(radial_build, index):
     return distance
 
 
-def create_layers_from_plasma(
-    radial_build, vertical_build, minor_radius, major_radius, triangularity, elongation, rotation_angle, center_column, layer_count=0
+def layer_from_plasma(
+    name,
+    minor_radius,
+    major_radius,
+    triangularity,
+    elongation,
+    rotation_angle,
+    thicknesses,
+    offsets,
 ):
+    """Builds a blanket layer around the plasma as the union of its outer and
+    inner halves.
+
+    Args:
+        thicknesses: the upper, outer, lower and inner thickness of the layer.
+        offsets: the upper, outer, lower and inner distance from the plasma.
+    """
+    upper_layer_thickness, outer_layer_thickness, lower_layer_thickness, inner_layer_thickness = thicknesses
+    upper_offset, outer_offset, lower_offset, inner_offset = offsets
+
+    outer_layer = blanket_from_plasma(
+        minor_radius=minor_radius,
+        major_radius=major_radius,
+        triangularity=triangularity,
+        elongation=elongation,
+        thickness=[upper_layer_thickness, outer_layer_thickness, lower_layer_thickness],
+        offset_from_plasma=[upper_offset, outer_offset, lower_offset],
+        start_angle=90,
+        stop_angle=-90,
+        rotation_angle=rotation_angle,
+        color=(0.5, 0.5, 0.5),
+        name=name,
+        allow_overlapping_shape=True,
+    )
+    inner_layer = blanket_from_plasma(
+        minor_radius=minor_radius,
+        major_radius=major_radius,
+        triangularity=triangularity,
+        elongation=elongation,
+        thickness=[
+            lower_layer_thickness,
+            inner_layer_thickness,
+            upper_layer_thickness,
+        ],
+        offset_from_plasma=[
+            lower_offset,
+            inner_offset,
+            upper_offset,
+        ],
+        start_angle=-90,
+        stop_angle=-270,
+        rotation_angle=rotation_angle,
+        color=(0.5, 0.5, 0.5),
+        name=name,
+        allow_overlapping_shape=True,
+    )
+    with stage("union", name):
+        layer = outer_layer.union(inner_layer)
+    layer.name = name
+    return layer
+
+
+def layers_from_plasma_recipes(
+    radial_build, vertical_build, minor_radius, major_radius, triangularity, elongation, rotation_angle, layer_count=0
+):
+    """Returns a (name, build) pair for each blanket layer around the plasma."""
 
     plasma_index_rb = get_plasma_index(radial_build)
     plasma_index_vb = get_plasma_index(vertical_build)
     indexes_from_plasma_to_end = len(radial_build) - plasma_index_rb
-    layers = []
+    recipes = []
 
     cumulative_thickness_orb = 0
     cumulative_thickness_irb = 0
@@ -116,57 +191,158 @@ def create_layers_from_plasma(
         else:
             layer_name = f"layer_{layer_count}"
 
-        # build outer layer
         if radial_build[plasma_index_rb + index_delta][0] == LayerType.SOLID:
-            outer_layer = blanket_from_plasma(
-                minor_radius=minor_radius,
-                major_radius=major_radius,
-                triangularity=triangularity,
-                elongation=elongation,
-                thickness=[upper_layer_thickness, outer_layer_thickness, lower_layer_thickness],
-                offset_from_plasma=[cumulative_thickness_uvb, cumulative_thickness_orb, cumulative_thickness_lvb],
-                start_angle=90,
-                stop_angle=-90,
-                rotation_angle=rotation_angle,
-                color=(0.5, 0.5, 0.5),
+            build = partial(
+                layer_from_plasma,
                 name=layer_name,
-                allow_overlapping_shape=True,
-            )
-            inner_layer = blanket_from_plasma(
                 minor_radius=minor_radius,
                 major_radius=major_radius,
                 triangularity=triangularity,
                 elongation=elongation,
-                thickness=[
+                rotation_angle=rotation_angle,
+                thicknesses=(
+                    upper_layer_thickness,
+                    outer_layer_thickness,
                     lower_layer_thickness,
                     inner_layer_thickness,
-                    upper_layer_thickness,
-                ],
-                offset_from_plasma=[
+                ),
+                offsets=(
+                    cumulative_thickness_uvb,
+                    cumulative_thickness_orb,
                     cumulative_thickness_lvb,
                     cumulative_thickness_irb,
-                    cumulative_thickness_uvb,
-                ],
-                start_angle=-90,
-                stop_angle=-270,
-                rotation_angle=rotation_angle,
-                color=(0.5, 0.5, 0.5),
-                name=layer_name,
-                allow_overlapping_shape=True,
+                ),
             )
-            layer = outer_layer.union(inner_layer)
-            layer.name = layer_name
-            layers.append(layer)
-            # layers.append(inner_layer)
+            recipes.append((layer_name, build))
         cumulative_thickness_orb += outer_layer_thickness
         cumulative_thickness_irb += inner_layer_thickness
         cumulative_thickness_uvb += upper_layer_thickness
         cumulative_thickness_lvb += lower_layer_thickness
-        # build inner layer
 
-        # union layers
+    return recipes
+
+
+def create_layers_from_plasma(
+    radial_build, vertical_build, minor_radius, major_radius, triangularity, elongation, rotation_angle, center_column, layer_count=0
+):
+    recipes = layers_from_plasma_recipes(
+        radial_build, vertical_build, minor_radius, major_radius, triangularity, elongation, rotation_angle, layer_count
+    )
+    return [build() for _, build in recipes]
+
+
+def tokamak_recipes(
+    radial_build, vertical_build, triangularity, rotation_angle, extra_cut_shapes, extra_intersect_shapes, colors
+):
+    """Returns the PartRecipe of each tokamak part in build order along with
+    the tokamak metadata, without building any part."""
+
+    radial_build = RadialBuild(radial_build)
+    vertical_build = RadialBuild(vertical_build)
+    validate_vertical_build_names(vertical_build, "tokamak()")
+
+    inner_equatorial_point = sum_up_to_plasma(radial_build)
+    plasma_radial_thickness = get_plasma_value(radial_build)
+    plasma_vertical_thickness = get_plasma_value(vertical_build)
+    outer_equatorial_point = inner_equatorial_point + plasma_radial_thickness
+
+    major_radius = (outer_equatorial_point + inner_equatorial_point) / 2
+    minor_radius = major_radius - inner_equatorial_point
+
+    elongation = (plasma_vertical_thickness / 2) / minor_radius
+    blanket_rear_wall_end_height = vertical_build.total
+
+    plasma_build = partial(
+        plasma_simplified,
+        major_radius=major_radius,
+        minor_radius=minor_radius,
+        elongation=elongation,
+        triangularity=triangularity,
+        rotation_angle=rotation_angle,
+        name="plasma",
+    )
+
+    layer_recipes = center_column_shield_cylinder_recipes(radial_build, rotation_angle, blanket_rear_wall_end_height)
+    layer_recipes += layers_from_plasma_recipes(
+        radial_build=radial_build,
+        vertical_build=vertical_build,
+        minor_radius=minor_radius,
+        major_radius=major_radius,
+        triangularity=triangularity,
+        elongation=elongation,
+        rotation_angle=rotation_angle,
+        layer_count=len(layer_recipes),
+    )
+
+    recipes = reactor_part_recipes(
+        layer_recipes, plasma_build, extra_cut_shapes, extra_intersect_shapes, colors, "tokamak()"
+    )
+    metadata = {
+        "elongation": elongation,
+        "triangularity": triangularity,
+        "major_radius": major_radius,
+        "minor_radius": minor_radius,
+    }
+    return recipes, metadata
+
+
+def iter_tokamak_parts(
+    radial_build: Sequence[Tuple[str, float] | Tuple[str, float, str]],
+    vertical_build: Sequence[Tuple[str, float] | Tuple[str, float, str]],
+    triangularity: float = 0.55,
+    rotation_angle: float = 180.0,
+    extra_cut_shapes: Sequence[cq.Workplane] = None,
+    extra_intersect_shapes: Sequence[cq.Workplane] = None,
+    colors: dict = None,
+) -> Iterator[Tuple[str, cq.Workplane, cq.Color]]:
+    """
+    Builds the parts of a tokamak one at a time, in the order tokamak() adds
+    them to its assembly, so that each part can be exported or meshed and
+    then dropped before the next is built. The arguments are the same as
+    for tokamak() and are checked before the first part is built.
+
+    When extra_intersect_shapes are given every layer is needed to make the
+    intersections, so the layers are all kept in memory.
+
+    Returns:
+        Iterator: yields the (name, Workplane, cadquery.Color) of each part.
+    """
+    if extra_cut_shapes is None:
+        extra_cut_shapes = []
+    if extra_intersect_shapes is None:
+        extra_intersect_shapes = []
+    if colors is None:
+        colors = {}
 
-    return layers
+    recipes, _ = tokamak_recipes(
+        radial_build, vertical_build, triangularity, rotation_angle, extra_cut_shapes, extra_intersect_shapes, colors
+    )
+    return iter_parts(recipes)
+
+
+def tokamak_vertical_build(radial_build, elongation: float) -> list:
+    """Returns the vertical build tokamak_from_plasma makes from the inner
+    radial build, with a plasma of the given elongation."""
+    radial_build = RadialBuild(radial_build)
+    inner_equatorial_point = sum_up_to_plasma(radial_build)
+    plasma_radial_thickness = get_plasma_value(radial_build)
+    outer_equatorial_point = inner_equatorial_point + plasma_radial_thickness
+
+    # sets major radius and minor radius from equatorial_points to allow a
+    # radial build. This helps avoid the plasma overlapping the center
+    # column and other components
+    major_radius = (outer_equatorial_point + inner_equatorial_point) / 2
+    minor_radius = major_radius - inner_equatorial_point
+
+    # make vertical build from inner radial build
+    pi = get_plasma_index(radial_build)
+    rbi = len(radial_build) - 1 - pi  # number of unique entries in outer or inner radial build
+    # drop any layer names, they are only supported in radial_build not vertical_build
+    upper_vertical_build = [(item[0], item[1]) for item in radial_build[pi - rbi : pi][::-1]]  # get the inner radial build
+
+    plasma_height = 2 * minor_radius * elongation
+    # slice operation reverses the list and removes the last value to avoid two plasmas
+    return upper_vertical_build[::-1] + [(LayerType.PLASMA, plasma_height)] + upper_vertical_build
 
 
 def tokamak_from_plasma(
@@ -177,6 +353,11 @@ def tokamak_from_plasma(
     extra_cut_shapes: Sequence[cq.Workplane] = None,
     extra_intersect_shapes: Sequence[cq.Workplane] = None,
     colors: dict = None,
+    profile: bool = False,
+    compact: bool = False,
+    lazy: bool = False,
+    previous: Assembly = None,
+    timeout: float = None,
 ) -> Assembly:
     """
     Creates a tokamak fusion reactor from a radial build and plasma parameters.
@@ -184,6 +365,7 @@ def tokamak_from_plasma(
     Args:
         radial_build: sequence of tuples containing the radial build of the
             reactor. Each tuple should contain a LayerType, a float and a string.
+            A paramak.RadialBuild can also be given.
         elongation: The elongation of the plasma. Defaults to 2.0.
         triangularity: The triangularity of the plasma. Defaults to 0.55.
         rotation_angle: The rotation angle of the plasma. Defaults to 180.0.
@@ -193,6 +375,25 @@ def tokamak_from_plasma(
             Each dictionary entry should be a key that matches the assembly part name
             (e.g. 'plasma', or 'layer_1') and a tuple of 3 or 4 floats between 0 and 1
             representing the RGB or RGBA values.
+        profile: record the wall time and call count of each build stage and
+            part, the report is attached to the returned assembly as
+            build_report. Can not be used with lazy. Defaults to False.
+        compact: store only the final shape of each part in the assembly,
+            dropping the Workplane construction history to reduce memory
+            use. Defaults to False.
+        lazy: return an assembly whose parts are only built when first
+            accessed, by name, by iterating over the assembly or with
+            Assembly.materialize(). names() and the tokamak metadata are
+            available straight away. Defaults to False.
+        previous: an assembly returned by an earlier call to this builder.
+            Parts built from unchanged inputs are shared from it rather
+            than built again, for example changing the thickness of an
+            outer layer does not rebuild the plasma or the inner layers.
+            Defaults to None.
+        timeout: build in a separate process that is killed after this many
+            seconds, raising a paramak.BuildTimeoutError that names the stage
+            and part that was running. Can not be used with lazy. Defaults
+            to None which builds in this process without a time limit.
 
     Returns:
         CadQuery.Assembly: A CadQuery Assembly object representing the tokamak fusion reactor.
@@ -205,25 +406,8 @@ def tokamak_from_plasma(
     if colors is None:
         colors = {}
 
-    inner_equatorial_point = sum_up_to_plasma(radial_build)
-    plasma_radial_thickness = get_plasma_value(radial_build)
-    outer_equatorial_point = inner_equatorial_point + plasma_radial_thickness
-
-    # sets major radius and minor radius from equatorial_points to allow a
-    # radial build. This helps avoid the plasma overlapping the center
-    # column and other components
-    major_radius = (outer_equatorial_point + inner_equatorial_point) / 2
-    minor_radius = major_radius - inner_equatorial_point
-
-    # make vertical build from inner radial build
-    pi = get_plasma_index(radial_build)
-    rbi = len(radial_build) - 1 - pi  # number of unique entries in outer or inner radial build
-    # drop any layer names, they are only supported in radial_build not vertical_build
-    upper_vertical_build = [(item[0], item[1]) for item in radial_build[pi - rbi : pi][::-1]]  # get the inner radial build
-
-    plasma_height = 2 * minor_radius * elongation
-    # slice operation reverses the list and removes the last value to avoid two plasmas
-    vertical_build = upper_vertical_build[::-1] + [(LayerType.PLASMA, plasma_height)] + upper_vertical_build
+    radial_build = RadialBuild(radial_build)
+    vertical_build = tokamak_vertical_build(radial_build, elongation)
 
     return tokamak(
         radial_build=radial_build,
@@ -232,7 +416,12 @@ def tokamak_from_plasma(
         rotation_angle=rotation_angle,
         extra_cut_shapes=extra_cut_shapes,
         extra_intersect_shapes=extra_intersect_shapes,
-        colors=colors
+        colors=colors,
+        profile=profile,
+        compact=compact,
+        lazy=lazy,
+        previous=previous,
+        timeout=timeout,
     )
 
 
@@ -244,6 +433,11 @@ def tokamak(
     extra_cut_shapes: Sequence[cq.Workplane] = None,
     extra_intersect_shapes: Sequence[cq.Workplane] = None,
     colors: dict = None,
+    profile: bool = False,
+    compact: bool = False,
+    lazy: bool = False,
+    previous: Assembly = None,
+    timeout: float = None,
 ) -> Assembly:
     """
     Creates a tokamak fusion reactor from a radial and vertical build.
@@ -251,8 +445,10 @@ def tokamak(
     Args:
         radial_build: sequence of tuples containing the radial build of the
             reactor. Each tuple should contain a LayerType, a float and the string is optional.
+            A paramak.RadialBuild can also be given.
         vertical_build: sequence of tuples containing the vertical build of the
             reactor. Each tuple should contain a LayerType, a float and the string is optional.
+            A paramak.RadialBuild can also be given.
         triangularity: The triangularity of the plasma. Defaults to 0.55.
         rotation_angle: The rotation angle of the plasma. Defaults to 180.0.
         extra_cut_shapes: A list of extra shapes to cut the reactor with. Defaults to [].
@@ -261,6 +457,25 @@ def tokamak(
             Each dictionary entry should be a key that matches the assembly part name
             (e.g. 'plasma', or 'layer_1') and a tuple of 3 or 4 floats between 0 and 1
             representing the RGB or RGBA values.
+        profile: record the wall time and call count of each build stage and
+            part, the report is attached to the returned assembly as
+            build_report. Can not be used with lazy. Defaults to False.
+        compact: store only the final shape of each part in the assembly,
+            dropping the Workplane construction history to reduce memory
+            use. Defaults to False.
+        lazy: return an assembly whose parts are only built when first
+            accessed, by name, by iterating over the assembly or with
+            Assembly.materialize(). names() and the tokamak metadata are
+            available straight away. Defaults to False.
+        previous: an assembly returned by an earlier call to this builder.
+            Parts built from unchanged inputs are shared from it rather
+            than built again, for example changing the thickness of an
+            outer layer does not rebuild the plasma or the inner layers.
+            Defaults to None.
+        timeout: build in a separate process that is killed after this many
+            seconds, raising a paramak.BuildTimeoutError that names the stage
+            and part that was running. Can not be used with lazy. Defaults
+            to None which builds in this process without a time limit.
 
     Returns:
         CadQuery.Assembly: A CadQuery Assembly object representing the tokamak fusion reactor.
@@ -273,81 +488,57 @@ def tokamak(
     if colors is None:
         colors = {}
 
-    validate_vertical_build_names(vertical_build, "tokamak()")
-
-    inner_equatorial_point = sum_up_to_plasma(radial_build)
-    plasma_radial_thickness = get_plasma_value(radial_build)
-    plasma_vertical_thickness = get_plasma_value(vertical_build)
-    outer_equatorial_point = inner_equatorial_point + plasma_radial_thickness
-
-    major_radius = (outer_equatorial_point + inner_equatorial_point) / 2
-    minor_radius = major_radius - inner_equatorial_point
-
-    elongation = (plasma_vertical_thickness / 2) / minor_radius
-    blanket_rear_wall_end_height = sum([item[1] for item in vertical_build])
-
-    plasma = plasma_simplified(
-        major_radius=major_radius,
-        minor_radius=minor_radius,
-        elongation=elongation,
-        triangularity=triangularity,
-        rotation_angle=rotation_angle,
-    )
+    if timeout is not None:
+        if lazy:
+            raise ValueError("timeout can not be used with lazy, the parts of a lazy assembly are built when accessed")
+        return run_isolated(
+            tokamak,
+            dict(
+                radial_build=radial_build,
+                vertical_build=vertical_build,
+                triangularity=triangularity,
+                rotation_angle=rotation_angle,
+                extra_cut_shapes=extra_cut_shapes,
+                extra_intersect_shapes=extra_intersect_shapes,
+                colors=colors,
+                profile=profile,
+                compact=compact,
+                previous=previous,
+            ),
+            timeout,
+        )
 
-    inner_radial_build = create_center_column_shield_cylinders(
-        radial_build, rotation_angle, blanket_rear_wall_end_height
-    )
+    if profile:
+        if lazy:
+            raise ValueError(
+                "profile can not be used with lazy, the parts of a lazy assembly are built when accessed so "
+                "record them with paramak.record_build() around the accesses instead"
+            )
+        with record_build() as report:
+            my_assembly = tokamak(
+                radial_build=radial_build,
+                vertical_build=vertical_build,
+                triangularity=triangularity,
+                rotation_angle=rotation_angle,
+                extra_cut_shapes=extra_cut_shapes,
+                extra_intersect_shapes=extra_intersect_shapes,
+                colors=colors,
+                compact=compact,
+                lazy=lazy,
+                previous=previous,
+            )
+        my_assembly.build_report = report
+        return my_assembly
 
-    blanket_layers = create_layers_from_plasma(
+    recipes, metadata = tokamak_recipes(
         radial_build=radial_build,
         vertical_build=vertical_build,
-        minor_radius=minor_radius,
-        major_radius=major_radius,
         triangularity=triangularity,
-        elongation=elongation,
         rotation_angle=rotation_angle,
-        center_column=inner_radial_build[0],  # blanket_cutting_cylinder,
-        layer_count=len(inner_radial_build)
-    )
-
-    cut_names, intersect_names, layer_names = get_assembly_names(
-        extra_cut_shapes, extra_intersect_shapes, inner_radial_build, blanket_layers
+        extra_cut_shapes=extra_cut_shapes,
+        extra_intersect_shapes=extra_intersect_shapes,
+        colors=colors,
     )
-
-    validate_unique_assembly_names([*cut_names, *intersect_names, *layer_names, "plasma"], "tokamak()")
-
-    my_assembly = Assembly()
-
-    for entry, name in zip(extra_cut_shapes, cut_names):
-        if not isinstance(entry, cq.Workplane):
-            raise ValueError(f"extra_cut_shapes should only contain cadquery Workplanes, not {type(entry)}")
-        my_assembly.add(entry, name=name, color=cq.Color(*colors.get(name, (0.5,0.5,0.5))))
-
-    # builds up the intersect shapes
-    if len(extra_intersect_shapes) > 0:
-        # makes a union of the the radial build to use as a base for the intersect shapes
-        reactor_compound = inner_radial_build[0]
-        for entry in inner_radial_build[1:] + blanket_layers:
-            reactor_compound = reactor_compound.union(entry)
-
-        # adds the extra intersect shapes to the assembly
-        for entry, name in zip(extra_intersect_shapes, intersect_names):
-            reactor_entry_intersection = entry.intersect(reactor_compound)
-            my_assembly.add(reactor_entry_intersection, name=name, color=cq.Color(*colors.get(name, (0.5,0.5,0.5))))
-
-    # cut the core layers with any extra shapes (a no-op when there are none)
-    cutters = extra_cut_shapes + extra_intersect_shapes
-    for entry, name in zip(inner_radial_build + blanket_layers, layer_names):
-        # TODO track the names of shapes, even when extra shapes are made due to splitting
-        for cutter in cutters:
-            entry = entry.cut(cutter)
-        my_assembly.add(entry, name=name, color=cq.Color(*colors.get(name, (0.5,0.5,0.5))))
-
-    my_assembly.add(plasma, name="plasma", color=cq.Color(*colors.get("plasma", (0.5,0.5,0.5))))
-
-    my_assembly.elongation = elongation
-    my_assembly.triangularity = triangularity
-    my_assembly.major_radius = major_radius
-    my_assembly.minor_radius = minor_radius
-
-    return my_assembly
+    if lazy:
+        return lazy_assembly_from_recipes(recipes, metadata, previous=previous, compact=compact)
+    return assembly_from_recipes(recipes, metadata, previous=previous, compact=compact)
@@ -0,0 +1,185 @@
+# The paramak command line. "paramak build" reads many reactor specs from a
+# JSON, JSON lines or YAML file (or stdin) and builds them all in one pool of
+# worker processes, so the cadquery import is paid once per worker rather
+# than once per design. "paramak serve" keeps such a pool running behind a
+# local HTTP server.
+
+import argparse
+import json
+import os
+import sys
+from itertools import chain
+from pathlib import Path
+
+from .specs import builder_name, spec_hash, to_json
+from .sweep import _ResultWriter, run_cases
+
+# keys of a spec that are not builder arguments
+SPEC_KEYS = ("builder", "name", "outputs")
+
+
+def load_specs(text: str, format: str = None) -> list:
+    """Reads reactor specs from the text of a spec file.
+
+    Each spec is a mapping with the "builder" name, an optional "name", an
+    optional list of "outputs" filenames and the builder arguments, for
+    example radial_build, vertical_build, triangularity and
+    extra_cut_shapes. The text can hold a list of specs, a mapping with a
+    "specs" list or a single spec, as JSON or YAML, or one spec per line as
+    JSON lines.
+
+    Args:
+        text: the content of the spec file.
+        format: "json", "jsonl" or "yaml". Defaults to None which tries JSON,
+            then JSON lines and then YAML.
+
+    Returns:
+        list: the specs.
+    """
+    if format is None:
+        try:
+            return _spec_list(json.loads(text))
+        except json.JSONDecodeError:
+            pass
+        try:
+            return load_specs(text, "jsonl")
+        except json.JSONDecodeError:
+            return load_specs(text, "yaml")
+    if format == "json":
+        return _spec_list(json.loads(text))
+    if format == "jsonl":
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if format == "yaml":
+        try:
+            import yaml
+        except ImportError as error:
+            raise ImportError("reading YAML specs requires pyyaml, pip install pyyaml") from error
+        return _spec_list(yaml.safe_load(text))
+    raise ValueError(f'format should be one of "json", "jsonl" or "yaml", not {format}')
+
+
+def _spec_list(data) -> list:
+    if isinstance(data, dict):
+        return data["specs"] if "specs" in data else [data]
+    return list(data)
+
+
+def _read_specs(filenames) -> list:
+    specs = []
+    for filename in filenames:
+        if filename == "-":
+            specs.extend(load_specs(sys.stdin.read()))
+            continue
+        suffix = Path(filename).suffix.lower()
+        format = {".json": "json", ".jsonl": "jsonl", ".yaml": "yaml", ".yml": "yaml"}.get(suffix)
+        specs.extend(load_specs(Path(filename).read_text(), format))
+    return specs
+
+
+def spec_job(spec: dict, index: int, output_directory=None) -> tuple:
+    """Returns the (name, builder, params, filenames) of a spec, output
+    filenames are taken relative to output_directory.
+
+    Raises:
+        ValueError: if the spec is not a mapping, or has no builder or an
+            unknown builder.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"spec_{index} should be a mapping of the builder and its arguments, not {spec!r}")
+    name = str(spec.get("name", f"spec_{index}"))
+    if "builder" not in spec:
+        raise ValueError(f"spec {name} has no builder")
+    params = {key: value for key, value in spec.items() if key not in SPEC_KEYS}
+    builder = builder_name(spec["builder"])
+    filenames = [str(Path(output_directory or ".") / filename) for filename in spec.get("outputs", [])]
+    return name, builder, params, filenames
+
+
+def build(args) -> int:
+    jobs = {}
+    # specs that can not be built are recorded as failed and the other specs
+    # are still built
+    invalid = {}
+    for index, spec in enumerate(_read_specs(args.specs)):
+        try:
+            jobs[index] = spec_job(spec, index, args.output_dir)
+        except ValueError as error:
+            spec = spec if isinstance(spec, dict) else {}
+            params = {key: value for key, value in spec.items() if key not in SPEC_KEYS}
+            jobs[index] = (str(spec.get("name", f"spec_{index}")), spec.get("builder"), params, [])
+            invalid[index] = {"status": "failed", "time": None, "error": f"{type(error).__name__}: {error}"}
+
+    runnable = [
+        (index, builder, params, filenames)
+        for index, (_, builder, params, filenames) in jobs.items()
+        if index not in invalid
+    ]
+
+    writer = _ResultWriter(args.summary) if args.summary else None
+    records = []
+    try:
+        for index, result in chain(invalid.items(), run_cases(runnable, args.workers, args.timeout)):
+            name, builder, params, _ = jobs[index]
+            record = {
+                "case": index,
+                "name": name,
+                "spec_hash": None if index in invalid else spec_hash(builder, params),
+                "builder": builder,
+                "params": to_json(params),
+                **result,
+            }
+            records.append(record)
+            if writer is not None:
+                writer.write(record)
+            if not args.quiet:
+                time_taken = "-" if record["time"] is None else f"{record['time']:.2f}s"
+                message = record.get("error") or " ".join(record["outputs"])
+                print(f"{record['status']:8} {time_taken:>9} {name} {message}", file=sys.stderr)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    built = [record for record in records if record["status"] == "ok"]
+    if not args.quiet:
+        total = sum(record["time"] for record in built)
+        print(f"built {len(built)} of {len(records)} specs, {total:.2f}s of build time", file=sys.stderr)
+    return 0 if len(built) == len(records) else 1
+
+
+def serve(args) -> int:
+    from .server import serve
+
+    print(f"paramak build server on {args.unix_socket or f'http://{args.host}:{args.port}'}", file=sys.stderr)
+    serve(args.host, args.port, args.unix_socket, args.workers, args.cache_dir)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="paramak", description="Builds fusion reactor CAD models from specs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="build reactors from JSON, JSON lines or YAML spec files")
+    build_parser.add_argument("specs", nargs="*", default=["-"], help='spec files, "-" or none reads stdin')
+    build_parser.add_argument(
+        "-j", "--workers", type=int, default=os.cpu_count(), help="number of worker processes, defaults to one per CPU"
+    )
+    build_parser.add_argument("-t", "--timeout", type=float, default=None, help="seconds before a build is stopped")
+    build_parser.add_argument("-o", "--output-dir", default=None, help="directory the spec outputs are written to")
+    build_parser.add_argument("-s", "--summary", default=None, help="JSON lines or .csv file of per-spec timings")
+    build_parser.add_argument("-q", "--quiet", action="store_true", help="do not print progress")
+    build_parser.set_defaults(function=build)
+
+    serve_parser = subparsers.add_parser("serve", help="run a local build server with warm workers")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    serve_parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    serve_parser.add_argument("--unix-socket", default=None, help="Unix socket to listen on instead of a port")
+    serve_parser.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes")
+    serve_parser.add_argument("--cache-dir", default=None, help="directory builds are cached in")
+    serve_parser.set_defaults(function=serve)
+
+    args = parser.parse_args(argv)
+    return args.function(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+# Predicts the wall time and peak memory of a reactor build from its spec,
+# so that schedulers can pack builds before running them. The model is
+# calibrated from the benchmark suite's recorded baseline, see calibrate().
+
+import json
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from .specs import builder_name
+from .utils import LayerType
+
+CALIBRATION_PATH = Path(__file__).parent / "cost_calibration.json"
+
+# the number of solid layers in the radial build of the benchmark reactors of
+# benchmarks/utils.py, tokamak_with_cutters has three and
+# tokamak_with_layers(n) has a center column layer and n layers each side of
+# the plasma
+_CUTTERS_BENCHMARK_SOLIDS = 3
+# the rotation angle of the memory benchmark example reactors
+_MEMORY_BENCHMARK_ANGLE = 180.0
+# the least growth of the build time with the rotation angle, time grows by
+# (angle / 90) ** ANGLE_EXPONENT_PRIOR. The benchmarks revolving the layers
+# with and without cutters from 45 to 360 degrees change by less than the
+# run to run noise of the benchmark machine, so the fitted exponent is near
+# zero, while the cut layers do grow with the angle. This keeps wider builds
+# ahead of narrower ones when a sweep orders its cases
+ANGLE_EXPONENT_PRIOR = 0.1
+
+
+class CostEstimate(NamedTuple):
+    time: float
+    peak_memory: float
+
+
+def calibrate(baseline: dict) -> dict:
+    """Fits the cost model to a benchmark baseline, as stored in
+    benchmarks/baseline.json.
+
+    The "layers" and "cutters" scaling timings give the time of each solid
+    layer and of cutting each layer with each cutter, the
+    "cutters_rotation_angle" fit gives how the time grows with the angle,
+    never less than ANGLE_EXPONENT_PRIOR, and the "tf_coils" fit is used for
+    building toroidal field coils. The "memory" results of the example
+    reactors give the memory of the interpreter and of each part. The time
+    of the layers grows in proportion to their number, so the fixed time
+    base_seconds is near zero.
+
+    Returns:
+        dict: the calibration used by estimate_cost.
+    """
+    scaling = baseline["scaling"]
+
+    layers = scaling["layers"]
+    solids = [1 + 2 * size for size in layers["sizes"]]
+    seconds_per_layer, base_seconds = np.polyfit(solids, layers["timings"], 1)
+
+    cutters = scaling["cutters"]
+    seconds_per_cutter = np.polyfit(cutters["sizes"], cutters["timings"], 1)[0]
+
+    memory = baseline["memory"].values()
+    bytes_per_part = max(
+        (result["estimated_bytes"] + result["retained_estimated_bytes"]) / result["parts"] for result in memory
+    )
+
+    return {
+        "base_seconds": max(float(base_seconds), 0.0),
+        "seconds_per_layer": max(float(seconds_per_layer), 0.0),
+        "seconds_per_cutter_layer": max(float(seconds_per_cutter) / _CUTTERS_BENCHMARK_SOLIDS, 0.0),
+        "angle_exponent": max(scaling["cutters_rotation_angle"]["exponent"], ANGLE_EXPONENT_PRIOR),
+        "coil_coefficient": scaling["tf_coils"]["coefficient"],
+        "coil_exponent": scaling["tf_coils"]["exponent"],
+        "base_memory": min(result["peak_rss"] for result in memory),
+        "bytes_per_part": bytes_per_part / _MEMORY_BENCHMARK_ANGLE,
+    }
+
+
+def load_calibration(filename=CALIBRATION_PATH) -> dict:
+    """Reads a calibration written from calibrate()."""
+    with open(filename) as file:
+        return json.load(file)
+
+
+def _is_solid(layer) -> bool:
+    return layer[0] in (LayerType.SOLID, LayerType.SOLID.value)
+
+
+def _solid_layers(radial_build) -> tuple:
+    """The number of solid layers before and after the plasma."""
+    before = after = 0
+    found_plasma = False
+    for layer in radial_build:
+        if layer[0] in (LayerType.PLASMA, LayerType.PLASMA.value):
+            found_plasma = True
+        elif _is_solid(layer):
+            if found_plasma:
+                after += 1
+            else:
+                before += 1
+    return before, after
+
+
+def _solid_count(shape) -> int:
+    """The number of solids an extra shape adds, coils given in a JSON spec
+    count one solid per azimuthal placement angle."""
+    if isinstance(shape, dict):
+        return len(shape.get("azimuthal_placement_angles", [None]))
+    return max(len(shape.solids().vals()), 1)
+
+
+def estimate_cost(builder, calibration: dict = None, **params) -> CostEstimate:
+    """Predicts the wall time and peak memory of building a reactor.
+
+    The time is that of the solid layers plus that of cutting each layer
+    with each solid of the extra shapes, both growing with the rotation
+    angle, plus the time to build any toroidal field coils given in a JSON
+    spec. The memory is that of the interpreter plus the B-rep of each part.
+
+    The builder sets which parts the layers make. A tokamak joins each layer
+    after the plasma with the layer it mirrors before the plasma into one
+    part, the layers left over making center column cylinders, while a
+    spherical tokamak makes a center column cylinder of each layer before
+    the plasma and cuts each layer after it with the center column. The
+    vertical build only sets the layer thicknesses above and below the
+    plasma, so it adds no parts.
+
+    Args:
+        builder: a reactor builder, for example paramak.tokamak, or its name.
+        calibration: the cost model coefficients from calibrate(). Defaults
+            to None which uses the calibration shipped with paramak, fitted
+            to the benchmark baseline.
+        params: the builder arguments, in their Python or JSON form.
+
+    Returns:
+        CostEstimate: the predicted "time" in seconds and "peak_memory" in bytes.
+    """
+    name = builder_name(builder)
+    if calibration is None:
+        calibration = load_calibration()
+
+    before, after = _solid_layers(params.get("radial_build", []))
+    layers = before + after
+    if name in ("spherical_tokamak", "spherical_tokamak_from_plasma"):
+        layer_parts, center_column_cuts = layers, after
+    else:
+        layer_parts, center_column_cuts = max(before, after), 0
+    extra_shapes = list(params.get("extra_cut_shapes") or []) + list(params.get("extra_intersect_shapes") or [])
+    cutter_solids = sum(_solid_count(shape) for shape in extra_shapes)
+    # coils given in a JSON spec are built as part of the build
+    coils = [
+        _solid_count(shape)
+        for shape in extra_shapes
+        if isinstance(shape, dict) and "azimuthal_placement_angles" in shape
+    ]
+    angle = float(params.get("rotation_angle", 180.0))
+    angle_factor = (angle / 90.0) ** calibration["angle_exponent"]
+
+    time = angle_factor * (
+        calibration["base_seconds"]
+        + calibration["seconds_per_layer"] * layers
+        + calibration["seconds_per_cutter_layer"] * (cutter_solids * layers + center_column_cuts)
+    )
+    time += sum(calibration["coil_coefficient"] * count ** calibration["coil_exponent"] for count in coils)
+
+    parts = layer_parts + len(extra_shapes) + 1
+    peak_memory = calibration["base_memory"] + calibration["bytes_per_part"] * parts * angle
+    return CostEstimate(time=float(time), peak_memory=float(peak_memory))
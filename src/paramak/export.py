@@ -0,0 +1,94 @@
+# Writes assemblies and their parts to files. export_part runs in worker
+# processes so it only takes picklable arguments.
+
+import hashlib
+from pathlib import Path
+
+import cadquery as cq
+
+from .mesh import MESH_FORMATS, tessellate_shape, write_stl
+from .profiling import stage
+from .serialization import shape_to_bytes
+
+PART_FORMATS = ("step", "brep", "stl")
+
+
+def file_hash(filename) -> str:
+    """Returns the sha256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(filename, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_hash(shape: cq.Shape) -> str:
+    """Returns the sha256 hex digest of a shape's B-rep, identical shapes
+    have the same hash."""
+    return hashlib.sha256(shape_to_bytes(shape)).hexdigest()
+
+
+def source_hash(part_hash: str, format: str, tolerance: float, angular_tolerance: float) -> str:
+    """Returns a digest of everything a part file written in format depends
+    on, the part's content hash and for STL files the tolerances."""
+    if format != "stl":
+        return part_hash
+    return hashlib.sha256(f"{part_hash} {tolerance!r} {angular_tolerance!r}".encode("utf-8")).hexdigest()
+
+
+def export_part(shape: cq.Shape, stem, formats, tolerance: float, angular_tolerance: float, mesh=None) -> dict:
+    """Writes a shape to stem.<format> for each format.
+
+    Args:
+        shape: the shape to write, already moved to its assembly location.
+        stem: the filename without the extension.
+        formats: any of "step", "brep" and "stl".
+        tolerance: the linear deflection used for STL files.
+        angular_tolerance: the angular deflection used for STL files.
+        mesh: an existing (vertices, triangles) tessellation of the shape to
+            use for STL files. Defaults to None which tessellates the shape.
+
+    Returns:
+        dict: the sha256 digest of each file written, keyed by format.
+    """
+    # writing STEP adds data to the B-rep, a copy keeps the part unchanged
+    # so that its content hash stays the same
+    shape = shape.copy()
+    hashes = {}
+    for format in formats:
+        filename = Path(f"{stem}.{format}")
+        with stage("export", filename.stem, format=format):
+            if format == "step":
+                shape.exportStep(str(filename))
+            elif format == "brep":
+                shape.exportBrep(str(filename))
+            elif format == "stl":
+                if mesh is None:
+                    mesh = tessellate_shape(shape, tolerance, angular_tolerance)
+                write_stl(filename, {filename.stem: mesh})
+            else:
+                raise ValueError(f"format should be one of {PART_FORMATS}, not {format}")
+        hashes[format] = file_hash(filename)
+    return hashes
+
+
+def export_assembly(assembly, filename) -> str:
+    """Writes a whole assembly to filename, choosing the writer from the
+    extension: .paramak files with Assembly.save, .stl, .obj and .vtk meshes
+    with Assembly.export_mesh, .brep files as a single compound of the parts
+    and anything else (for example .step) with cadquery's Assembly.export.
+
+    Returns:
+        str: the filename written.
+    """
+    filename = str(filename)
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension == "paramak":
+        assembly.save(filename)
+    elif extension in MESH_FORMATS:
+        assembly.export_mesh(filename)
+    elif extension == "brep":
+        assembly.toCompound().exportBrep(filename)
+    else:
+        assembly.export(filename)
+    return filename
@@ -0,0 +1,394 @@
+# Checks reactor specs for geometry that would fail or come out wrong deep
+# inside OCC, before any CAD work. The 2D (R, Z) profile of each part is
+# computed from the plasma shape and the builder's own part recipes, and the
+# profiles are checked with NumPy in milliseconds.
+
+import inspect
+from typing import NamedTuple
+
+import numpy as np
+
+from .assemblies.spherical_tokamak import (
+    blanket_layers_after_plasma_recipes,
+    spherical_tokamak_vertical_build,
+)
+from .assemblies.spherical_tokamak import center_column_shield_cylinder_recipes as spherical_cylinder_recipes
+from .assemblies.tokamak import center_column_shield_cylinder_recipes as tokamak_cylinder_recipes
+from .assemblies.tokamak import layers_from_plasma_recipes, tokamak_vertical_build
+from .specs import BUILDERS, WORKPLANES, builder_name
+from .utils import RadialBuild, get_plasma_value, sum_up_to_gap_before_plasma, sum_up_to_plasma
+
+# parts that do not overlap but are closer than this are reported as touching
+_TOLERANCE = 1e-6
+# the angles of the upper, inner, lower, outer and again upper thicknesses of
+# a tokamak blanket layer
+_TOKAMAK_ANGLES = [-270, -180, -90, 0, 90]
+_COIL_WORKPLANES = ("poloidal_field_coil", "poloidal_field_coil_case")
+
+
+class Issue(NamedTuple):
+    """A geometry problem found by check_feasibility.
+
+    Attributes:
+        check: the kind of problem, "negative_radius",
+            "self_intersecting_offset", "overlapping_layers" or
+            "coil_clearance".
+        part: the name of the assembly part with the problem.
+        message: a description of the problem.
+    """
+
+    check: str
+    part: str
+    message: str
+
+
+class _Shape(NamedTuple):
+    major_radius: float
+    minor_radius: float
+    triangularity: float
+    elongation: float
+
+
+def _offset_curve(shape: _Shape, angles, offsets) -> np.ndarray:
+    """The (R, Z) points at the given distances from the plasma boundary
+    along its outward normal, as blanket_from_plasma makes them."""
+    theta = np.radians(angles)
+    phi = theta + shape.triangularity * np.sin(theta)
+    r = shape.major_radius + shape.minor_radius * np.cos(phi)
+    z = shape.elongation * shape.minor_radius * np.sin(theta)
+    dr = -shape.minor_radius * np.sin(phi) * (1 + shape.triangularity * np.cos(theta))
+    dz = shape.elongation * shape.minor_radius * np.cos(theta)
+    norm = np.hypot(dr, dz)
+    return np.stack([r + offsets * dz / norm, z - offsets * dr / norm], axis=1)
+
+
+def _rectangle(r_min, r_max, z_min, z_max) -> np.ndarray:
+    return np.array([[r_min, z_min], [r_max, z_min], [r_max, z_max], [r_min, z_max]], dtype=float)
+
+
+def _edges(points, closed=True):
+    if closed:
+        return points, np.roll(points, -1, axis=0)
+    return points[:-1], points[1:]
+
+
+def _cross(origin, a, b):
+    return (a[..., 0] - origin[..., 0]) * (b[..., 1] - origin[..., 1]) - (a[..., 1] - origin[..., 1]) * (
+        b[..., 0] - origin[..., 0]
+    )
+
+
+def _crossings(a_edges, b_edges) -> np.ndarray:
+    """Whether each edge of a properly crosses each edge of b, edges that
+    only touch do not count."""
+    a0, a1 = (end[:, None] for end in a_edges)
+    b0, b1 = (end[None, :] for end in b_edges)
+    return (_cross(a0, a1, b0) * _cross(a0, a1, b1) < 0) & (_cross(b0, b1, a0) * _cross(b0, b1, a1) < 0)
+
+
+def _self_intersects(points, closed) -> bool:
+    edges = _edges(points, closed)
+    crossings = np.triu(_crossings(edges, edges), k=2)
+    if closed:
+        # the first and last edges of a closed curve are neighbours
+        crossings[0, -1] = False
+    return bool(crossings.any())
+
+
+def _contains(polygon, points) -> np.ndarray:
+    """Whether each point is inside the polygon, by ray casting."""
+    start, end = (corner[None, :] for corner in _edges(polygon))
+    r, z = points[:, None, 0], points[:, None, 1]
+    spans = (start[..., 1] > z) != (end[..., 1] > z)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing_r = start[..., 0] + (z - start[..., 1]) * (end[..., 0] - start[..., 0]) / (end[..., 1] - start[..., 1])
+    return (spans & (r < crossing_r)).sum(axis=1) % 2 == 1
+
+
+def _point_edge_distance(points, edges) -> float:
+    start, end = edges
+    direction = end - start
+    length_squared = np.maximum((direction**2).sum(axis=1), _TOLERANCE)
+    t = np.clip(((points[:, None] - start[None]) * direction[None]).sum(axis=2) / length_squared, 0, 1)
+    nearest = start[None] + t[..., None] * direction[None]
+    return float(np.sqrt(((points[:, None] - nearest) ** 2).sum(axis=2)).min())
+
+
+def _boundary_distance(a, b) -> float:
+    return min(_point_edge_distance(a, _edges(b)), _point_edge_distance(b, _edges(a)))
+
+
+def _boundaries_cross(a, b) -> bool:
+    return bool(_crossings(_edges(a), _edges(b)).any())
+
+
+def _overlaps(a, b) -> bool:
+    return _boundaries_cross(a, b) or bool(_contains(a, b[:1]).any() or _contains(b, a[:1]).any())
+
+
+def _distance(polygon, part) -> float:
+    """The distance between a polygon and a part given as its (outline,
+    hole) polygons, None if they overlap."""
+    outline, hole = part
+    if hole is not None and _contains(hole, polygon).all() and not _boundaries_cross(polygon, hole):
+        return _boundary_distance(polygon, hole)
+    if _overlaps(polygon, outline):
+        return None
+    return _boundary_distance(polygon, outline)
+
+
+def _clip_radius(polygon, radius) -> np.ndarray:
+    """The part of a polygon at R >= radius."""
+    clipped = []
+    for start, end in zip(*_edges(polygon)):
+        if start[0] >= radius:
+            clipped.append(start)
+        if (start[0] >= radius) != (end[0] >= radius):
+            clipped.append(start + (radius - start[0]) / (end[0] - start[0]) * (end - start))
+    return np.array(clipped, dtype=float).reshape(-1, 2)
+
+
+def _cylinders(recipes) -> dict:
+    """The profiles of the center column shield cylinders of recipes."""
+    profiles = {}
+    for name, build in recipes:
+        arguments = build.keywords
+        location, value = arguments.get("reference_point", ("center", 0))
+        center = value if location == "center" else value + arguments["height"] / 2
+        profiles[name] = _rectangle(
+            arguments["inner_radius"],
+            arguments["inner_radius"] + arguments["thickness"],
+            center - arguments["height"] / 2,
+            center + arguments["height"] / 2,
+        )
+    return profiles
+
+
+class _Layer(NamedTuple):
+    # the smallest R of the offsets from the plasma, before the points at
+    # R <= 0 are dropped
+    smallest_radius: float
+    # the closed profiles that blanket_from_plasma revolves for the layer
+    profiles: list
+    # the polygon around the layer and the polygon of the hole in it, or None
+    outline: np.ndarray
+    hole: np.ndarray
+
+
+def _built_profile(inner_curve, outer_curve, connect_to_center=False) -> np.ndarray:
+    """The profile blanket_from_plasma makes from its offset curves, which
+    drops the points at R <= 0."""
+    curves = [inner_curve[inner_curve[:, 0] > 0], outer_curve[outer_curve[:, 0] > 0][::-1]]
+    if connect_to_center:
+        curves = [np.concatenate([[[0, curve[0, 1]]], curve, [[0, curve[-1, 1]]]]) for curve in curves]
+    return np.concatenate(curves)
+
+
+def _tokamak_profiles(shape, radial_build, vertical_build, num_points):
+    """The center column cylinder and blanket _Layer profiles of a tokamak."""
+    cylinders = _cylinders(tokamak_cylinder_recipes(radial_build, 360, vertical_build.total))
+    recipes = layers_from_plasma_recipes(
+        radial_build,
+        vertical_build,
+        shape.minor_radius,
+        shape.major_radius,
+        shape.triangularity,
+        shape.elongation,
+        360,
+        layer_count=len(cylinders),
+    )
+    # layer_from_plasma joins an outer half from 90 to -90 degrees to an
+    # inner half from -90 to -270, interpolating the upper, outer, lower and
+    # inner thicknesses and offsets
+    halves = (np.linspace(90, -90, num_points), np.linspace(-90, -270, num_points))
+    layers = {}
+    for name, build in recipes:
+        upper, outer, lower, inner = build.keywords["thicknesses"]
+        upper_offset, outer_offset, lower_offset, inner_offset = build.keywords["offsets"]
+        curves = []
+        for angles in halves:
+            offsets = np.interp(
+                angles, _TOKAMAK_ANGLES, [upper_offset, inner_offset, lower_offset, outer_offset, upper_offset]
+            )
+            thicknesses = np.interp(angles, _TOKAMAK_ANGLES, [upper, inner, lower, outer, upper])
+            curves.append((_offset_curve(shape, angles, offsets), _offset_curve(shape, angles, offsets + thicknesses)))
+        (outer_half_inner, outer_half_outer), (inner_half_inner, inner_half_outer) = curves
+        layers[name] = _Layer(
+            smallest_radius=min(curve[:, 0].min() for pair in curves for curve in pair),
+            profiles=[_built_profile(*pair) for pair in curves],
+            outline=np.concatenate([outer_half_outer, inner_half_outer[1:-1]]),
+            hole=np.concatenate([outer_half_inner, inner_half_inner[1:-1]]),
+        )
+    return cylinders, layers
+
+
+def _spherical_tokamak_profiles(shape, radial_build, vertical_build, num_points):
+    """The center column cylinder and blanket _Layer profiles of a
+    spherical tokamak."""
+    cylinders = _cylinders(spherical_cylinder_recipes(radial_build, vertical_build, 360))
+    recipes = blanket_layers_after_plasma_recipes(
+        radial_build,
+        vertical_build,
+        shape.minor_radius,
+        shape.major_radius,
+        shape.triangularity,
+        shape.elongation,
+        360,
+        None,
+        layer_count=len(cylinders),
+    )
+    # the layers are connected to the center and then the center column is
+    # cut from them
+    cut_radius = sum_up_to_gap_before_plasma(radial_build)
+    angles = np.linspace(-90, 90, num_points)
+    layers = {}
+    for name, build in recipes:
+        offsets = np.interp(angles, [-90, 0, 90], build.keywords["offsets"])
+        thicknesses = np.interp(angles, [-90, 0, 90], build.keywords["thicknesses"])
+        inner_curve = _offset_curve(shape, angles, offsets)
+        outer_curve = _offset_curve(shape, angles, offsets + thicknesses)
+        profile = _built_profile(inner_curve, outer_curve, connect_to_center=True)
+        layers[name] = _Layer(
+            smallest_radius=min(inner_curve[:, 0].min(), outer_curve[:, 0].min()),
+            profiles=[profile],
+            outline=_clip_radius(profile, cut_radius),
+            hole=None,
+        )
+    return cylinders, layers
+
+
+def _coils(params) -> list:
+    """The (name, profile) of each poloidal field coil given in its JSON
+    form in the extra shapes, named as they are in the assembly."""
+    coils = []
+    for key in ("extra_cut_shapes", "extra_intersect_shapes"):
+        for index, shape in enumerate(params.get(key) or []):
+            if not isinstance(shape, dict) or shape.get("workplane") not in _COIL_WORKPLANES:
+                continue
+            arguments = inspect.signature(WORKPLANES[shape["workplane"]]).bind_partial(
+                **{name: value for name, value in shape.items() if name != "workplane"}
+            )
+            arguments.apply_defaults()
+            arguments = arguments.arguments
+            if shape["workplane"] == "poloidal_field_coil":
+                half_width, half_height = arguments["width"] / 2, arguments["height"] / 2
+            else:
+                half_width = arguments["coil_width"] / 2 + arguments["casing_thickness"]
+                half_height = arguments["coil_height"] / 2 + arguments["casing_thickness"]
+            r, z = arguments["center_point"]
+            name = f"{arguments['name']}_{index + 1}"
+            coils.append((name, _rectangle(r - half_width, r + half_width, z - half_height, z + half_height)))
+    return coils
+
+
+def check_feasibility(builder, clearance: float = 0.0, num_points: int = 200, **params) -> list:
+    """Checks the 2D profiles of a reactor for geometry that would make its
+    build fail or come out wrong, without any CAD work.
+
+    The checks are:
+
+    - "negative_radius": a blanket layer offset from the plasma reaches R <= 0,
+      those points are dropped from the profile when it is built.
+    - "self_intersecting_offset": the profile of a blanket layer, as
+      blanket_from_plasma makes it from the offsets, crosses itself so it
+      can not be revolved.
+    - "overlapping_layers": a blanket layer or the plasma reaches into a
+      center column shield cylinder of a tokamak.
+    - "coil_clearance": a poloidal field coil, given in its JSON form in the
+      extra shapes, overlaps or touches a part or is closer to it than
+      clearance. Extra shapes given as Workplanes are not checked.
+
+    Args:
+        builder: a reactor builder, for example paramak.tokamak, or its name.
+        clearance: the smallest allowed distance between a coil and the other
+            parts in cm. Defaults to 0 which only reports parts that
+            overlap or touch.
+        num_points: the number of points along each offset from the plasma,
+            as in blanket_from_plasma. Defaults to 200.
+        params: the builder arguments, in their Python or JSON form. The
+            builds should be valid, see paramak.validation.
+
+    Returns:
+        list: an Issue for each problem found, empty if none were.
+    """
+    name = builder_name(builder)
+    arguments = inspect.signature(BUILDERS[name]).bind_partial(**params)
+    arguments.apply_defaults()
+    params = arguments.arguments
+
+    radial_build = RadialBuild(params["radial_build"])
+    if name == "tokamak_from_plasma":
+        vertical_build = tokamak_vertical_build(radial_build, params["elongation"])
+    elif name == "spherical_tokamak_from_plasma":
+        vertical_build = spherical_tokamak_vertical_build(radial_build, params["elongation"])
+    else:
+        vertical_build = params["vertical_build"]
+    vertical_build = RadialBuild(vertical_build)
+
+    minor_radius = get_plasma_value(radial_build) / 2
+    shape = _Shape(
+        major_radius=sum_up_to_plasma(radial_build) + minor_radius,
+        minor_radius=minor_radius,
+        triangularity=params["triangularity"],
+        elongation=get_plasma_value(vertical_build) / 2 / minor_radius,
+    )
+    if name.startswith("spherical"):
+        cylinders, layers = _spherical_tokamak_profiles(shape, radial_build, vertical_build, num_points)
+    else:
+        cylinders, layers = _tokamak_profiles(shape, radial_build, vertical_build, num_points)
+    plasma = _offset_curve(shape, np.linspace(0, 360, num_points, endpoint=False), 0.0)
+
+    issues = []
+    for part, layer in layers.items():
+        if layer.smallest_radius <= 0:
+            issues.append(
+                Issue(
+                    "negative_radius",
+                    part,
+                    f"{part} reaches R = {layer.smallest_radius:.1f}, the points at R <= 0 are dropped from its "
+                    "profile",
+                )
+            )
+        if any(_self_intersects(profile, closed=True) for profile in layer.profiles):
+            issues.append(
+                Issue(
+                    "self_intersecting_offset",
+                    part,
+                    f"the profile of {part} crosses itself, its offsets from the plasma can not be revolved",
+                )
+            )
+
+    if not name.startswith("spherical"):
+        # the blanket layers of a spherical tokamak are cut by the center
+        # column so can reach into it
+        outlines = {part: layer.outline for part, layer in layers.items()}
+        for part, polygon in {**outlines, "plasma": plasma}.items():
+            for cylinder, rectangle in cylinders.items():
+                (inner_radius, bottom), (outer_radius, top) = rectangle[0], rectangle[2]
+                inside = (polygon[:, 1] > bottom) & (polygon[:, 1] < top) & (polygon[:, 0] < outer_radius - _TOLERANCE)
+                inside &= polygon[:, 0] > inner_radius + _TOLERANCE
+                if inside.any():
+                    issues.append(
+                        Issue(
+                            "overlapping_layers",
+                            part,
+                            f"{part} reaches R = {polygon[inside, 0].min():.1f} inside {cylinder}, which ends at "
+                            f"R = {outer_radius:.1f}",
+                        )
+                    )
+
+    for coil, rectangle in _coils(params):
+        parts = {part: (rectangle, None) for part, rectangle in cylinders.items()}
+        parts.update({part: (layer.outline, layer.hole) for part, layer in layers.items()})
+        parts["plasma"] = (plasma, None)
+        for part, outline_and_hole in parts.items():
+            distance = _distance(rectangle, outline_and_hole)
+            if distance is None:
+                issues.append(Issue("coil_clearance", coil, f"{coil} overlaps {part}"))
+            elif distance <= _TOLERANCE:
+                issues.append(Issue("coil_clearance", coil, f"{coil} touches {part}"))
+            elif distance < clearance:
+                issues.append(
+                    Issue("coil_clearance", coil, f"{coil} is {distance:.1f} cm from {part}, less than {clearance} cm")
+                )
+    return issues
@@ -0,0 +1,125 @@
+# Runs builds in a separate process that can be killed. OCC booleans can not
+# be interrupted from Python, so a build that runs past its timeout is
+# stopped by killing its process. The worker reports each stage as it starts
+# so the error can name the stage and part that was running.
+
+import asyncio
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import CancelledError
+
+from .profiling import listen_stages, worker_function, worker_result
+
+# asyncio.TimeoutError is the builtin TimeoutError from Python 3.11
+_TIMEOUT_ERRORS = (TimeoutError,) if asyncio.TimeoutError is TimeoutError else (TimeoutError, asyncio.TimeoutError)
+
+# seconds between checks of the cancel event of a build
+_CANCEL_INTERVAL = 0.05
+
+
+class BuildTimeoutError(*_TIMEOUT_ERRORS):
+    """Raised when a build runs past its timeout. It is a TimeoutError and
+    an asyncio.TimeoutError.
+
+    Attributes:
+        timeout: the timeout in seconds.
+        stages: the (stage, part) of each stage that was running when the
+            build was stopped, outermost first.
+        stage: the innermost running stage, or None if no stage had started.
+        part: the part of the innermost running stage.
+    """
+
+    def __init__(self, timeout: float, stages=()):
+        self.timeout = timeout
+        self.stages = list(stages)
+        self.stage, self.part = self.stages[-1] if self.stages else (None, None)
+        if self.stage is None:
+            where = "before any build stage started"
+        elif self.part is None:
+            where = f"in the {self.stage} stage"
+        else:
+            where = f"in the {self.stage} stage of {self.part}"
+        super().__init__(f"build did not finish within {timeout} seconds, it was stopped {where}")
+
+    def __reduce__(self):
+        return type(self), (self.timeout, self.stages)
+
+
+def _run_worker(connection, function, kwargs):
+    def listener(event, name, part):
+        connection.send((event, name, part))
+
+    try:
+        with listen_stages(listener):
+            result = function(**kwargs)
+        connection.send(("result", result, None))
+    except Exception as error:
+        try:
+            connection.send(("error", error, traceback.format_exc()))
+        except Exception:
+            # some OCC exceptions can not be pickled
+            connection.send(("error", RuntimeError(f"{type(error).__name__}: {error}"), traceback.format_exc()))
+    finally:
+        connection.close()
+
+
+def run_isolated(function, kwargs: dict, timeout: float = None, cancel=None):
+    """Calls function(**kwargs) in a new process and returns its result.
+
+    Args:
+        function: a picklable function, for example a reactor builder.
+        kwargs: the picklable keyword arguments of the function.
+        timeout: seconds after which the process is killed. Defaults to None
+            which lets the function run for as long as it takes.
+        cancel: an event, for example from multiprocessing.Manager().Event(),
+            that kills the process when set. Defaults to None.
+
+    While a build is being recorded, the stages run in the new process are
+    added to the report.
+
+    Raises:
+        BuildTimeoutError: if the function did not return within timeout,
+            naming the stage and part that was running.
+        concurrent.futures.CancelledError: if cancel was set.
+        RuntimeError: if the process exited without returning, for example
+            after a crash in OCC.
+    """
+    if cancel is not None and cancel.is_set():
+        raise CancelledError("the build was cancelled before it started")
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_run_worker, args=(sender, worker_function(function), kwargs), daemon=True)
+    process.start()
+    sender.close()
+    running = []
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise CancelledError("the build was cancelled")
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise BuildTimeoutError(timeout, running)
+            if cancel is not None:
+                remaining = _CANCEL_INTERVAL if remaining is None else min(remaining, _CANCEL_INTERVAL)
+            if not receiver.poll(remaining):
+                continue
+            try:
+                event, value, detail = receiver.recv()
+            except EOFError:
+                process.join()
+                raise RuntimeError(f"the build process exited with code {process.exitcode} without a result")
+            if event == "start":
+                running.append((value, detail))
+            elif event == "end":
+                running.pop()
+            elif event == "result":
+                return worker_result(value)
+            else:
+                raise value
+    finally:
+        # also stops the build if this process is interrupted
+        if process.is_alive():
+            process.kill()
+        process.join()
+        receiver.close()
@@ -0,0 +1,126 @@
+# Estimates of the memory held by the OCC shapes and Workplane history of
+# assembly parts. OCC allocates outside of the Python heap, so the B-rep is
+# walked and its entities counted instead of relying on sys.getsizeof.
+
+import cadquery as cq
+from OCP.BRep import BRep_Tool
+from OCP.BRepAdaptor import BRepAdaptor_Curve, BRepAdaptor_Surface
+from OCP.GeomAbs import (
+    GeomAbs_BezierCurve,
+    GeomAbs_BezierSurface,
+    GeomAbs_BSplineCurve,
+    GeomAbs_BSplineSurface,
+    GeomAbs_SurfaceOfExtrusion,
+    GeomAbs_SurfaceOfRevolution,
+)
+from OCP.TopLoc import TopLoc_Location
+
+# approximate bytes held by OCC for each topological entity, including the
+# underlying geometry handles, and for each pole, mesh node and triangle
+BYTES_PER_VERTEX = 120
+BYTES_PER_EDGE = 250
+BYTES_PER_FACE = 400
+BYTES_PER_POLE = 32
+BYTES_PER_NODE = 24
+BYTES_PER_TRIANGLE = 12
+
+
+def _curve_poles(adaptor) -> int:
+    if adaptor.GetType() in (GeomAbs_BSplineCurve, GeomAbs_BezierCurve):
+        return adaptor.NbPoles()
+    return 0
+
+
+def _surface_poles(adaptor) -> int:
+    surface_type = adaptor.GetType()
+    if surface_type in (GeomAbs_BSplineSurface, GeomAbs_BezierSurface):
+        return adaptor.NbUPoles() * adaptor.NbVPoles()
+    if surface_type in (GeomAbs_SurfaceOfRevolution, GeomAbs_SurfaceOfExtrusion):
+        return _curve_poles(adaptor.BasisCurve())
+    return 0
+
+
+def brep_statistics(shape: cq.Shape) -> dict:
+    """Counts the B-rep entities of a shape and estimates the memory they hold.
+
+    Args:
+        shape: the shape to inspect.
+
+    Returns:
+        dict: the number of "solids", "faces", "edges", "vertices", "poles",
+        "mesh_nodes" and "mesh_triangles" together with the "estimated_bytes".
+    """
+    faces = shape.Faces()
+    edges = shape.Edges()
+    vertices = shape.Vertices()
+
+    poles = 0
+    mesh_nodes = 0
+    mesh_triangles = 0
+    for face in faces:
+        poles += _surface_poles(BRepAdaptor_Surface(face.wrapped))
+        triangulation = BRep_Tool.Triangulation_s(face.wrapped, TopLoc_Location())
+        if triangulation is not None:
+            mesh_nodes += triangulation.NbNodes()
+            mesh_triangles += triangulation.NbTriangles()
+    for edge in edges:
+        poles += _curve_poles(BRepAdaptor_Curve(edge.wrapped))
+
+    estimated_bytes = (
+        len(vertices) * BYTES_PER_VERTEX
+        + len(edges) * BYTES_PER_EDGE
+        + len(faces) * BYTES_PER_FACE
+        + poles * BYTES_PER_POLE
+        + mesh_nodes * BYTES_PER_NODE
+        + mesh_triangles * BYTES_PER_TRIANGLE
+    )
+
+    return {
+        "solids": len(shape.Solids()),
+        "faces": len(faces),
+        "edges": len(edges),
+        "vertices": len(vertices),
+        "poles": poles,
+        "mesh_nodes": mesh_nodes,
+        "mesh_triangles": mesh_triangles,
+        "estimated_bytes": estimated_bytes,
+    }
+
+
+def retained_objects(obj) -> dict:
+    """Counts the intermediate objects kept alive by a part.
+
+    A Workplane keeps its parent chain, and any tagged Workplanes, together
+    with every shape they hold. A bare Shape retains nothing.
+
+    Args:
+        obj: a cadquery Workplane or Shape.
+
+    Returns:
+        dict: the number of retained "workplanes" and "shapes", excluding
+        the final workplane and the shapes it holds, and the
+        "estimated_bytes" of the retained shapes. Retained shapes can share
+        sub-shapes with the final shape so the estimate is an upper bound.
+    """
+    if not isinstance(obj, cq.Workplane):
+        return {"workplanes": 0, "shapes": 0, "estimated_bytes": 0}
+
+    final_shapes = {id(item) for item in obj.objects if isinstance(item, cq.Shape)}
+    seen_workplanes = {id(obj)}
+    retained_shapes = {}
+    to_visit = [obj.parent, *obj.ctx.tags.values()]
+    while to_visit:
+        workplane = to_visit.pop()
+        if workplane is None or id(workplane) in seen_workplanes:
+            continue
+        seen_workplanes.add(id(workplane))
+        for item in workplane.objects:
+            if isinstance(item, cq.Shape) and id(item) not in final_shapes:
+                retained_shapes[id(item)] = item
+        to_visit.append(workplane.parent)
+
+    return {
+        "workplanes": len(seen_workplanes) - 1,
+        "shapes": len(retained_shapes),
+        "estimated_bytes": sum(brep_statistics(shape)["estimated_bytes"] for shape in retained_shapes.values()),
+    }
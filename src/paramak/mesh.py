@@ -0,0 +1,114 @@
+# Triangle meshes of assembly parts as NumPy arrays and writers for the
+# common mesh formats, so that one tessellation can be exported several ways.
+
+import struct
+
+import cadquery as cq
+import numpy as np
+
+MESH_FORMATS = ("stl", "obj", "vtk")
+
+# the normal, the three corners and the attribute byte count of each triangle
+_STL_RECORD = np.dtype([("normal", "<f4", (3,)), ("corners", "<f4", (3, 3)), ("attribute", "<u2")])
+
+
+def tessellate_shape(shape: cq.Shape, tolerance: float, angular_tolerance: float):
+    """Triangulates a shape.
+
+    Args:
+        shape: the shape to triangulate.
+        tolerance: the maximum linear deflection of the mesh from the surface.
+        angular_tolerance: the maximum angular deflection in radians.
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): the (n, 3) float vertex coordinates
+        and the (m, 3) integer vertex indices of each triangle.
+    """
+    # OCC keeps any finer triangulation already stored on the faces, meshing
+    # a copy makes the result depend on the tolerances alone
+    vertices, triangles = shape.copy(mesh=False).tessellate(tolerance, angular_tolerance)
+    return (
+        np.array([vertex.toTuple() for vertex in vertices], dtype=float).reshape(-1, 3),
+        np.array(triangles, dtype=np.int64).reshape(-1, 3),
+    )
+
+
+def _triangle_normals(vertices, triangles):
+    corners = vertices[triangles]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+
+def write_stl(filename, meshes: dict) -> None:
+    """Writes the meshes as a single binary STL file.
+
+    Args:
+        filename: the file to write.
+        meshes: maps part names to (vertices, triangles) arrays as returned by
+            tessellate_shape.
+    """
+    records = []
+    for vertices, triangles in meshes.values():
+        record = np.zeros(len(triangles), dtype=_STL_RECORD)
+        record["normal"] = _triangle_normals(vertices, triangles)
+        record["corners"] = vertices[triangles]
+        records.append(record)
+
+    with open(filename, "wb") as file:
+        file.write(b"paramak".ljust(80, b" "))
+        file.write(struct.pack("<I", sum(len(record) for record in records)))
+        for record in records:
+            file.write(record.tobytes())
+
+
+def write_obj(filename, meshes: dict) -> None:
+    """Writes the meshes as a Wavefront OBJ file with one object per part."""
+    offset = 1
+    with open(filename, "w") as file:
+        for name, (vertices, triangles) in meshes.items():
+            file.write(f"o {name}\n")
+            np.savetxt(file, vertices, fmt="v %.9g %.9g %.9g")
+            np.savetxt(file, triangles + offset, fmt="f %d %d %d")
+            offset += len(vertices)
+
+
+def write_vtk(filename, meshes: dict) -> None:
+    """Writes the meshes as a legacy VTK polydata file, each triangle has a
+    part_id cell value giving the index of its part."""
+    vertices = [np.zeros((0, 3))]
+    triangles = [np.zeros((0, 3), dtype=np.int64)]
+    part_ids = [np.zeros(0, dtype=np.int64)]
+    offset = 0
+    for index, (part_vertices, part_triangles) in enumerate(meshes.values()):
+        vertices.append(part_vertices)
+        triangles.append(part_triangles + offset)
+        part_ids.append(np.full(len(part_triangles), index))
+        offset += len(part_vertices)
+    vertices, triangles, part_ids = np.concatenate(vertices), np.concatenate(triangles), np.concatenate(part_ids)
+
+    with open(filename, "w") as file:
+        file.write("# vtk DataFile Version 3.0\n")
+        file.write(f"paramak parts: {' '.join(name.replace(' ', '_') for name in meshes)}\n")
+        file.write("ASCII\nDATASET POLYDATA\n")
+        file.write(f"POINTS {len(vertices)} double\n")
+        np.savetxt(file, vertices, fmt="%.9g")
+        file.write(f"POLYGONS {len(triangles)} {4 * len(triangles)}\n")
+        np.savetxt(file, triangles, fmt="3 %d %d %d")
+        file.write(f"CELL_DATA {len(triangles)}\nSCALARS part_id int 1\nLOOKUP_TABLE default\n")
+        np.savetxt(file, part_ids, fmt="%d")
+
+
+def write_mesh(filename, meshes: dict, format: str = None) -> None:
+    """Writes the meshes as STL, OBJ or VTK, inferring the format from the
+    filename extension if it is not given."""
+    if format is None:
+        format = str(filename).rsplit(".", 1)[-1].lower()
+    if format == "stl":
+        write_stl(filename, meshes)
+    elif format == "obj":
+        write_obj(filename, meshes)
+    elif format == "vtk":
+        write_vtk(filename, meshes)
+    else:
+        raise ValueError(f"format should be one of {MESH_FORMATS}, not {format}")
@@ -0,0 +1,353 @@
+# Opt in timing of the stages of a paramak build. Stages are recorded only
+# while a BuildReport is active, otherwise stage() is a cheap no-op. Stages
+# run in worker processes are recorded there and sent back with the result,
+# see worker_function and worker_result.
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import NamedTuple
+
+_active_report = ContextVar("paramak_build_report", default=None)
+# called with ("start" or "end", stage, part) as stages begin and finish
+_stage_listener = ContextVar("paramak_stage_listener", default=None)
+# the part of the innermost active stage, inherited by nested stages
+_current_part = ContextVar("paramak_current_part", default=None)
+
+
+class BuildReport:
+    """Wall time and call counts for each stage and each named part of a build.
+
+    Each record is a tuple of (stage, part, start, duration, args, pid, tid)
+    with times in seconds, start being relative to the start of the report.
+    Stages can be nested (e.g. spline creation within a wire), the time of a
+    stage includes any stages nested within it while its self time does not.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.total_time = 0.0
+        self._start = time.perf_counter()
+
+    def add(self, stage: str, part: str, start: float, duration: float, args: dict = None):
+        self.records.append(
+            (stage, part, start - self._start, duration, args or {}, os.getpid(), threading.get_ident())
+        )
+
+    def merge(self, records, start: float):
+        """Adds records made by another report, for example in a worker
+        process, keeping their process and thread ids.
+
+        Args:
+            records: the records of the other report.
+            start: the time.perf_counter() at the start of the other report.
+                perf_counter is a system wide clock so the times of reports
+                made in other processes on the same machine line up.
+        """
+        offset = start - self._start
+        for stage, part, record_start, duration, args, pid, tid in records:
+            self.records.append((stage, part, record_start + offset, duration, args, pid, tid))
+
+    def self_times(self) -> list:
+        """Returns the duration of each record less the time of the stages
+        nested directly within it, in the order of the records."""
+        self_times = [record[3] for record in self.records]
+        indexes_by_thread = {}
+        for index, record in enumerate(self.records):
+            indexes_by_thread.setdefault(record[5:7], []).append(index)
+        for indexes in indexes_by_thread.values():
+            # outer spans open before the spans nested within them
+            indexes.sort(key=lambda index: (self.records[index][2], -self.records[index][3]))
+            open_spans = []
+            for index in indexes:
+                start, duration = self.records[index][2:4]
+                while open_spans and open_spans[-1][0] <= start:
+                    open_spans.pop()
+                if open_spans:
+                    self_times[open_spans[-1][1]] -= duration
+                open_spans.append((start + duration, index))
+        return self_times
+
+    def _summarise(self, key_index):
+        summary = {}
+        for record, self_time in zip(self.records, self.self_times()):
+            entry = summary.setdefault(record[key_index], {"calls": 0, "time": 0.0, "self_time": 0.0})
+            entry["calls"] += 1
+            entry["time"] += record[3]
+            entry["self_time"] += self_time
+        return dict(sorted(summary.items(), key=lambda item: item[1]["time"], reverse=True))
+
+    def stages(self) -> dict:
+        """Returns the calls, total time and self time of each stage, slowest
+        first."""
+        return self._summarise(0)
+
+    def parts(self) -> dict:
+        """Returns the calls, total time and self time of each part, slowest
+        first."""
+        return self._summarise(1)
+
+    def to_dict(self) -> dict:
+        return {
+            "total_time": self.total_time,
+            "stages": self.stages(),
+            "parts": self.parts(),
+            "records": [
+                {"stage": stage, "part": part, "start": start, "duration": duration, "args": _json_safe(args)}
+                for stage, part, start, duration, args, _, _ in self.records
+            ],
+        }
+
+    def to_json(self, filename: str = None) -> str:
+        """Returns the report as a JSON string, also writing it to filename if
+        one is provided."""
+        text = json.dumps(self.to_dict(), indent=2)
+        if filename is not None:
+            with open(filename, "w") as file:
+                file.write(text)
+        return text
+
+    def to_chrome_trace(self, filename: str = None) -> dict:
+        """Returns the records as Chrome trace events, also writing them to
+        filename if one is provided. The file can be opened in a browser with
+        chrome://tracing or https://ui.perfetto.dev.
+        """
+        events = []
+        for stage, part, start, duration, args, pid, tid in self.records:
+            events.append(
+                {
+                    "name": stage if part is None else f"{stage} {part}",
+                    "cat": stage,
+                    "ph": "X",
+                    "ts": start * 1e6,
+                    "dur": duration * 1e6,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"part": part, **_json_safe(args)},
+                }
+            )
+        trace = {"traceEvents": events, "displayTimeUnit": "ms"}
+        if filename is not None:
+            with open(filename, "w") as file:
+                json.dump(trace, file)
+        return trace
+
+    def to_speedscope(self, filename: str = None) -> dict:
+        """Returns the records as a speedscope evented profile, one profile
+        per thread, also writing it to filename if one is provided. The file
+        can be opened in a browser with https://www.speedscope.app.
+        """
+        frames = []
+        frame_indexes = {}
+        spans_by_thread = {}
+        for stage, part, start, duration, _, pid, tid in self.records:
+            frame_name = stage if part is None else f"{stage} {part}"
+            if frame_name not in frame_indexes:
+                frame_indexes[frame_name] = len(frames)
+                frames.append({"name": frame_name})
+            spans_by_thread.setdefault((pid, tid), []).append((start, start + duration, frame_indexes[frame_name]))
+
+        profiles = []
+        for (pid, tid), spans in spans_by_thread.items():
+            # outer spans open before the spans nested within them
+            spans.sort(key=lambda span: (span[0], -span[1]))
+            events = []
+            open_spans = []
+            for start, end, frame in spans:
+                while open_spans and open_spans[-1][0] <= start:
+                    closing_end, closing_frame = open_spans.pop()
+                    events.append({"type": "C", "frame": closing_frame, "at": closing_end})
+                events.append({"type": "O", "frame": frame, "at": start})
+                open_spans.append((end, frame))
+            while open_spans:
+                closing_end, closing_frame = open_spans.pop()
+                events.append({"type": "C", "frame": closing_frame, "at": closing_end})
+            profiles.append(
+                {
+                    "type": "evented",
+                    "name": f"paramak build pid {pid} thread {tid}",
+                    "unit": "seconds",
+                    "startValue": spans[0][0],
+                    "endValue": max(self.total_time, events[-1]["at"]),
+                    "events": events,
+                }
+            )
+
+        profile = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+            "name": "paramak build",
+            "exporter": "paramak",
+        }
+        if filename is not None:
+            with open(filename, "w") as file:
+                json.dump(profile, file)
+        return profile
+
+    def table(self, by: str = "stage") -> str:
+        """Returns the report as a plain text table. The share column is the
+        self time of each row as a fraction of the total time, so nested
+        stages are not counted twice and the shares of a build made in one
+        thread add up to at most 100%.
+
+        Args:
+            by: group the timings by "stage" or by "part".
+        """
+        if by == "stage":
+            summary = self.stages()
+        elif by == "part":
+            summary = self.parts()
+        else:
+            raise ValueError(f'by should be either "stage" or "part", not {by}')
+
+        width = max([len(by)] + [len(str(key)) for key in summary])
+        lines = [f"{by:<{width}}  {'calls':>6}  {'time (s)':>9}  {'self (s)':>9}  {'share':>6}"]
+        for key, entry in summary.items():
+            share = entry["self_time"] / self.total_time if self.total_time else 0.0
+            lines.append(
+                f"{str(key):<{width}}  {entry['calls']:>6}  {entry['time']:>9.3f}  "
+                f"{entry['self_time']:>9.3f}  {share:>6.1%}"
+            )
+        lines.append(f"{'total':<{width}}  {'':>6}  {self.total_time:>9.3f}")
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.table()
+
+
+@contextmanager
+def record_build():
+    """Records the stages of any builds made within the context.
+
+    Usage::
+
+        with record_build() as report:
+            paramak.tokamak(...)
+        print(report.table())
+    """
+    report = BuildReport()
+    token = _active_report.set(report)
+    try:
+        yield report
+    finally:
+        report.total_time = time.perf_counter() - report._start
+        _active_report.reset(token)
+
+
+@contextmanager
+def trace_build(filename: str, format: str = None):
+    """Records the stages of any builds made within the context and writes
+    them as a timeline that can be opened in a browser.
+
+    Args:
+        filename: the file to write the trace to.
+        format: either "chrome" for Chrome trace events or "speedscope".
+            Defaults to speedscope for filenames ending in .speedscope.json
+            and to chrome otherwise.
+    """
+    if format is None:
+        format = "speedscope" if str(filename).endswith(".speedscope.json") else "chrome"
+    if format not in ("chrome", "speedscope"):
+        raise ValueError(f'format should be either "chrome" or "speedscope", not {format}')
+
+    with record_build() as report:
+        yield report
+    if format == "chrome":
+        report.to_chrome_trace(filename)
+    else:
+        report.to_speedscope(filename)
+
+
+@contextmanager
+def stage(name: str, part: str = None, **args):
+    """Times the enclosed code as one call of the stage for the named part.
+
+    Args:
+        name: the stage, for example "revolve" or "cut".
+        part: the part being built, defaults to the part of the enclosing stage.
+        args: parameters of the call, kept with the record for traces.
+    """
+    report = _active_report.get()
+    listener = _stage_listener.get()
+    if report is None and listener is None:
+        yield
+        return
+    if part is None:
+        part = _current_part.get()
+    token = _current_part.set(part)
+    if listener is not None:
+        listener("start", name, part)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if report is not None:
+            report.add(name, part, start, time.perf_counter() - start, args)
+        if listener is not None:
+            listener("end", name, part)
+        _current_part.reset(token)
+
+
+class _WorkerResult(NamedTuple):
+    value: object
+    records: list
+    start: float
+
+
+def _call_recorded(function, *args, **kwargs):
+    with record_build() as report:
+        value = function(*args, **kwargs)
+    return _WorkerResult(value, report.records, report._start)
+
+
+def worker_function(function):
+    """Returns function ready to be sent to a worker process. While a build
+    is being recorded the function records its stages in the worker and
+    returns them along with its result, which worker_result then unwraps.
+    Otherwise the function is returned unchanged.
+
+    Usage::
+
+        futures = [executor.submit(worker_function(export_part), *arguments) for arguments in jobs]
+        results = [worker_result(future.result()) for future in futures]
+    """
+    if _active_report.get() is None:
+        return function
+    return partial(_call_recorded, function)
+
+
+def worker_result(result):
+    """Returns the result of a function wrapped by worker_function, adding
+    the stages it recorded in its worker process to the active report under
+    the worker's process and thread ids."""
+    if not isinstance(result, _WorkerResult):
+        return result
+    report = _active_report.get()
+    if report is not None:
+        report.merge(result.records, result.start)
+    return result.value
+
+
+@contextmanager
+def listen_stages(listener):
+    """Calls listener("start", stage, part) and listener("end", stage, part)
+    as each stage of any builds made within the context begins and
+    finishes, whether or not a build is being recorded."""
+    token = _stage_listener.set(listener)
+    try:
+        yield
+    finally:
+        _stage_listener.reset(token)
+
+
+def _json_safe(args):
+    """Converts any argument values that JSON can not encode to strings."""
+    return {
+        key: value if isinstance(value, (bool, int, float, str, type(None))) else repr(value)
+        for key, value in args.items()
+    }
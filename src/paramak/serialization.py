@@ -0,0 +1,195 @@
+# Compact binary encoding of shapes and assembly parts, used to pickle
+# assemblies, to ship them between processes and to save them to disk.
+
+import json
+import mmap
+import struct
+from io import BytesIO
+
+import cadquery as cq
+from OCP.BinTools import BinTools, BinTools_FormatVersion_CURRENT
+from OCP.gp import gp_Trsf
+from OCP.TopAbs import TopAbs_ShapeEnum
+from OCP.TopExp import TopExp
+from OCP.TopoDS import TopoDS_Shape
+from OCP.TopTools import TopTools_IndexedMapOfShape
+
+
+def shape_to_bytes(shape: cq.Shape) -> bytes:
+    """Encodes a shape as OCC binary B-rep. Any triangulation is left out as
+    it can be recomputed from the geometry."""
+    stream = BytesIO()
+    BinTools.Write_s(shape.wrapped, stream, False, False, BinTools_FormatVersion_CURRENT)
+    return stream.getvalue()
+
+
+def shape_from_bytes(data: bytes) -> cq.Shape:
+    """Decodes OCC binary B-rep written by shape_to_bytes."""
+    wrapped = TopoDS_Shape()
+    BinTools.Read_s(wrapped, BytesIO(data))
+    return cq.Shape.cast(wrapped)
+
+
+def color_to_tuple(color):
+    return None if color is None else color.toTuple()
+
+
+def color_from_tuple(rgba):
+    return None if rgba is None else cq.Color(*rgba)
+
+
+def part_to_state(obj) -> dict:
+    """Encodes an assembly part as its final B-rep plus, for Workplanes, the
+    plane and any paramak name and color attributes, so that the part can be
+    rebuilt without its construction history."""
+    if isinstance(obj, cq.Shape):
+        return {"kind": "shape", "brep": shape_to_bytes(obj)}
+
+    shapes = [item for item in obj.vals() if isinstance(item, cq.Shape)]
+    return {
+        "kind": "workplane",
+        "breps": [shape_to_bytes(shape) for shape in shapes],
+        "plane": obj.plane,
+        "attributes": {key: getattr(obj, key) for key in ("name", "color") if hasattr(obj, key)},
+    }
+
+
+def part_from_state(state):
+    """Rebuilds an assembly part encoded by part_to_state."""
+    if state["kind"] == "shape":
+        return shape_from_bytes(state["brep"])
+
+    workplane = cq.Workplane(state["plane"]).add([shape_from_bytes(brep) for brep in state["breps"]])
+    for key, value in state["attributes"].items():
+        setattr(workplane, key, value)
+    return workplane
+
+
+def _subshape_maps(obj):
+    """Returns a function giving the indexed map of the subshapes of a type
+    within an assembly part, computing each map once."""
+    shapes = [obj] if isinstance(obj, cq.Shape) else [item for item in obj.vals() if isinstance(item, cq.Shape)]
+    compound = cq.Compound.makeCompound(shapes)
+    maps = {}
+
+    def subshape_map(shape_type):
+        if shape_type not in maps:
+            maps[shape_type] = TopTools_IndexedMapOfShape()
+            TopExp.MapShapes_s(compound.wrapped, shape_type, maps[shape_type])
+        return maps[shape_type]
+
+    return subshape_map
+
+
+def subshapes_to_state(obj, subshapes) -> list:
+    """Encodes the names, colors or layers that an assembly node gives to
+    subshapes of its part (its _subshape_names, _subshape_colors or
+    _subshape_layers) as (shape type, index, value) entries. Each subshape
+    is given by its index among the subshapes of its type in the part, which
+    is the same for the part decoded by part_from_state. Subshapes that are
+    not within the part are left out."""
+    subshape_map = _subshape_maps(obj)
+    entries = []
+    for subshape, value in subshapes.items():
+        shape_type = subshape.wrapped.ShapeType()
+        index = subshape_map(shape_type).FindIndex(subshape.wrapped)
+        if index > 0:
+            entries.append((int(shape_type), index, value))
+    return entries
+
+
+def subshapes_from_state(obj, entries) -> dict:
+    """Maps the subshapes of an assembly part to the values encoded by
+    subshapes_to_state."""
+    subshape_map = _subshape_maps(obj)
+    return {
+        cq.Shape.cast(subshape_map(TopAbs_ShapeEnum(shape_type)).FindKey(index)): value
+        for shape_type, index, value in entries
+    }
+
+
+# single file container used by Assembly.save and Assembly.load, laid out as
+# the magic bytes, a little endian uint32 version and uint64 index length, the
+# JSON index of the assembly tree and then the B-rep blob of every part
+CONTAINER_MAGIC = b"PARAMAK\x00"
+CONTAINER_VERSION = 1
+_HEADER = struct.Struct("<8sIQ")
+
+
+def location_to_list(location: cq.Location) -> list:
+    """Returns the 3 by 4 transformation matrix of a location as a flat list."""
+    transformation = location.wrapped.Transformation()
+    return [transformation.Value(row, column) for row in (1, 2, 3) for column in (1, 2, 3, 4)]
+
+
+def location_from_list(values) -> cq.Location:
+    transformation = gp_Trsf()
+    transformation.SetValues(*values)
+    return cq.Location(transformation)
+
+
+def plane_to_dict(plane: cq.Plane) -> dict:
+    return {
+        "origin": plane.origin.toTuple(),
+        "x_dir": plane.xDir.toTuple(),
+        "normal": plane.zDir.toTuple(),
+    }
+
+
+def plane_from_dict(values) -> cq.Plane:
+    return cq.Plane(origin=values["origin"], xDir=values["x_dir"], normal=values["normal"])
+
+
+def attribute_to_json(value):
+    """Encodes a paramak Workplane attribute (a name or a color) for JSON."""
+    if isinstance(value, cq.Color):
+        return {"rgba": value.toTuple()}
+    if isinstance(value, tuple):
+        return {"tuple": list(value)}
+    return value
+
+
+def attribute_from_json(value):
+    if isinstance(value, dict) and "rgba" in value:
+        return cq.Color(*value["rgba"])
+    if isinstance(value, dict) and "tuple" in value:
+        return tuple(value["tuple"])
+    return value
+
+
+def write_container(filename, index: dict, blobs) -> None:
+    """Writes an index and the blobs it refers to as a single file.
+
+    Args:
+        filename: the file to write.
+        index: JSON serialisable description of the content, blob offsets
+            within it are relative to the end of the index.
+        blobs: the bytes of each blob, in the order of their offsets.
+    """
+    index_bytes = json.dumps(index).encode("utf-8")
+    with open(filename, "wb") as file:
+        file.write(_HEADER.pack(CONTAINER_MAGIC, CONTAINER_VERSION, len(index_bytes)))
+        file.write(index_bytes)
+        for blob in blobs:
+            file.write(blob)
+
+
+def read_container(filename):
+    """Reads the index of a file written by write_container and memory maps
+    the blobs, which are only read when sliced.
+
+    Returns:
+        (dict, memoryview): the index and a view of the blob section.
+    """
+    with open(filename, "rb") as file:
+        magic, version, index_length = _HEADER.unpack(file.read(_HEADER.size))
+        if magic != CONTAINER_MAGIC:
+            raise ValueError(f"{filename} is not a paramak assembly file")
+        if version > CONTAINER_VERSION:
+            raise ValueError(
+                f"{filename} was written with container version {version}, "
+                f"this version of paramak reads up to version {CONTAINER_VERSION}"
+            )
+        index = json.loads(file.read(index_length).decode("utf-8"))
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return index, memoryview(mapped)[_HEADER.size + index_length :]
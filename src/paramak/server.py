@@ -0,0 +1,314 @@
+# A long running local build server. Worker processes are started once with
+# cadquery imported and reused for every request, identical specs that are
+# already being built share one build, and finished builds are kept in an on
+# disk cache keyed by paramak version and spec hash. Only the standard
+# library is used and the server only listens on localhost or a Unix socket,
+# so it runs offline.
+
+import json
+import os
+import socketserver
+import stat
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib.metadata import version
+from pathlib import Path
+
+from .assemblies.assembly import Assembly
+from .export import export_assembly
+from .specs import build_from_spec, builder_name, spec_hash
+
+# keys of a request that are not builder arguments
+REQUEST_KEYS = ("builder", "name", "formats", "result")
+
+DEFAULT_CACHE_DIRECTORY = Path.home() / ".cache" / "paramak"
+
+
+def _warm_up():
+    # loads the OCC libraries so that the first request a worker takes is as
+    # quick as the rest
+    import cadquery as cq
+
+    cq.Workplane().box(1, 1, 1).val().isValid()
+
+
+def _write_result(result_file: Path, result: dict):
+    temporary = result_file.with_suffix(".tmp")
+    temporary.write_text(json.dumps(result))
+    os.replace(temporary, result_file)
+
+
+def build_cached(builder: str, params: dict, directory, formats=()) -> dict:
+    """Builds a reactor into a cache directory, or adds formats to one built
+    earlier. The reactor is always saved as reactor.paramak so that other
+    formats can be written later without building it again.
+
+    Args:
+        builder: the name of the reactor builder.
+        params: the builder arguments, in their Python or JSON form.
+        directory: the cache directory of this spec.
+        formats: the file extensions to write the reactor as, see
+            paramak.export.export_assembly.
+
+    Returns:
+        dict: the "status", build "time" in seconds, "volumes" of each part
+        and "outputs" filenames keyed by format, or the "error" and
+        "traceback" of a failed build.
+    """
+    directory = Path(directory)
+    result_file = directory / "result.json"
+    start = time.perf_counter()
+    try:
+        if result_file.exists():
+            result = json.loads(result_file.read_text())
+            assembly = None
+        else:
+            assembly = build_from_spec(builder, params)
+            columns = assembly.properties()
+            result = {
+                "status": "ok",
+                "time": time.perf_counter() - start,
+                "volumes": dict(zip(columns["name"], columns["volume"].tolist())),
+                "outputs": {},
+            }
+        missing = [format for format in ["paramak", *formats] if format not in result["outputs"]]
+        if missing:
+            if assembly is None:
+                assembly = Assembly.load(result["outputs"]["paramak"])
+            directory.mkdir(parents=True, exist_ok=True)
+            for format in missing:
+                result["outputs"][format] = export_assembly(assembly, directory / f"reactor.{format}")
+            _write_result(result_file, result)
+    except Exception as error:
+        return {
+            "status": "failed",
+            "time": time.perf_counter() - start,
+            "error": f"{type(error).__name__}: {error}",
+            "traceback": traceback.format_exc(),
+        }
+    return result
+
+
+class BuildServer:
+    """Builds reactor specs in a pool of warm worker processes, sharing
+    builds of identical specs that are in flight and answering from an on
+    disk cache of earlier builds.
+
+    Args:
+        workers: the number of worker processes. Defaults to None which uses
+            the number of CPUs.
+        cache_directory: where builds are kept, one directory per paramak
+            version and spec hash. Defaults to ~/.cache/paramak.
+    """
+
+    def __init__(self, workers: int = None, cache_directory=None):
+        self.cache_directory = Path(cache_directory or DEFAULT_CACHE_DIRECTORY)
+        # builds made by another paramak version are not reused
+        self.builds_directory = self.cache_directory / version("paramak")
+        self.builds_directory.mkdir(parents=True, exist_ok=True)
+        self.workers = workers or os.cpu_count()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up)
+        # the last build submitted for each spec hash and the formats it writes
+        self.in_flight = {}
+        self._lock = threading.Lock()
+        # start every worker now rather than on the first requests
+        for future in [self.executor.submit(time.sleep, 0) for _ in range(self.workers)]:
+            future.result()
+
+    def cached(self, builder, params: dict, formats=()) -> dict:
+        """Returns the cached result of a spec if it has been built with all
+        the formats, otherwise None."""
+        result_file = self.builds_directory / spec_hash(builder, params) / "result.json"
+        if not result_file.exists():
+            return None
+        result = json.loads(result_file.read_text())
+        if not all(format in result["outputs"] for format in formats):
+            return None
+        return result
+
+    def submit(self, builder, params: dict, formats=()):
+        """Starts building a spec unless a build of the same spec writing
+        all the formats is in flight.
+
+        Only one build of a spec runs at a time, as builds write to the same
+        cache directory. A request for formats that the build in flight does
+        not write waits for it and then adds the formats to the cached
+        reactor.
+
+        Returns:
+            concurrent.futures.Future: the result of build_cached.
+        """
+        builder = builder_name(builder)
+        key = spec_hash(builder, params)
+        with self._lock:
+            previous, previous_formats = self.in_flight.get(key, (None, set()))
+            if previous is not None and set(formats) <= previous_formats:
+                return previous
+            formats = previous_formats | set(formats)
+            future = Future()
+            self.in_flight[key] = (future, formats)
+
+        def start(_=None):
+            executor = self.executor
+            try:
+                build = executor.submit(build_cached, builder, params, self.builds_directory / key, sorted(formats))
+            except BrokenProcessPool as error:
+                self._replace_executor(executor)
+                future.set_exception(error)
+                return
+            build.add_done_callback(lambda _: self._set_result(future, build, executor))
+
+        # outside the lock as the callbacks run at once if the build is done
+        if previous is None:
+            start()
+        else:
+            previous.add_done_callback(start)
+        future.add_done_callback(lambda _: self._finished(key, future))
+        return future
+
+    def _set_result(self, future, build, executor):
+        error = build.exception()
+        if error is None:
+            future.set_result(build.result())
+            return
+        if isinstance(error, BrokenProcessPool):
+            self._replace_executor(executor)
+        future.set_exception(error)
+
+    def _replace_executor(self, executor):
+        """Replaces a pool broken by a worker process dying, for example a
+        crash inside OCC, so that the next requests are built."""
+        with self._lock:
+            if self.executor is not executor:
+                return
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up)
+        executor.shutdown(wait=False)
+
+    def _finished(self, key, future):
+        with self._lock:
+            if self.in_flight.get(key, (None,))[0] is future:
+                del self.in_flight[key]
+
+    def build(self, spec: dict) -> dict:
+        """Builds a request spec, the builder name and arguments with
+        optional "formats", and returns its result with the "spec_hash" and
+        whether it was "cached".
+
+        Raises:
+            BrokenProcessPool: if the worker process building the spec died.
+        """
+        params = {key: value for key, value in spec.items() if key not in REQUEST_KEYS}
+        builder = builder_name(spec["builder"])
+        formats = list(spec.get("formats", []))
+        if spec.get("result") == "brep" and "brep" not in formats:
+            formats.append("brep")
+        result = self.cached(builder, params, formats)
+        cached = result is not None
+        if not cached:
+            result = self.submit(builder, params, formats).result()
+        return {"spec_hash": spec_hash(builder, params), "cached": cached, **result}
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BuildRequestHandler(BaseHTTPRequestHandler):
+    """Answers GET /health and POST /build. The body of a build request is a
+    JSON spec, the response is the JSON result with the output file paths,
+    or the B-rep bytes of the reactor when the spec has "result": "brep"."""
+
+    server_version = "paramak"
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+    def _send(self, code: int, body: bytes, content_type: str = "application/json", headers=None):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, code: int, data: dict):
+        self._send(code, json.dumps(data).encode("utf-8"))
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self._send_json(404, {"error": f"unknown path {self.path}"})
+        build_server = self.server.build_server
+        self._send_json(
+            200,
+            {"status": "ok", "workers": build_server.workers, "in_flight": len(build_server.in_flight)},
+        )
+
+    def do_POST(self):
+        if self.path != "/build":
+            return self._send_json(404, {"error": f"unknown path {self.path}"})
+        try:
+            spec = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            result = self.server.build_server.build(spec)
+        except (ValueError, KeyError, TypeError) as error:
+            return self._send_json(400, {"status": "failed", "error": f"{type(error).__name__}: {error}"})
+        except BrokenProcessPool as error:
+            # the pool has been replaced, later requests are built
+            return self._send_json(500, {"status": "crashed", "error": f"{type(error).__name__}: {error}"})
+        if result["status"] != "ok":
+            return self._send_json(422, result)
+        if spec.get("result") == "brep":
+            body = Path(result["outputs"]["brep"]).read_bytes()
+            return self._send(200, body, "application/octet-stream", {"X-Spec-Hash": result["spec_hash"]})
+        self._send_json(200, result)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(build_server: BuildServer, host: str = "127.0.0.1", port: int = 8765, unix_socket: str = None):
+    """Returns an HTTP server answering build requests with build_server,
+    listening on host and port or on a Unix socket. A socket left at the
+    Unix socket path by an earlier server is replaced, any other file there
+    raises a FileExistsError."""
+    if unix_socket is not None:
+        if os.path.lexists(unix_socket):
+            if not stat.S_ISSOCK(os.lstat(unix_socket).st_mode):
+                raise FileExistsError(f"{unix_socket} exists and is not a Unix socket, it is not replaced")
+            os.remove(unix_socket)
+        http_server = _UnixHTTPServer(unix_socket, BuildRequestHandler)
+    else:
+        http_server = ThreadingHTTPServer((host, port), BuildRequestHandler)
+    http_server.build_server = build_server
+    return http_server
+
+
+def serve(
+    host: str = "127.0.0.1", port: int = 8765, unix_socket: str = None, workers: int = None, cache_directory=None
+):
+    """Runs a build server until interrupted.
+
+    Args:
+        host: the address to listen on. Defaults to localhost only.
+        port: the port to listen on.
+        unix_socket: a Unix socket path to listen on instead of host and port.
+        workers: the number of worker processes.
+        cache_directory: where builds are kept. Defaults to ~/.cache/paramak.
+    """
+    with BuildServer(workers, cache_directory) as build_server:
+        with make_server(build_server, host, port, unix_socket) as http_server:
+            try:
+                http_server.serve_forever()
+            except KeyboardInterrupt:
+                pass
@@ -0,0 +1,257 @@
+# Reactor specs: the name of a reactor builder and its keyword arguments.
+# Specs written as plain JSON compatible data (layer types as strings, extra
+# shapes as the name and arguments of a paramak workplane function) can be
+# read from files, hashed and sent to worker processes.
+
+import hashlib
+import inspect
+import json
+from enum import Enum
+from types import MappingProxyType
+
+import cadquery as cq
+
+from .assemblies.spherical_tokamak import spherical_tokamak, spherical_tokamak_from_plasma
+from .assemblies.tokamak import tokamak, tokamak_from_plasma
+from .export import content_hash
+from .utils import RadialBuild
+from .workplanes.blanket_from_plasma import blanket_from_plasma
+from .workplanes.center_column_shield_cylinder import center_column_shield_cylinder
+from .workplanes.constant_thickness_dome import constant_thickness_dome
+from .workplanes.cutting_wedge import cutting_wedge
+from .workplanes.dished_vacuum_vessel import dished_vacuum_vessel
+from .workplanes.plasma_simplified import plasma_simplified
+from .workplanes.poloidal_field_coil import poloidal_field_coil
+from .workplanes.poloidal_field_coil_case import poloidal_field_coil_case
+from .workplanes.revolved_shape import revolved_shape
+from .workplanes.toroidal_field_coil_princeton_d import toroidal_field_coil_princeton_d
+from .workplanes.toroidal_field_coil_rectangle import toroidal_field_coil_rectangle
+from .workplanes.u_shaped_dome import u_shaped_dome
+
+BUILDERS = {
+    "tokamak": tokamak,
+    "tokamak_from_plasma": tokamak_from_plasma,
+    "spherical_tokamak": spherical_tokamak,
+    "spherical_tokamak_from_plasma": spherical_tokamak_from_plasma,
+}
+
+# the workplane functions that extra_cut_shapes and extra_intersect_shapes
+# entries of a JSON spec can name
+WORKPLANES = {
+    function.__name__: function
+    for function in [
+        blanket_from_plasma,
+        center_column_shield_cylinder,
+        constant_thickness_dome,
+        cutting_wedge,
+        dished_vacuum_vessel,
+        plasma_simplified,
+        poloidal_field_coil,
+        poloidal_field_coil_case,
+        revolved_shape,
+        toroidal_field_coil_princeton_d,
+        toroidal_field_coil_rectangle,
+        u_shaped_dome,
+    ]
+}
+
+_BUILD_KEYS = ("radial_build", "vertical_build")
+# builder arguments that change how a reactor is built but not the reactor
+_BUILD_OPTIONS = ("profile", "compact", "lazy", "previous", "timeout")
+_SHAPE_KEYS = ("extra_cut_shapes", "extra_intersect_shapes")
+
+
+def builder_name(builder) -> str:
+    """Returns the name of a reactor builder given either the builder or its name."""
+    name = builder if isinstance(builder, str) else getattr(builder, "__name__", None)
+    if name not in BUILDERS:
+        raise ValueError(f"builder should be one of {list(BUILDERS)}, not {builder}")
+    return name
+
+
+def to_json(value):
+    """Converts builder arguments to JSON compatible data. Workplanes, which
+    can only be given from Python, are replaced by their B-rep content hash."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {str(key): to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, RadialBuild)):
+        return [to_json(item) for item in value]
+    if isinstance(value, cq.Workplane):
+        return {"content_hash": content_hash(cq.Compound.makeCompound(value.vals()))}
+    if hasattr(value, "item"):
+        # numpy scalars
+        return value.item()
+    return value
+
+
+def _shape_from_json(entry):
+    if isinstance(entry, cq.Workplane):
+        return entry
+    if "workplane" not in entry:
+        # to_json keeps only the content hash of Workplanes given from Python
+        raise ValueError(
+            "extra shapes should be Workplanes or {'workplane': name, **arguments} entries, "
+            f"Workplanes given from Python can not be read back from JSON, not {entry}"
+        )
+    arguments = dict(entry)
+    function = arguments.pop("workplane")
+    if function not in WORKPLANES:
+        raise ValueError(f"workplane should be one of {list(WORKPLANES)}, not {function}")
+    return WORKPLANES[function](**arguments)
+
+
+def from_json(params: dict) -> dict:
+    """Converts JSON spec arguments to the arguments of a builder: builds
+    become RadialBuilds, colors become tuples and extra shapes given as
+    {"workplane": name, **arguments} are built. Arguments already in their
+    Python form are left as they are."""
+    params = dict(params)
+    for key in _BUILD_KEYS:
+        if key in params:
+            params[key] = RadialBuild(params[key])
+    for key in _SHAPE_KEYS:
+        if params.get(key) is not None:
+            params[key] = [_shape_from_json(entry) for entry in params[key]]
+    if params.get("colors") is not None:
+        params["colors"] = {name: tuple(color) for name, color in params["colors"].items()}
+    return params
+
+
+def _canonical(value):
+    """Returns JSON compatible data with every number as a float, so that 10,
+    10.0 and numpy.float64(10) hash the same."""
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def spec_hash(builder, params: dict = None) -> str:
+    """Returns a sha256 hex digest identifying a reactor spec, given as a
+    builder and its arguments or as a ReactorSpec. Layer types given as
+    LayerType or as strings, tuples or lists, integers or floats, and
+    arguments left out or given their default value, hash the same.
+    Arguments that change how the reactor is built but not the reactor,
+    such as profile or timeout, are left out."""
+    if isinstance(builder, ReactorSpec):
+        return builder.content_hash
+    name = builder_name(builder)
+    params = params or {}
+    signature = inspect.signature(BUILDERS[name])
+    # unknown arguments are hashed as given, the build reports the error
+    bound = signature.bind_partial(**{key: value for key, value in params.items() if key in signature.parameters})
+    bound.apply_defaults()
+    params = {key: value for key, value in {**params, **bound.arguments}.items() if key not in _BUILD_OPTIONS}
+    canonical = json.dumps(
+        {"builder": name, "params": _canonical(to_json(params))}, sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def build_from_spec(builder, params: dict = None, **kwargs):
+    """Builds a reactor from a builder and its arguments or from a
+    ReactorSpec, kwargs are passed on to the builder."""
+    if isinstance(builder, ReactorSpec):
+        return builder.build(**kwargs)
+    return BUILDERS[builder_name(builder)](**from_json(params), **kwargs)
+
+
+class ReactorSpec:
+    """An immutable reactor spec, the name of a builder and its arguments.
+
+    The radial and vertical builds are held as RadialBuilds and the spec
+    hashes and compares by its content, so it can be used as a cache key.
+
+    Args:
+        builder: a reactor builder, for example paramak.tokamak, or its name.
+        params: the builder arguments, in their Python or JSON form.
+
+    Usage::
+
+        spec = ReactorSpec("tokamak_from_plasma", radial_build=radial_build, rotation_angle=90)
+        reactor = spec.build()
+        wider = spec.replace(rotation_angle=180)
+    """
+
+    __slots__ = ("_builder", "_params", "_shapes", "_content_hash")
+
+    def __init__(self, builder, **params):
+        self._builder = builder_name(builder)
+        self._params = MappingProxyType(from_json(params))
+        # the extra shapes as given, so that to_json writes shapes given as
+        # {"workplane": name, **arguments} entries back in that form
+        self._shapes = {key: tuple(params[key]) for key in _SHAPE_KEYS if params.get(key) is not None}
+        self._content_hash = spec_hash(self._builder, dict(self._params))
+
+    @property
+    def builder(self) -> str:
+        return self._builder
+
+    @property
+    def params(self) -> MappingProxyType:
+        """The builder arguments, read only."""
+        return self._params
+
+    @property
+    def radial_build(self) -> RadialBuild:
+        return self._params.get("radial_build")
+
+    @property
+    def vertical_build(self) -> RadialBuild:
+        return self._params.get("vertical_build")
+
+    @property
+    def content_hash(self) -> str:
+        """The spec hash, see spec_hash."""
+        return self._content_hash
+
+    def replace(self, **params) -> "ReactorSpec":
+        """Returns a copy of the spec with some arguments replaced."""
+        spec = ReactorSpec(self._builder, **{**self._params, **params})
+        # the shapes kept are passed on built, keep the form they were given in
+        spec._shapes.update({key: shapes for key, shapes in self._shapes.items() if key not in params})
+        return spec
+
+    def build(self, **kwargs):
+        """Builds the reactor, kwargs such as profile or timeout are passed
+        on to the builder."""
+        return BUILDERS[self._builder](**self._params, **kwargs)
+
+    def to_json(self) -> dict:
+        """Returns the spec as JSON compatible data that from_json reads back.
+        Extra shapes given as Workplanes are written as their content hash,
+        which identifies them but can not be read back."""
+        return {"builder": self._builder, **to_json({**self._params, **self._shapes})}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ReactorSpec":
+        """Makes a spec from a mapping of the "builder" name and its arguments
+        in their JSON form, which the spec converts with the module from_json."""
+        data = dict(data)
+        return cls(data.pop("builder"), **data)
+
+    def __eq__(self, other):
+        if isinstance(other, ReactorSpec):
+            return self._content_hash == other._content_hash
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._content_hash)
+
+    def __repr__(self):
+        arguments = ", ".join(f"{key}={value!r}" for key, value in self._params.items())
+        return f"ReactorSpec({self._builder!r}, {arguments})"
+
+    def __reduce__(self):
+        return _reactor_spec, (self._builder, dict(self._params), self._shapes)
+
+
+def _reactor_spec(builder, params, shapes=None):
+    spec = ReactorSpec(builder, **params)
+    spec._shapes.update(shapes or {})
+    return spec
@@ -0,0 +1,221 @@
+# A SQLite database of built designs keyed by spec hash, so that designs
+# built by anyone sharing the database are not built again and analyses can
+# run from the stored part volumes and bounding boxes alone.
+
+import json
+import sqlite3
+import time
+from importlib.metadata import version
+
+from .specs import builder_name, spec_hash, to_json
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS designs (
+    spec_hash TEXT PRIMARY KEY,
+    builder TEXT NOT NULL,
+    version TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    time REAL,
+    error TEXT,
+    outputs TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS parts (
+    spec_hash TEXT NOT NULL REFERENCES designs(spec_hash) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    volume REAL,
+    xmin REAL, ymin REAL, zmin REAL, xmax REAL, ymax REAL, zmax REAL,
+    PRIMARY KEY (spec_hash, name)
+);
+CREATE TABLE IF NOT EXISTS parameters (
+    spec_hash TEXT NOT NULL REFERENCES designs(spec_hash) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (spec_hash, name)
+);
+CREATE INDEX IF NOT EXISTS parameters_by_value ON parameters (name, value);
+"""
+
+
+def flatten_parameters(params: dict) -> dict:
+    """Returns the numeric values of the builder arguments keyed by their
+    dotted path, for example "rotation_angle" or "radial_build.3.1" for the
+    thickness of the fourth radial layer."""
+    flat = {}
+
+    def visit(value, path):
+        if isinstance(value, bool):
+            return
+        if isinstance(value, (int, float)):
+            flat[path] = float(value)
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                visit(item, f"{path}.{key}" if path else str(key))
+        elif isinstance(value, list):
+            for index, item in enumerate(value):
+                visit(item, f"{path}.{index}")
+
+    visit(to_json(params), "")
+    return flat
+
+
+class ResultStore:
+    """A SQLite database of built designs.
+
+    Each design is stored under the hash of its spec with the paramak version
+    that built it, the build status, time and error, the output file paths,
+    the volume and bounding box of each part and the numeric builder
+    arguments for range queries.
+
+    Args:
+        path: the database file, created if it does not exist. Several
+            processes, or people sharing a file system, can use the same
+            file.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.connection = sqlite3.connect(self.path, timeout=60)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(_SCHEMA)
+
+    def add(self, builder, params: dict, result: dict) -> str:
+        """Stores the result of a build, replacing any earlier result of the
+        same spec.
+
+        Args:
+            builder: the reactor builder or its name.
+            params: the builder arguments.
+            result: the build result as returned by paramak.sweep.run_case,
+                with its "status", "time", "volumes", "bounding_boxes",
+                "outputs" and "error".
+
+        Returns:
+            str: the spec hash the design is stored under.
+        """
+        builder = builder_name(builder)
+        key = spec_hash(builder, params)
+        volumes = result.get("volumes") or {}
+        bounding_boxes = result.get("bounding_boxes") or {}
+        with self.connection:
+            self.connection.execute("DELETE FROM designs WHERE spec_hash = ?", (key,))
+            self.connection.execute(
+                "INSERT INTO designs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    builder,
+                    version("paramak"),
+                    json.dumps(to_json(params)),
+                    result["status"],
+                    result.get("time"),
+                    result.get("error"),
+                    json.dumps(result.get("outputs") or []),
+                    time.time(),
+                ),
+            )
+            self.connection.executemany(
+                "INSERT INTO parts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(key, name, volume, *bounding_boxes.get(name, [None] * 6)) for name, volume in volumes.items()],
+            )
+            self.connection.executemany(
+                "INSERT INTO parameters VALUES (?, ?, ?)",
+                [(key, name, value) for name, value in flatten_parameters(params).items()],
+            )
+        return key
+
+    def spec_hashes(self, statuses=("ok",)) -> set:
+        """Returns the spec hashes of the stored designs with these statuses."""
+        rows = self.connection.execute(
+            f"SELECT spec_hash FROM designs WHERE status IN ({', '.join('?' * len(statuses))})", tuple(statuses)
+        )
+        return {row[0] for row in rows}
+
+    def __contains__(self, key: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM designs WHERE spec_hash = ?", (key,)).fetchone() is not None
+
+    def get(self, key: str) -> dict:
+        """Returns the stored design with this spec hash, or None."""
+        records = self._records("WHERE spec_hash = ?", (key,))
+        return records[0] if records else None
+
+    def query(self, ranges: dict = None, builder=None, status: str = "ok") -> list:
+        """Returns the stored designs whose builder arguments are within
+        ranges.
+
+        Args:
+            ranges: maps the dotted paths of numeric builder arguments (see
+                flatten_parameters) to a (minimum, maximum) pair, either of
+                which can be None, or to a single value to match exactly.
+                Designs without the argument are not returned.
+            builder: only return designs of this builder. Defaults to None.
+            status: only return designs with this status, None for any.
+                Defaults to "ok".
+
+        Returns:
+            list: dictionaries of the "spec_hash", "builder", "version",
+            "params", "status", "time", "error", "outputs", "created" and the
+            "volume" and "bounding_box" of each of the "parts".
+        """
+        conditions = []
+        arguments = []
+        if builder is not None:
+            conditions.append("builder = ?")
+            arguments.append(builder_name(builder))
+        if status is not None:
+            conditions.append("status = ?")
+            arguments.append(status)
+        for name, bounds in (ranges or {}).items():
+            if not isinstance(bounds, (tuple, list)):
+                bounds = (bounds, bounds)
+            minimum, maximum = bounds
+            condition = "spec_hash IN (SELECT spec_hash FROM parameters WHERE name = ?"
+            arguments.append(name)
+            if minimum is not None:
+                condition += " AND value >= ?"
+                arguments.append(minimum)
+            if maximum is not None:
+                condition += " AND value <= ?"
+                arguments.append(maximum)
+            conditions.append(condition + ")")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._records(where, arguments)
+
+    def _records(self, where: str, arguments) -> list:
+        rows = self.connection.execute(
+            "SELECT spec_hash, builder, version, params, status, time, error, outputs, created "
+            f"FROM designs {where} ORDER BY created",
+            tuple(arguments),
+        ).fetchall()
+        records = []
+        for key, builder, built_with, params, status, build_time, error, outputs, created in rows:
+            parts = {
+                name: {"volume": volume, "bounding_box": list(bounding_box)}
+                for name, volume, *bounding_box in self.connection.execute(
+                    "SELECT name, volume, xmin, ymin, zmin, xmax, ymax, zmax FROM parts WHERE spec_hash = ?", (key,)
+                )
+            }
+            records.append(
+                {
+                    "spec_hash": key,
+                    "builder": builder,
+                    "version": built_with,
+                    "params": json.loads(params),
+                    "status": status,
+                    "time": build_time,
+                    "error": error,
+                    "outputs": json.loads(outputs),
+                    "created": created,
+                    "parts": parts,
+                }
+            )
+        return records
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
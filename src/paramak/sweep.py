@@ -0,0 +1,325 @@
+# Builds many reactors from parameter sets in a process pool. Each case is
+# isolated so that a failing build is recorded rather than stopping the
+# sweep, and results are appended to a JSONL or CSV file as cases complete
+# so that an interrupted sweep can be resumed.
+
+import csv
+import ctypes
+import io
+import json
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from .cost import estimate_cost
+from .export import export_assembly
+from .isolation import BuildTimeoutError
+from .profiling import worker_function, worker_result
+from .specs import build_from_spec, builder_name, spec_hash, to_json
+
+# statuses of cases that are not run again when a sweep is resumed
+FINISHED_STATUSES = ("ok", "failed", "timeout")
+
+_CSV_FIELDS = [
+    "case",
+    "spec_hash",
+    "builder",
+    "status",
+    "time",
+    "error",
+    "stage",
+    "part",
+    "params",
+    "volumes",
+    "bounding_boxes",
+    "outputs",
+]
+_CSV_JSON_FIELDS = ("params", "volumes", "bounding_boxes", "outputs")
+
+
+def run_case(builder: str, params: dict, filenames=(), timeout: float = None) -> dict:
+    """Builds one reactor, catching any error, and writes its outputs.
+
+    Args:
+        builder: the name of the reactor builder.
+        params: the builder arguments, in their Python or JSON form.
+        filenames: the files to write the reactor to, see
+            paramak.export.export_assembly.
+        timeout: seconds after which the build is stopped, see the builder's
+            timeout argument. Defaults to None.
+
+    Returns:
+        dict: the "status" ("ok", "failed" or "timeout"), build "time" in
+        seconds, "volumes" and "bounding_boxes" of each part and "outputs"
+        written, or the "error" and "traceback" of a failed build. Builds that timed out
+        also give the "stage" and "part" that was running.
+    """
+    start = time.perf_counter()
+    try:
+        assembly = build_from_spec(builder, params, timeout=timeout)
+        build_time = time.perf_counter() - start
+        columns = assembly.properties()
+        outputs = []
+        for filename in filenames:
+            Path(filename).parent.mkdir(parents=True, exist_ok=True)
+            outputs.append(export_assembly(assembly, filename))
+    except BuildTimeoutError as error:
+        return {
+            "status": "timeout",
+            "time": time.perf_counter() - start,
+            "error": f"{type(error).__name__}: {error}",
+            "stage": error.stage,
+            "part": error.part,
+        }
+    except Exception as error:
+        return {
+            "status": "failed",
+            "time": time.perf_counter() - start,
+            "error": f"{type(error).__name__}: {error}",
+            "traceback": traceback.format_exc(),
+        }
+    return {
+        "status": "ok",
+        "time": build_time,
+        "volumes": dict(zip(columns["name"], columns["volume"].tolist())),
+        "bounding_boxes": dict(zip(columns["name"], columns["bounding_box"].tolist())),
+        "outputs": outputs,
+    }
+
+
+def run_cases(jobs, workers: int = None, timeout: float = None):
+    """Runs run_case for each job, yielding (key, result) pairs as the jobs
+    complete. A single pool of worker processes is used for all the jobs so
+    that the imports are only paid once per worker, until a worker process
+    dies: the job it was running gets a "crashed" result and the unfinished
+    jobs are run in a new pool. While a build is being recorded the stages
+    run in the workers are added to the report.
+
+    Args:
+        jobs: (key, builder, params, filenames) tuples.
+        workers: the number of processes to build in. Defaults to None which
+            builds the jobs one after another in this process.
+        timeout: seconds after which each build is stopped. Defaults to None.
+    """
+    if workers is None:
+        for key, builder, params, filenames in jobs:
+            yield key, run_case(builder, params, filenames, timeout)
+        return
+    jobs = list(jobs)
+    while jobs:
+        lost = []
+        yield from _run_pool(jobs, workers, timeout, lost)
+        # a worker died (for example a crash inside OCC) and took the pool and
+        # every unfinished case with it. The cases that had started are built
+        # again one per pool, so that only the case that kills its worker is
+        # recorded as crashed, and the others go to a new pool. If none had
+        # started the worker died on its own, the first case is then built
+        # alone so that the sweep still makes progress
+        started = [index for index, (_, _, was_started) in enumerate(lost) if was_started]
+        if lost and not started:
+            started = [0]
+        for index in started:
+            crashed = []
+            yield from _run_pool([lost[index][0]], 1, timeout, crashed)
+            for (key, *_), error, _ in crashed:
+                yield key, {"status": "crashed", "time": None, "error": f"{type(error).__name__}: {error}"}
+        jobs = [job for index, (job, _, _) in enumerate(lost) if index not in started]
+
+
+# set in each worker process of _run_pool, marks the jobs the worker starts
+_started = None
+
+
+def _set_started(started):
+    global _started
+    _started = started
+
+
+def _run_started(index: int, *arguments) -> dict:
+    _started[index] = True
+    return run_case(*arguments)
+
+
+def _run_pool(jobs, workers: int, timeout: float, lost: list):
+    """Runs run_case for each job in a new process pool, yielding (key,
+    result) pairs as the jobs complete. The jobs that were not finished when
+    a worker process died are appended to lost as (job, error, started)
+    tuples, in the order the jobs were given, where started is whether a
+    worker had started the job. Jobs waiting in the queue the executor
+    feeds its workers from are not started, although their futures are
+    already running."""
+    errors = {}
+    started = multiprocessing.Array(ctypes.c_bool, len(jobs), lock=False)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_set_started, initargs=(started,)) as executor:
+        futures = {
+            executor.submit(worker_function(_run_started), index, builder, params, filenames, timeout): index
+            for index, (key, builder, params, filenames) in enumerate(jobs)
+        }
+        for future in as_completed(futures):
+            try:
+                result = worker_result(future.result())
+            except BrokenProcessPool as error:
+                errors[futures[future]] = error
+                continue
+            yield jobs[futures[future]][0], result
+    lost.extend((jobs[index], errors[index], bool(started[index])) for index in sorted(errors))
+
+
+def _complete_length(results_file: Path) -> int:
+    """Returns the number of bytes at the start of a results file holding
+    complete records, leaving out a last record that was cut short, for
+    example by killing the sweep while it was written."""
+    data = results_file.read_bytes()
+    if results_file.suffix != ".csv":
+        return data.rfind(b"\n") + 1
+    # a CSV record ends at a newline that is not within a quoted field
+    length = position = 0
+    quoted = False
+    for line in data.split(b"\n")[:-1]:
+        position += len(line) + 1
+        quoted ^= line.count(b'"') % 2 == 1
+        if not quoted:
+            length = position
+    return length
+
+
+def read_results(results_file) -> list:
+    """Reads the records of a sweep results file, JSONL or CSV. A last
+    record that was cut short is left out."""
+    results_file = Path(results_file)
+    if not results_file.exists():
+        return []
+    text = results_file.read_bytes()[: _complete_length(results_file)].decode("utf-8")
+    if results_file.suffix == ".csv":
+        records = list(csv.DictReader(io.StringIO(text, newline="")))
+        for record in records:
+            for field in _CSV_JSON_FIELDS:
+                record[field] = json.loads(record[field]) if record.get(field) else None
+            record["case"] = int(record["case"])
+            record["time"] = float(record["time"]) if record["time"] else None
+        return records
+    return [json.loads(line) for line in text.split("\n") if line.strip()]
+
+
+class _ResultWriter:
+    """Appends records to a JSONL or CSV file, flushing after each one. A
+    last record that was cut short is removed before appending."""
+
+    def __init__(self, results_file):
+        self.results_file = Path(results_file)
+        self.is_csv = self.results_file.suffix == ".csv"
+        if self.results_file.exists():
+            length = _complete_length(self.results_file)
+            if length < self.results_file.stat().st_size:
+                with open(self.results_file, "r+b") as file:
+                    file.truncate(length)
+        write_header = self.is_csv and (not self.results_file.exists() or self.results_file.stat().st_size == 0)
+        self.file = open(self.results_file, "a", newline="")
+        if self.is_csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=_CSV_FIELDS, extrasaction="ignore")
+            if write_header:
+                self.writer.writeheader()
+
+    def write(self, record):
+        if self.is_csv:
+            row = dict(record)
+            for field in _CSV_JSON_FIELDS:
+                row[field] = json.dumps(row.get(field))
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def sweep(
+    builder,
+    cases,
+    results_file,
+    workers: int = None,
+    output_directory=None,
+    formats=("step",),
+    retry_failed: bool = False,
+    timeout: float = None,
+    store=None,
+) -> list:
+    """Builds a reactor for each set of parameters.
+
+    Each case is built in isolation, an error in one build is recorded as a
+    failed case and the sweep carries on. With workers the cases predicted
+    to take longest by paramak.estimate_cost are started first. A record is appended to
+    results_file as each case completes, holding the case index, spec hash,
+    parameters, status, build time, part volumes and output paths. Cases
+    whose spec hash is already recorded in results_file are not built
+    again, so a sweep that was interrupted can be resumed by running it
+    again with the same results_file.
+
+    Args:
+        builder: a reactor builder, for example paramak.tokamak_from_plasma,
+            or its name.
+        cases: an iterable of dictionaries of builder arguments.
+        results_file: the file the results are appended to, written as CSV if
+            its name ends in .csv and as JSON lines otherwise.
+        workers: the number of processes to build in. Defaults to None which
+            builds the cases one after another in this process.
+        output_directory: where to write each reactor, named by its spec
+            hash. Defaults to None which writes no files.
+        formats: the file extensions to write each reactor as, see
+            paramak.export.export_assembly. Defaults to ("step",).
+        retry_failed: build cases recorded as failed or timed out again.
+            Defaults to False.
+        timeout: seconds after which a build is stopped and recorded as
+            timed out, so that pathological cases do not stall the sweep.
+            Defaults to None.
+        store: a paramak.store.ResultStore, cases already stored with a
+            finished status are skipped and each new result is stored.
+            Defaults to None.
+
+    Returns:
+        list: the records of the cases built by this call, in the order they
+        completed.
+    """
+    builder = builder_name(builder)
+    finished = set(FINISHED_STATUSES) - ({"failed", "timeout"} if retry_failed else set())
+    done = {record["spec_hash"] for record in read_results(results_file) if record["status"] in finished}
+    if store is not None:
+        done |= store.spec_hashes(finished)
+
+    pending = []
+    for index, params in enumerate(cases):
+        case_hash = spec_hash(builder, params)
+        if case_hash in done:
+            continue
+        done.add(case_hash)
+        pending.append((index, case_hash, params))
+    if workers is not None:
+        # longest job first, so that a slow case started last does not leave
+        # the other workers idle at the end of the sweep
+        pending.sort(key=lambda case: estimate_cost(builder, **case[2]).time, reverse=True)
+
+    jobs = []
+    for index, case_hash, params in pending:
+        filenames = []
+        if output_directory is not None:
+            filenames = [str(Path(output_directory) / f"{case_hash}.{format}") for format in formats]
+        jobs.append(((index, case_hash, params), builder, params, filenames))
+
+    records = []
+    writer = _ResultWriter(results_file)
+    try:
+        for (index, case_hash, params), result in run_cases(jobs, workers, timeout):
+            # crashed cases are built again when the sweep is resumed
+            records.append(
+                {"case": index, "spec_hash": case_hash, "builder": builder, "params": to_json(params), **result}
+            )
+            writer.write(records[-1])
+            if store is not None:
+                store.add(builder, params, result)
+    finally:
+        writer.close()
+    return records
@@ -1,9 +1,15 @@
+import hashlib
+import json
 import typing
-from enum import Enum
 from collections import Counter
+from collections.abc import Sequence
+from enum import Enum
 
+import numpy as np
 from cadquery import Workplane
 
+from .profiling import stage
+
 
 class LayerType(Enum):
     GAP = "gap"
@@ -11,6 +17,104 @@ class LayerType(Enum):
     PLASMA = "plasma"
 
 
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+class RadialBuild(Sequence):
+    """An immutable radial or vertical build.
+
+    Behaves as the sequence of (LayerType, thickness) or (LayerType,
+    thickness, name) tuples it was made from, so it can be passed anywhere
+    a build list is accepted, while holding the layer kinds and thicknesses
+    as NumPy arrays along with their cumulative sums and the plasma index,
+    which the helpers in this module use instead of rescanning the layers.
+
+    Args:
+        layers: (LayerType, thickness[, name]) tuples, the LayerType can also
+            be given by its value, for example "gap".
+
+    Raises:
+        ValidationError: if an entry is not such a tuple.
+    """
+
+    def __init__(self, layers):
+        if isinstance(layers, RadialBuild):
+            self._layers = layers._layers
+        else:
+            self._layers = tuple(_build_layer(item) for item in layers)
+        self.kinds = _read_only(np.array([item[0].value for item in self._layers], dtype="<U6"))
+        self.thicknesses = _read_only(np.array([item[1] for item in self._layers], dtype=float))
+        self.names = tuple(item[2] if len(item) == 3 else None for item in self._layers)
+        # the sum of the thicknesses of the layers before each layer, and of
+        # all the layers as the last entry
+        self.cumulative = _read_only(np.concatenate([[0.0], np.cumsum(self.thicknesses)]))
+        plasma_indexes = np.flatnonzero(self.kinds == LayerType.PLASMA.value)
+        self.plasma_index = int(plasma_indexes[0]) if len(plasma_indexes) else None
+        self._content_hash = None
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return RadialBuild(self._layers[index])
+        return self._layers[index]
+
+    def __len__(self):
+        return len(self._layers)
+
+    def __eq__(self, other):
+        if isinstance(other, RadialBuild):
+            return self.content_hash == other.content_hash
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.content_hash)
+
+    def __repr__(self):
+        return f"RadialBuild({list(self._layers)!r})"
+
+    def __reduce__(self):
+        return type(self), (self._layers,)
+
+    @property
+    def content_hash(self) -> str:
+        """A sha256 hex digest of the layers, the same for equal builds
+        whether thicknesses were given as ints or floats."""
+        if self._content_hash is None:
+            canonical = json.dumps([self.kinds.tolist(), self.thicknesses.tolist(), list(self.names)])
+            self._content_hash = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        return self._content_hash
+
+    @property
+    def total(self) -> float:
+        """The sum of the thicknesses of all the layers."""
+        return float(self.cumulative[-1])
+
+    def _require_plasma(self) -> int:
+        if self.plasma_index is None:
+            raise ValueError("LayerType.PLASMA entry not found")
+        return self.plasma_index
+
+
+def _build_layer(item) -> tuple:
+    """Returns a radial build entry with its LayerType, checking the types
+    of its entries as validate_plasma_radial_build does."""
+    if not isinstance(item, (tuple, list)) or len(item) not in (2, 3):
+        raise ValidationError(f"Each radial build entry should be a (LayerType, thickness[, name]) Tuple, not {item!r}")
+    kind = item[0]
+    if not isinstance(kind, LayerType):
+        if kind not in [layer_type.value for layer_type in LayerType]:
+            raise ValidationError(
+                f"First entry in each radial build Tuple should be a paramak.LayerType or its value, not {kind!r}"
+            )
+        kind = LayerType(kind)
+    if not isinstance(item[1], (int, float)):
+        raise ValidationError(f"Second entry in each radial build Tuple should be a Float, not {item[1]!r}")
+    if len(item) == 3 and not isinstance(item[2], str):
+        raise ValidationError(f"Third entry in each radial build Tuple should be a name string, not {item[2]!r}")
+    return (kind, *item[1:])
+
+
 def instructions_from_points(points):
     # obtains the first two values of the points list
     XZ_points = [(p[0], p[1]) for p in points]
@@ -45,7 +149,8 @@ def create_wire_workplane_from_instructions(
 
     for entry in instructions:
         if list(entry.keys())[0] == "spline":
-            workplane = workplane.spline(listOfXYTuple=list(entry.values())[0])
+            with stage("spline", points=len(list(entry.values())[0])):
+                workplane = workplane.spline(listOfXYTuple=list(entry.values())[0])
         if list(entry.keys())[0] == "straight":
             workplane = workplane.polyline(list(entry.values())[0])
         if list(entry.keys())[0] == "circle":
@@ -69,9 +174,10 @@ def create_wire_workplane_from_points(points, plane, origin=(0, 0, 0), obj=None)
         result = workplane.polyline(entry_values).close()
     elif all_spline:
         entry_values = [entry[:2] for entry in points[:-1]]
-        result = workplane.spline(
-            entry_values, makeWire=True, tol=1e-1, periodic=True
-        )  # periodic smooths out the connecting joint
+        with stage("spline", points=len(entry_values), periodic=True):
+            result = workplane.spline(
+                entry_values, makeWire=True, tol=1e-1, periodic=True
+            )  # periodic smooths out the connecting joint
     else:
         instructions = instructions_from_points(points)
 
@@ -100,12 +206,20 @@ def rotate_solid(angles: typing.Sequence[float], solid: Workplane) -> Workplane:
     solid = Workplane(solid.plane)
 
     # Joins the solids together
-    for i in rotated_solids:
-        solid = solid.union(i)
+    for index, rotated_solid in enumerate(rotated_solids):
+        with stage("union", angle=angles[index]):
+            solid = solid.union(rotated_solid)
     return solid
 
 
 def sum_up_to_gap_before_plasma(radial_build):
+    if isinstance(radial_build, RadialBuild):
+        index = radial_build.plasma_index
+        if index is None:
+            return radial_build.total
+        if index > 0 and radial_build.kinds[index - 1] == LayerType.GAP.value:
+            index -= 1
+        return float(radial_build.cumulative[index])
     total_sum = 0
     for i, item in enumerate(radial_build):
         if item[0] == LayerType.PLASMA:
@@ -117,6 +231,10 @@ def sum_up_to_gap_before_plasma(radial_build):
 
 
 def sum_up_to_plasma(radial_build):
+    if isinstance(radial_build, RadialBuild):
+        if radial_build.plasma_index is None:
+            return radial_build.total
+        return float(radial_build.cumulative[radial_build.plasma_index])
     total_sum = 0
     for item in radial_build:
         if item[0] == LayerType.PLASMA:
@@ -130,6 +248,14 @@ class ValidationError(Exception):
 
 
 def sum_before_after_plasma(vertical_build):
+    if isinstance(vertical_build, RadialBuild):
+        index = vertical_build.plasma_index
+        if index is None:
+            return vertical_build.total, 0
+        half_plasma = vertical_build.thicknesses[index] / 2
+        before_plasma = vertical_build.cumulative[index] + half_plasma
+        after_plasma = vertical_build.total - vertical_build.cumulative[index + 1] + half_plasma
+        return float(before_plasma), float(after_plasma)
     before_plasma = 0
     after_plasma = 0
     plasma_value = 0
@@ -220,6 +346,8 @@ def is_lower_or_upper_divertor(radial_build):
 
 
 def get_plasma_value(radial_build):
+    if isinstance(radial_build, RadialBuild):
+        return radial_build[radial_build._require_plasma()][1]
     for item in radial_build:
         if item[0] == LayerType.PLASMA:
             return item[1]
@@ -227,6 +355,8 @@ def get_plasma_value(radial_build):
 
 
 def get_plasma_index(radial_build):
+    if isinstance(radial_build, RadialBuild):
+        return radial_build._require_plasma()
     for i, item in enumerate(radial_build):
         if item[0] == LayerType.PLASMA:
             return i
@@ -234,6 +364,11 @@ def get_plasma_index(radial_build):
 
 
 def get_gap_after_plasma(radial_build):
+    if isinstance(radial_build, RadialBuild):
+        index = radial_build._require_plasma() + 1
+        if index < len(radial_build) and radial_build.kinds[index] == LayerType.GAP.value:
+            return radial_build[index][1]
+        raise ValueError("LayerType.PLASMA entry is not followed by a 'gap'")
     for index, item in enumerate(radial_build):
         if item[0] == LayerType.PLASMA:
             if index + 1 < len(radial_build) and radial_build[index + 1][0] == LayerType.GAP:
@@ -244,6 +379,12 @@ def get_gap_after_plasma(radial_build):
 
 
 def sum_after_gap_following_plasma(radial_build):
+    if isinstance(radial_build, RadialBuild):
+        index = radial_build._require_plasma()
+        gaps = np.flatnonzero(radial_build.kinds[index + 1 :] == LayerType.GAP.value)
+        if len(gaps) == 0:
+            raise ValueError("LayerType.PLASMA entry is not followed by a 'gap'")
+        return float(radial_build.total - radial_build.cumulative[index + 2 + gaps[0]])
     found_plasma = False
     found_gap_after_plasma = False
     total_sum = 0
@@ -0,0 +1,289 @@
+# Validates many radial, vertical and divertor builds at once, so that sweep
+# generators can reject invalid candidates before any work is dispatched. The
+# builds are stacked into 2D arrays, one row per build, and every rule of the
+# single build validators in paramak.utils is applied to all rows at once.
+
+from enum import IntEnum
+
+import numpy as np
+
+from .utils import LayerType
+
+_LAYER_TYPES = [kind.value for kind in LayerType]
+_DIVERTOR_TYPES = ["lower_divertor", "upper_divertor"]
+# the builders whose layers are named in build order, the other builders
+# name the center column layers and then the blanket layers from the plasma out
+_SPHERICAL_BUILDERS = ("spherical_tokamak", "spherical_tokamak_from_plasma")
+
+
+class BuildError(IntEnum):
+    """The error code of each row of a batch validation, each the rule of a
+    single build validator that the build breaks first."""
+
+    OK = 0
+    INVALID_LAYER_TYPE = 1
+    INVALID_THICKNESS = 2
+    NON_POSITIVE_THICKNESS = 3
+    MULTIPLE_PLASMA = 4
+    PLASMA_NOT_FOUND = 5
+    PLASMA_AT_END = 6
+    PLASMA_NOT_BETWEEN_GAPS = 7
+    DUPLICATE_NAMES = 8
+    NAMED_VERTICAL_LAYER = 9
+    DIVERTOR_LENGTH = 10
+    DIVERTOR_NAMED = 11
+    DIVERTOR_TYPE = 12
+    DIVERTOR_NOT_AFTER_GAP = 13
+
+
+ERROR_MESSAGES = {
+    BuildError.OK: "",
+    BuildError.INVALID_LAYER_TYPE: "First entry in each radial build Tuple should be a paramak.LayerType",
+    BuildError.INVALID_THICKNESS: "Second entry in each radial build Tuple should be a Float",
+    BuildError.NON_POSITIVE_THICKNESS: "Non-positive value",
+    BuildError.MULTIPLE_PLASMA: "Multiple LayerType.PLASMA entries found",
+    BuildError.PLASMA_NOT_FOUND: "LayerType.PLASMA entry not found or found multiple times",
+    BuildError.PLASMA_AT_END: "LayerType.PLASMA entry must have at least one entry before and after it",
+    BuildError.PLASMA_NOT_BETWEEN_GAPS: "LayerType.PLASMA entry must be preceded and followed by a LayerType.GAP",
+    BuildError.DUPLICATE_NAMES: "Unique names are required for the layers of the radial build",
+    BuildError.NAMED_VERTICAL_LAYER: "Names are not supported in vertical_build",
+    BuildError.DIVERTOR_LENGTH: "The radial build for the divertor should only contain two entries",
+    BuildError.DIVERTOR_NAMED: "The radial build for the divertor should only contain tuples of length 2",
+    BuildError.DIVERTOR_TYPE: (
+        'The second entry in the radial build for the divertor should be either "lower_divertor" or "upper_divertor"'
+    ),
+    BuildError.DIVERTOR_NOT_AFTER_GAP: "The first entry in the radial build for the divertor should be a LayerType.GAP",
+}
+
+
+def stack_builds(builds) -> tuple:
+    """Stacks builds into the arrays taken by the batch validators.
+
+    Shorter builds are padded at the end with layers of kind "". LayerTypes
+    are given by their value and the divertor kinds as they are, any other
+    kind, including the value of a LayerType given as a string which the
+    single build validators reject, becomes its repr. Thicknesses that are
+    missing or are not ints or floats become NaN and unnamed layers have the
+    name "".
+
+    Args:
+        builds: lists of (LayerType, thickness[, name]) tuples, or
+            RadialBuilds.
+
+    Returns:
+        tuple: the (kinds, thicknesses, names) arrays, each of shape
+        (number of builds, length of the longest build).
+    """
+    width = max((len(build) for build in builds), default=0)
+    kinds = np.full((len(builds), width), "", dtype=object)
+    thicknesses = np.full((len(builds), width), np.nan)
+    names = np.full((len(builds), width), "", dtype=object)
+    for row, build in enumerate(builds):
+        for column, item in enumerate(build):
+            item = tuple(item) if isinstance(item, (tuple, list)) else (item,)
+            kinds[row, column] = _kind_value(item[0] if item else None)
+            if len(item) > 1 and isinstance(item[1], (int, float)):
+                thicknesses[row, column] = item[1]
+            if len(item) > 2:
+                names[row, column] = str(item[2])
+    return kinds.astype(str), thicknesses, names.astype(str)
+
+
+def _kind_value(kind) -> str:
+    if isinstance(kind, LayerType):
+        return kind.value
+    if isinstance(kind, str) and kind in _DIVERTOR_TYPES:
+        return kind
+    return repr(kind)
+
+
+def _as_arrays(kinds, thicknesses, names, minimum_width=1):
+    kinds = np.asarray(kinds, dtype=str)
+    thicknesses = np.asarray(thicknesses, dtype=float)
+    names = np.full(kinds.shape, "") if names is None else np.asarray(names, dtype=str)
+    if kinds.ndim != 2 or thicknesses.shape != kinds.shape or names.shape != kinds.shape:
+        raise ValueError(
+            f"kinds, thicknesses and names should be 2D arrays of the same shape, not {kinds.shape}, "
+            f"{thicknesses.shape} and {names.shape}"
+        )
+    # pad so that every row has the columns the rules look at
+    padding = ((0, 0), (0, max(minimum_width - kinds.shape[1], 0)))
+    return (
+        np.pad(kinds, padding, constant_values=""),
+        np.pad(thicknesses, padding, constant_values=np.nan),
+        np.pad(names, padding, constant_values=""),
+    )
+
+
+def _first_errors(layer_codes):
+    """The code of the first layer of each row with an error, or OK."""
+    first = np.argmax(layer_codes != BuildError.OK, axis=1)
+    return layer_codes[np.arange(len(layer_codes)), first]
+
+
+def _plasma_build_errors(kinds, thicknesses):
+    """The rules of paramak.utils.validate_plasma_radial_build."""
+    rows = np.arange(len(kinds))
+    present = kinds != ""
+    is_plasma = kinds == LayerType.PLASMA.value
+    plasma_count = np.cumsum(is_plasma, axis=1)
+
+    # the rules checked for each layer in turn, the first broken one is kept
+    layer_codes = np.select(
+        [
+            present & ~np.isin(kinds, _LAYER_TYPES),
+            present & np.isnan(thicknesses),
+            present & ~(thicknesses > 0),
+            is_plasma & (plasma_count > 1),
+        ],
+        [
+            BuildError.INVALID_LAYER_TYPE,
+            BuildError.INVALID_THICKNESS,
+            BuildError.NON_POSITIVE_THICKNESS,
+            BuildError.MULTIPLE_PLASMA,
+        ],
+        BuildError.OK,
+    )
+
+    plasma_index = np.argmax(is_plasma, axis=1)
+    last_index = present.sum(axis=1) - 1
+    before = kinds[rows, np.maximum(plasma_index - 1, 0)]
+    after = kinds[rows, np.minimum(plasma_index + 1, kinds.shape[1] - 1)]
+    build_codes = np.select(
+        [
+            plasma_count[:, -1] != 1,
+            (plasma_index == 0) | (plasma_index == last_index),
+            (before != LayerType.GAP.value) | (after != LayerType.GAP.value),
+        ],
+        [BuildError.PLASMA_NOT_FOUND, BuildError.PLASMA_AT_END, BuildError.PLASMA_NOT_BETWEEN_GAPS],
+        BuildError.OK,
+    )
+    codes = _first_errors(layer_codes)
+    return np.where(codes != BuildError.OK, codes, build_codes)
+
+
+def _spherical_layer_names(kinds, names):
+    """The assembly names spherical_tokamak gives the solid layers, as given
+    or layer_1, layer_2... in order, and "" for the other layers."""
+    is_solid = kinds == LayerType.SOLID.value
+    default_names = np.char.add("layer_", np.cumsum(is_solid, axis=1).astype(str))
+    return np.where(is_solid, np.where(names != "", names, default_names), "")
+
+
+def _tokamak_layer_names(kinds, names):
+    """The assembly names tokamak gives the layers of valid builds, "" for
+    the layers that are not parts.
+
+    The first solid layers before the plasma, as many as there are more
+    solid layers before the plasma than after it, are the center column
+    cylinders named as given or layer_1, layer_2... Each solid layer after
+    the plasma is then a blanket layer named after the layer as far before
+    the plasma, or as given, or by the count of the layers so far."""
+    columns = np.arange(kinds.shape[1])
+    is_solid = kinds == LayerType.SOLID.value
+    length = (kinds != "").sum(axis=1, keepdims=True)
+    plasma = np.argmax(kinds == LayerType.PLASMA.value, axis=1)[:, None]
+    before = columns < plasma
+    cylinders = np.maximum((is_solid & before).sum(axis=1) - (is_solid & ~before).sum(axis=1), 0)[:, None]
+    solid_number = np.cumsum(is_solid, axis=1)
+    is_cylinder = is_solid & before & (solid_number <= cylinders)
+    cylinder_names = np.where(names != "", names, np.char.add("layer_", solid_number.astype(str)))
+
+    is_blanket = is_solid & ~before
+    blanket_number = cylinders + np.cumsum(is_blanket, axis=1)
+    # the layer as far before the plasma, wrapping around to the end of the
+    # build as negative indexes do
+    mirror = 2 * plasma - columns
+    mirror = np.clip(np.where(mirror < 0, mirror + length, mirror), 0, kinds.shape[1] - 1)
+    mirror_names = np.take_along_axis(names, mirror, axis=1)
+    blanket_names = np.where(
+        mirror_names != "",
+        mirror_names,
+        np.where(names != "", names, np.char.add("layer_", blanket_number.astype(str))),
+    )
+    return np.where(is_cylinder, cylinder_names, np.where(is_blanket, blanket_names, ""))
+
+
+def _has_duplicates(names):
+    """Whether each row has a name, other than "", more than once or a name
+    used by the plasma."""
+    ordered = np.sort(names, axis=1)
+    repeated = (ordered[:, 1:] == ordered[:, :-1]) & (ordered[:, 1:] != "")
+    return repeated.any(axis=1) | (names == "plasma").any(axis=1)
+
+
+def validate_radial_builds(kinds, thicknesses, names=None, builder="tokamak") -> tuple:
+    """Validates many radial builds at once with the rules of
+    paramak.utils.validate_plasma_radial_build, also checking that the
+    layers are given unique names as paramak.utils.validate_unique_assembly_names
+    does for the layers of a reactor.
+
+    Args:
+        kinds: the layer type values, one row per build padded at the end
+            with "", see stack_builds.
+        thicknesses: the layer thicknesses, NaN where not a number.
+        names: the layer names, "" for unnamed layers. Defaults to None for
+            builds without names.
+        builder: the reactor builder, or its name, whose naming of the
+            layers the names are checked with. Defaults to "tokamak".
+
+    Returns:
+        tuple: a boolean array which is True for the valid builds and an
+        array of the BuildError code of each build.
+
+    Usage::
+
+        kinds, thicknesses, names = stack_builds(radial_builds)
+        valid, codes = validate_radial_builds(kinds, thicknesses, names)
+        radial_builds = [build for build, ok in zip(radial_builds, valid) if ok]
+    """
+    kinds, thicknesses, names = _as_arrays(kinds, thicknesses, names)
+    codes = _plasma_build_errors(kinds, thicknesses)
+    # the default names are unique, so only valid builds with names are checked
+    checked = (codes == BuildError.OK) & (names != "").any(axis=1)
+    if checked.any():
+        if getattr(builder, "__name__", builder) in _SPHERICAL_BUILDERS:
+            layer_names = _spherical_layer_names(kinds[checked], names[checked])
+        else:
+            layer_names = _tokamak_layer_names(kinds[checked], names[checked])
+        codes[checked] = np.where(_has_duplicates(layer_names), BuildError.DUPLICATE_NAMES, BuildError.OK)
+    return codes == BuildError.OK, codes
+
+
+def validate_vertical_builds(kinds, thicknesses, names=None) -> tuple:
+    """Validates many vertical builds at once with the rules of
+    paramak.utils.validate_plasma_radial_build, also checking that no layer
+    is named as paramak.utils.validate_vertical_build_names does. The
+    arguments and returns are those of validate_radial_builds."""
+    kinds, thicknesses, names = _as_arrays(kinds, thicknesses, names)
+    named = (names != "").any(axis=1)
+    codes = np.where(named, BuildError.NAMED_VERTICAL_LAYER, _plasma_build_errors(kinds, thicknesses))
+    return codes == BuildError.OK, codes
+
+
+def validate_divertor_radial_builds(kinds, thicknesses, names=None) -> tuple:
+    """Validates many divertor radial builds at once with the rules of
+    paramak.utils.validate_divertor_radial_build. The arguments and returns
+    are those of validate_radial_builds."""
+    kinds, thicknesses, names = _as_arrays(kinds, thicknesses, names, minimum_width=2)
+    pair_thicknesses = thicknesses[:, :2]
+    codes = np.select(
+        [
+            (kinds != "").sum(axis=1) != 2,
+            (names[:, :2] != "").any(axis=1),
+            ~np.isin(kinds[:, 1], _DIVERTOR_TYPES),
+            kinds[:, 0] != LayerType.GAP.value,
+            np.isnan(pair_thicknesses).any(axis=1),
+            (pair_thicknesses <= 0).any(axis=1),
+        ],
+        [
+            BuildError.DIVERTOR_LENGTH,
+            BuildError.DIVERTOR_NAMED,
+            BuildError.DIVERTOR_TYPE,
+            BuildError.DIVERTOR_NOT_AFTER_GAP,
+            BuildError.INVALID_THICKNESS,
+            BuildError.NON_POSITIVE_THICKNESS,
+        ],
+        BuildError.OK,
+    )
+    return codes == BuildError.OK, codes
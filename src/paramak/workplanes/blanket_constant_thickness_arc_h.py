@@ -2,6 +2,7 @@ import typing
 
 import cadquery as cq
 
+from ..profiling import stage
 from ..utils import create_wire_workplane_from_points
 
 
@@ -44,9 +45,11 @@ def blanket_constant_thickness_arc_h(
 
     points.append(points[0])
 
-    wire = create_wire_workplane_from_points(points=points, plane=plane, origin=origin, obj=obj)
+    with stage("wire", name):
+        wire = create_wire_workplane_from_points(points=points, plane=plane, origin=origin, obj=obj)
 
-    solid = wire.revolve(rotation_angle)
+    with stage("revolve", name, angle=rotation_angle):
+        solid = wire.revolve(rotation_angle)
     solid.name = name
     solid.color = cq.Color(*color)
     return solid
@@ -1,6 +1,7 @@
 import warnings
 import typing
 
+from ..profiling import stage
 from ..utils import create_wire_workplane_from_points
 import mpmath
 import numpy as np
@@ -285,25 +286,28 @@ def blanket_from_plasma(
     if not (-1.0 <= triangularity <= 1.0):
         raise ValueError(f"triangularity must be between -1 and 1, got {triangularity}.")
 
-    points = find_points(
-        thickness=thickness,
-        start_angle=start_angle,
-        stop_angle=stop_angle,
-        minor_radius=minor_radius,
-        major_radius=major_radius,
-        triangularity=triangularity,
-        elongation=elongation,
-        vertical_displacement=vertical_displacement,
-        offset_from_plasma=offset_from_plasma,
-        num_points=num_points,
-        allow_overlapping_shape=allow_overlapping_shape,
-        connect_to_center=connect_to_center,
-    )
+    with stage("profile", name, num_points=num_points):
+        points = find_points(
+            thickness=thickness,
+            start_angle=start_angle,
+            stop_angle=stop_angle,
+            minor_radius=minor_radius,
+            major_radius=major_radius,
+            triangularity=triangularity,
+            elongation=elongation,
+            vertical_displacement=vertical_displacement,
+            offset_from_plasma=offset_from_plasma,
+            num_points=num_points,
+            allow_overlapping_shape=allow_overlapping_shape,
+            connect_to_center=connect_to_center,
+        )
     points.append(points[0])
 
-    wire = create_wire_workplane_from_points(points=points, plane=plane, origin=origin, obj=obj)
+    with stage("wire", name):
+        wire = create_wire_workplane_from_points(points=points, plane=plane, origin=origin, obj=obj)
 
-    solid = wire.revolve(rotation_angle)
+    with stage("revolve", name, angle=rotation_angle):
+        solid = wire.revolve(rotation_angle)
     solid.name = name
     solid.color = color
     return solid
@@ -4,6 +4,7 @@ import typing
 
 import cadquery as cq
 
+from ..profiling import stage
 from ..utils import create_wire_workplane_from_points
 from ..workplanes.cutting_wedge import cutting_wedge
 
@@ -158,7 +159,8 @@ def constant_thickness_dome(
         origin=origin,
         obj=obj,
     )
-    inner_cylinder_cutter = wire.revolve(360)
+    with stage("revolve", name, angle=360):
+        inner_cylinder_cutter = wire.revolve(360)
 
     wire = create_wire_workplane_from_points(
         points=(
@@ -174,16 +176,20 @@ def constant_thickness_dome(
         origin=origin,
         obj=obj,
     )
-    outer_cylinder_cutter = wire.revolve(360)
+    with stage("revolve", name, angle=360):
+        outer_cylinder_cutter = wire.revolve(360)
 
-    cap = big_sphere.cut(small_sphere)
+    with stage("cut", name):
+        cap = big_sphere.cut(small_sphere)
 
     height = 2 * (radius_of_sphere + abs(center_point[1]) + thickness)
     radius = 2 * (radius_of_sphere + abs(center_point[0]) + thickness)
     cutter = cutting_wedge(height=height, radius=radius, rotation_angle=rotation_angle, plane=plane)
 
-    cap = cap.cut(outer_cylinder_cutter).cut(inner_cylinder_cutter)
-    cap = cap.intersect(cutter)
+    with stage("cut", name):
+        cap = cap.cut(outer_cylinder_cutter).cut(inner_cylinder_cutter)
+    with stage("intersect", name, angle=rotation_angle):
+        cap = cap.intersect(cutter)
 
     cap.name = name
     cap.color = cq.Color(*color)
@@ -2,6 +2,7 @@ import typing
 
 import cadquery as cq
 
+from ..profiling import stage
 from ..utils import create_wire_workplane_from_points
 
 
@@ -36,11 +37,13 @@ def cutting_wedge(
     ]
     points.append(points[0])
 
-    wire = create_wire_workplane_from_points(points=points, plane=plane, origin=origin, obj=obj)
+    with stage("wire", name):
+        wire = create_wire_workplane_from_points(points=points, plane=plane, origin=origin, obj=obj)
 
-    solid = wire.revolve(
-        angleDegrees=rotation_angle,
-    )
+    with stage("revolve", name, angle=rotation_angle):
+        solid = wire.revolve(
+            angleDegrees=rotation_angle,
+        )
     # The code can be changed to revolve it in the other direction
     # solid = wire.revolve(
     #     angleDegrees=rotation_angle,
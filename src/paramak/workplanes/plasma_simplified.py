@@ -2,6 +2,7 @@ import typing
 
 import numpy as np
 
+from ..profiling import stage
 from ..utils import create_wire_workplane_from_points
 
 
@@ -55,20 +56,25 @@ def plasma_simplified(
     def Z(theta):
         return elongation * minor_radius * np.sin(theta) + vertical_displacement
 
-    points = np.stack((R(theta), Z(theta)), axis=1).tolist()
+    with stage("profile", name, num_points=num_points):
+        points = np.stack((R(theta), Z(theta)), axis=1).tolist()
     points.append(points[0])
     for point in points:
         point.append("spline")
 
-    wire = create_wire_workplane_from_points(points=points, plane=plane, origin=origin, obj=obj)
+    with stage("wire", name):
+        wire = create_wire_workplane_from_points(points=points, plane=plane, origin=origin, obj=obj)
 
     # avoids shape with surface on join that can't be meshed for 360 degree plasmas
     if rotation_angle >= 360:
-        solid1 = wire.revolve(180, (1, 0, 0), (1, 1, 0))
-        solid2 = solid1.mirror(solid1.faces(">X"), union=True)
-        solid = solid2.union(solid1)  # todo try fuzzy bool tol=0.01
+        with stage("revolve", name, angle=180):
+            solid1 = wire.revolve(180, (1, 0, 0), (1, 1, 0))
+        with stage("union", name):
+            solid2 = solid1.mirror(solid1.faces(">X"), union=True)
+            solid = solid2.union(solid1)  # todo try fuzzy bool tol=0.01
     else:
-        solid = wire.revolve(rotation_angle)
+        with stage("revolve", name, angle=rotation_angle):
+            solid = wire.revolve(rotation_angle)
     solid.name = name
     solid.color = color
     return solid
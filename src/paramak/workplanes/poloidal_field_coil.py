@@ -1,5 +1,6 @@
 import typing
 
+from ..profiling import stage
 from ..utils import create_wire_workplane_from_points
 
 
@@ -39,9 +40,11 @@ def poloidal_field_coil(
 
     points.append(points[0])
 
-    wire = create_wire_workplane_from_points(points=points, plane=plane, origin=origin, obj=obj)
+    with stage("wire", name):
+        wire = create_wire_workplane_from_points(points=points, plane=plane, origin=origin, obj=obj)
 
-    solid = wire.revolve(rotation_angle)
+    with stage("revolve", name, angle=rotation_angle):
+        solid = wire.revolve(rotation_angle)
     solid.name = name
     solid.color = color
     return solid
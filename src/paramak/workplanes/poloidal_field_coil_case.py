@@ -1,5 +1,6 @@
 import typing
 
+from ..profiling import stage
 from ..utils import create_wire_workplane_from_points
 
 
@@ -60,11 +61,15 @@ def poloidal_field_coil_case(
     ]
     outer_points.append(outer_points[0])
 
-    inner_wire = create_wire_workplane_from_points(points=inner_points, plane=plane, origin=origin, obj=obj)
-    outer_wire = create_wire_workplane_from_points(points=outer_points, plane=plane, origin=origin, obj=obj)
+    with stage("wire", name):
+        inner_wire = create_wire_workplane_from_points(points=inner_points, plane=plane, origin=origin, obj=obj)
+        outer_wire = create_wire_workplane_from_points(points=outer_points, plane=plane, origin=origin, obj=obj)
 
-    inner_solid = inner_wire.revolve(rotation_angle)
-    solid = outer_wire.revolve(rotation_angle).cut(inner_solid)
+    with stage("revolve", name, angle=rotation_angle):
+        inner_solid = inner_wire.revolve(rotation_angle)
+        solid = outer_wire.revolve(rotation_angle)
+    with stage("cut", name):
+        solid = solid.cut(inner_solid)
     solid.name = name
     solid.color = color
     return solid
@@ -2,6 +2,7 @@ import typing
 
 import cadquery as cq
 
+from ..profiling import stage
 from ..utils import create_wire_workplane_from_points
 
 
@@ -55,9 +56,11 @@ def revolved_shape(
     # close the profile by repeating the first point at the end
     closed_points = list(points) + [points[0]]
 
-    wire = create_wire_workplane_from_points(points=closed_points, plane=plane, origin=origin, obj=obj)
+    with stage("wire", name):
+        wire = create_wire_workplane_from_points(points=closed_points, plane=plane, origin=origin, obj=obj)
 
-    solid = wire.revolve(rotation_angle)
+    with stage("revolve", name, angle=rotation_angle):
+        solid = wire.revolve(rotation_angle)
     solid.name = name
     solid.color = color
     return solid
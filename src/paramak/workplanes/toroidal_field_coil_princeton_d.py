@@ -5,6 +5,7 @@ import numpy as np
 from scipy import integrate
 from scipy.optimize import brentq
 
+from ..profiling import stage
 from ..utils import create_wire_workplane_from_points, rotate_solid
 from ..workplanes.cutting_wedge import cutting_wedge
 
@@ -212,27 +213,35 @@ def toroidal_field_coil_princeton_d(
     )
     # need to get square end, it appears to miss the last point in the solid, TODO fix so this append is not needed
     points.append(points[-1])
-    wire = create_wire_workplane_from_points(points=points, plane=plane, origin=origin, obj=obj)
-    solid = wire.extrude(until=distance / 2, both=True)
-    solid = rotate_solid(angles=azimuthal_placement_angles, solid=solid)
+    with stage("wire", name):
+        wire = create_wire_workplane_from_points(points=points, plane=plane, origin=origin, obj=obj)
+    with stage("extrude", name, distance=distance):
+        solid = wire.extrude(until=distance / 2, both=True)
+    with stage("rotate", name, copies=len(azimuthal_placement_angles)):
+        solid = rotate_solid(angles=azimuthal_placement_angles, solid=solid)
 
     if with_inner_leg:
         inner_leg_connection_points = [(x, z, "straight") for x, z in inner_leg_connection_points]
         # need to get square end, it appears to miss the last point in the solid, TODO fix so this append is not needed
         inner_leg_connection_points.append(inner_leg_connection_points[-1])
-        inner_wire = create_wire_workplane_from_points(
-            points=inner_leg_connection_points, plane=plane, origin=origin, obj=obj
-        )
-        inner_solid = inner_wire.extrude(until=distance / 2, both=True)
-        inner_solid = rotate_solid(angles=azimuthal_placement_angles, solid=inner_solid)
-        solid = solid.union(inner_solid)
+        with stage("wire", name):
+            inner_wire = create_wire_workplane_from_points(
+                points=inner_leg_connection_points, plane=plane, origin=origin, obj=obj
+            )
+        with stage("extrude", name, distance=distance):
+            inner_solid = inner_wire.extrude(until=distance / 2, both=True)
+        with stage("rotate", name, copies=len(azimuthal_placement_angles)):
+            inner_solid = rotate_solid(angles=azimuthal_placement_angles, solid=inner_solid)
+        with stage("union", name):
+            solid = solid.union(inner_solid)
 
     if rotation_angle < 360.0:
         bb = solid.val().BoundingBox()
         radius = max(bb.xmax, bb.ymax) * 2.1  # larger than the bounding box to ensure clean cut
         height = max(bb.zmax, bb.zmin) * 2.1  # larger than the bounding box to ensure clean cut
         cutting_shape = cutting_wedge(height=height, radius=radius, rotation_angle=rotation_angle)
-        solid = solid.intersect(cutting_shape)
+        with stage("intersect", name, angle=rotation_angle):
+            solid = solid.intersect(cutting_shape)
 
     solid.name = name
     solid.color = color
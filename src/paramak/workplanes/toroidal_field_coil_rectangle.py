@@ -1,5 +1,6 @@
 import typing
 
+from ..profiling import stage
 from ..utils import create_wire_workplane_from_points, rotate_solid
 from ..workplanes.cutting_wedge import cutting_wedge
 
@@ -91,9 +92,12 @@ def toroidal_field_coil_rectangle(
     # adds any vertical displacement and the connection type to the points
     points = [(point[0], point[1] + vertical_displacement, "straight") for point in points]
 
-    wire = create_wire_workplane_from_points(points=points, plane=plane, origin=origin, obj=obj)
-    solid = wire.extrude(until=distance / 2, both=True)
-    solid = rotate_solid(angles=azimuthal_placement_angles, solid=solid)
+    with stage("wire", name):
+        wire = create_wire_workplane_from_points(points=points, plane=plane, origin=origin, obj=obj)
+    with stage("extrude", name, distance=distance):
+        solid = wire.extrude(until=distance / 2, both=True)
+    with stage("rotate", name, copies=len(azimuthal_placement_angles)):
+        solid = rotate_solid(angles=azimuthal_placement_angles, solid=solid)
 
     if with_inner_leg:
         inner_leg_connection_points = [
@@ -103,19 +107,24 @@ def toroidal_field_coil_rectangle(
             (points[5][0], points[5][1], "straight"),
             (points[0][0], points[0][1], "straight"),
         ]
-        inner_wire = create_wire_workplane_from_points(
-            points=inner_leg_connection_points, plane=plane, origin=origin, obj=obj
-        )
-        inner_solid = inner_wire.extrude(until=distance / 2, both=True)
-        inner_solid = rotate_solid(angles=azimuthal_placement_angles, solid=inner_solid)
-        solid = solid.union(inner_solid)
+        with stage("wire", name):
+            inner_wire = create_wire_workplane_from_points(
+                points=inner_leg_connection_points, plane=plane, origin=origin, obj=obj
+            )
+        with stage("extrude", name, distance=distance):
+            inner_solid = inner_wire.extrude(until=distance / 2, both=True)
+        with stage("rotate", name, copies=len(azimuthal_placement_angles)):
+            inner_solid = rotate_solid(angles=azimuthal_placement_angles, solid=inner_solid)
+        with stage("union", name):
+            solid = solid.union(inner_solid)
 
     if rotation_angle < 360.0:
         bb = solid.val().BoundingBox()
         radius = max(bb.xmax, bb.ymax) * 1.1  # 10% larger than the bounding box to ensure clean cut
         height = max(bb.zmax, bb.zmin) * 2.1  # 10% larger than the bounding box to ensure clean cut
         cutting_shape = cutting_wedge(height=height, radius=radius, rotation_angle=rotation_angle)
-        solid = solid.intersect(cutting_shape)
+        with stage("intersect", name, angle=rotation_angle):
+            solid = solid.intersect(cutting_shape)
 
     solid.name = name
     solid.color = color
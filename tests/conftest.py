@@ -0,0 +1,19 @@
+import cadquery as cq
+import pytest
+
+from paramak.assemblies.assembly import Assembly
+
+
+def box_and_sphere():
+    """Returns an assembly of a 1 x 2 x 3 box at the origin and a unit sphere
+    at (5, 0, 0)."""
+    assembly = Assembly()
+    assembly.add(cq.Workplane().box(1, 2, 3), name="box")
+    assembly.add(cq.Workplane().sphere(1), name="sphere", loc=cq.Location(cq.Vector(5, 0, 0)))
+    return assembly
+
+
+@pytest.fixture
+def make_assembly():
+    """Makes a new box and sphere assembly each time it is called."""
+    return box_and_sphere
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import paramak
+
+RADIAL_BUILD = [
+    (paramak.LayerType.GAP, 10),
+    (paramak.LayerType.SOLID, 50),
+    (paramak.LayerType.GAP, 50),
+    (paramak.LayerType.PLASMA, 300),
+    (paramak.LayerType.GAP, 60),
+    (paramak.LayerType.SOLID, 30),
+]
+
+
+def test_gather_builds_concurrently():
+    async def build_all(executor):
+        return await asyncio.gather(
+            *[
+                paramak.aspherical_tokamak_from_plasma(
+                    executor=executor, radial_build=RADIAL_BUILD, rotation_angle=angle
+                )
+                for angle in (45, 90)
+            ]
+        )
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        reactors = asyncio.run(build_all(executor))
+
+    assert [reactor.names() for reactor in reactors] == [["layer_1", "layer_2", "plasma"]] * 2
+    volumes = [reactor.part_properties("plasma")["volume"] for reactor in reactors]
+    assert volumes[1] == pytest.approx(2 * volumes[0], rel=0.02)
+
+
+def test_timeout_and_cancellation():
+    async def build_with_queued_cancel(executor):
+        with pytest.raises(asyncio.TimeoutError) as error:
+            await paramak.aspherical_tokamak_from_plasma(
+                timeout=0.01, executor=executor, radial_build=RADIAL_BUILD, rotation_angle=90
+            )
+        assert isinstance(error.value, paramak.BuildTimeoutError)
+        # the timed out build was stopped so the single worker is free at once
+        start = time.perf_counter()
+        await asyncio.get_running_loop().run_in_executor(executor, time.sleep, 0)
+        assert time.perf_counter() - start < 0.3
+
+        # a build keeps the single worker busy so the next one waits in the queue
+        busy = asyncio.ensure_future(
+            paramak.aspherical_tokamak_from_plasma(executor=executor, radial_build=RADIAL_BUILD)
+        )
+        task = asyncio.ensure_future(
+            paramak.aspherical_tokamak_from_plasma(executor=executor, radial_build=RADIAL_BUILD)
+        )
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert (await busy).names() == ["layer_1", "layer_2", "plasma"]
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        asyncio.run(build_with_queued_cancel(executor))
+
+
+def test_cancelling_a_started_build_stops_it():
+    async def cancel_started_build(executor):
+        task = asyncio.ensure_future(
+            paramak.atokamak_from_plasma(executor=executor, radial_build=RADIAL_BUILD, rotation_angle=360)
+        )
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # the build was stopped so the single worker is free at once
+        start = time.perf_counter()
+        await asyncio.get_running_loop().run_in_executor(executor, time.sleep, 0)
+        assert time.perf_counter() - start < 0.5
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        asyncio.run(cancel_started_build(executor))
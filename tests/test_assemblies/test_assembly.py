@@ -1,4 +1,5 @@
 import cadquery as cq
+import numpy as np
 import pytest
 from paramak.assemblies.assembly import Assembly
 
@@ -82,3 +83,228 @@ def test_rename_split_solid_group():
 
     renamed = split.rename("coil", "tf coil")
     assert renamed.names() == ["tf coil_1", "tf coil_2"]
+
+
+def test_compact():
+    box = cq.Workplane().box(2, 2, 2).cut(cq.Workplane().box(1, 1, 3))
+    assembly = Assembly()
+    assembly.add(box, name="box", color=cq.Color(0.1, 0.2, 0.3))
+    assembly.add(cq.Workplane().moveTo(5, 0).sphere(1), name="sphere")
+    assembly.major_radius = 5
+
+    compact = assembly.compact()
+
+    assert compact.names() == ["box", "sphere"]
+    assert compact.major_radius == 5
+    assert isinstance(compact.objects["box"].obj, cq.Shape)
+    assert compact.objects["box"].color.toTuple() == assembly.objects["box"].color.toTuple()
+    assert compact.objects["box"].obj.Volume() == pytest.approx(box.val().Volume())
+    # the original assembly keeps its Workplanes
+    assert isinstance(assembly.objects["box"].obj, cq.Workplane)
+
+
+def test_compact_keeps_nested_assemblies():
+    box = cq.Workplane().box(2, 2, 2).cut(cq.Workplane().box(1, 1, 3))
+    inner = Assembly(name="magnets")
+    inner.add(box, name="coil", loc=cq.Location(cq.Vector(5, 0, 0)), material=cq.Material("copper"))
+    inner.add(cq.Workplane().sphere(1), name="sphere", metadata={"source": "inner"})
+    assembly = Assembly()
+    assembly.add(cq.Workplane().sphere(1), name="sphere")
+    assembly.add(inner, loc=cq.Location(cq.Vector(0, 0, 10)))
+    assembly.objects["magnets/coil"].addSubshape(box.faces(">Z").val(), name="top")
+
+    compact = assembly.compact()
+
+    # same named parts in different sub assemblies are both kept
+    assert compact.names() == assembly.names()
+    assert set(compact.objects) == set(assembly.objects)
+    coil = compact.objects["magnets/coil"]
+    assert isinstance(coil.obj, cq.Shape)
+    assert coil.material.name == "copper"
+    assert coil._subshape_names == assembly.objects["magnets/coil"]._subshape_names
+    assert compact.objects["magnets/sphere"].metadata == {"source": "inner"}
+    # the parts keep the location of the sub assembly holding them
+    assert compact.objects["magnets"].loc.toTuple() == assembly.objects["magnets"].loc.toTuple()
+    compact_box = compact.toCompound().BoundingBox()
+    box_box = assembly.toCompound().BoundingBox()
+    assert (compact_box.zmin, compact_box.zmax, compact_box.xmax) == pytest.approx(
+        (box_box.zmin, box_box.zmax, box_box.xmax)
+    )
+
+
+def test_edits_share_unchanged_parts():
+    assembly = Assembly()
+    assembly.add(cq.Workplane().box(1, 1, 1), name="layer_1")
+    assembly.add(cq.Workplane().moveTo(5, 0).box(1, 1, 1), name="layer_2")
+    assembly.add(cq.Workplane().sphere(1), name="plasma")
+
+    edited = assembly.remove("plasma").rename("layer_1", "first wall")
+
+    assert edited.names() == ["first wall", "layer_2"]
+    # the untouched part is the same node, the renamed part keeps its object
+    assert edited.objects["layer_2"] is assembly.objects["layer_2"]
+    assert edited.objects["first wall"].obj is assembly.objects["layer_1"].obj
+    assert isinstance(edited.objects["first wall"].obj, cq.Workplane)
+    assert assembly.names() == ["layer_1", "layer_2", "plasma"]
+    assert assembly.objects["layer_1"].name == "layer_1"
+
+
+def test_edits_find_parts_nested_in_sub_assemblies():
+    inner = Assembly(name="magnets")
+    inner.add(cq.Workplane().box(1, 1, 1), name="tf_coil")
+    inner.add(cq.Workplane().moveTo(5, 0).box(1, 1, 1), name="pf_coil")
+    assembly = Assembly()
+    assembly.add(cq.Workplane().sphere(1), name="plasma")
+    assembly.add(inner, loc=cq.Location(cq.Vector(0, 0, 10)))
+
+    removed = assembly.remove("pf_coil")
+    renamed = assembly.rename("tf_coil", "toroidal field coil")
+
+    assert removed.names() == ["plasma", "tf_coil"]
+    assert renamed.names() == ["plasma", "toroidal field coil", "pf_coil"]
+    assert "magnets/toroidal field coil" in renamed.objects
+    # the sub assembly is rebuilt around the edit, keeping its location
+    assert renamed.objects["magnets"].loc.toTuple() == assembly.objects["magnets"].loc.toTuple()
+    assert renamed.objects["magnets/pf_coil"] is assembly.objects["magnets/pf_coil"]
+    assert renamed.objects["plasma"] is assembly.objects["plasma"]
+    assert assembly.names() == ["plasma", "tf_coil", "pf_coil"]
+
+
+def test_edited_assemblies_share_read_only_parts():
+    assembly = Assembly()
+    assembly.add(cq.Workplane().box(1, 1, 1), name="layer_1")
+    assembly.add(cq.Workplane().sphere(1), name="plasma")
+
+    edited = assembly.remove("plasma")
+
+    # shared parts are the same nodes, so changes made in place show in both
+    shared = edited.objects["layer_1"]
+    assert shared is assembly.objects["layer_1"]
+    assert shared.parent is assembly
+    shared.color = cq.Color(1, 0, 0)
+    assert assembly.objects["layer_1"].color is shared.color
+
+    # edit makes new nodes for the parts it changes instead
+    recolored = edited.edit(colors={"layer_1": (0, 0, 1)})
+    assert recolored.objects["layer_1"].parent is recolored
+    assert assembly.objects["layer_1"].color.toTuple() == pytest.approx((1, 0, 0, 1))
+
+
+def test_names_updated_after_add():
+    assembly = Assembly()
+    assembly.add(cq.Workplane().box(1, 1, 1), name="box")
+    assert assembly.names() == ["box"]
+
+    assembly.add(cq.Workplane().sphere(1), name="sphere")
+    assert assembly.names() == ["box", "sphere"]
+
+
+def test_edit_applies_all_edits():
+    assembly = Assembly()
+    assembly.add(cq.Workplane().box(1, 1, 1), name="layer_1")
+    assembly.add(
+        cq.Compound.makeCompound([cq.Solid.makeBox(1, 1, 1), cq.Solid.makeBox(1, 1, 1, pnt=cq.Vector(5, 0, 0))]),
+        name="layer_2",
+    )
+    assembly.add(cq.Workplane().sphere(1), name="plasma")
+
+    edited = assembly.edit(
+        remove=["plasma"],
+        rename={"layer_1": "first wall", "layer_2": "blanket"},
+        colors={"layer_1": (1, 0, 0)},
+        split=True,
+    )
+
+    assert edited.names() == ["first wall", "blanket_1", "blanket_2"]
+    assert edited.objects["first wall"].color.toTuple() == pytest.approx((1, 0, 0, 1))
+    assert assembly.objects["layer_1"].color is None
+
+
+def test_edit_checks_unique_names_before_editing():
+    assembly = Assembly()
+    assembly.add(cq.Workplane().box(1, 1, 1), name="layer_1")
+    assembly.add(cq.Workplane().moveTo(5, 0).box(1, 1, 1), name="layer_2")
+
+    with pytest.raises(ValueError):
+        assembly.edit(rename={"layer_1": "blanket", "layer_2": "blanket"})
+
+    # renaming onto a removed part's name is allowed
+    edited = assembly.edit(remove=["layer_2"], rename={"layer_1": "layer_2"})
+    assert edited.names() == ["layer_2"]
+
+
+def test_split_names_colliding_with_existing_parts_raise():
+    assembly = Assembly()
+    assembly.add(
+        cq.Compound.makeCompound([cq.Solid.makeBox(1, 1, 1), cq.Solid.makeBox(1, 1, 1, pnt=cq.Vector(5, 0, 0))]),
+        name="x",
+    )
+    assembly.add(cq.Workplane().sphere(1), name="x_1")
+
+    with pytest.raises(ValueError, match="x_1"):
+        assembly.split_solids()
+    with pytest.raises(ValueError, match="x_1"):
+        assembly.edit(rename={"x_1": "y"}, split=True).edit(rename={"y": "x_1"}, split=True)
+
+    # renaming the existing part out of the way first is allowed
+    edited = assembly.edit(rename={"x_1": "sphere"}, split=True)
+    assert edited.names() == ["x_1", "x_2", "sphere"]
+    assert len(edited.children) == len(edited.objects) - 1 == 3
+
+
+def test_properties_table_is_cached():
+    assembly = Assembly()
+    assembly.add(cq.Workplane().box(1, 2, 3), name="box")
+    assembly.add(cq.Workplane().sphere(1), name="sphere", loc=cq.Location(cq.Vector(5, 0, 0)))
+
+    columns = assembly.properties()
+    assert columns["name"] == ["box", "sphere"]
+    assert columns["volume"][0] == pytest.approx(6)
+    assert columns["bounding_box"][1] == pytest.approx([4, -1, -1, 6, 1, 1])
+    assert columns["center_of_mass"][1] == pytest.approx([5, 0, 0])
+    assert list(columns["faces"]) == [6, 1]
+
+    # the renamed part reuses the properties cached on the original
+    renamed = assembly.rename("box", "block")
+    assert renamed.objects["block"]._has_current_properties()
+
+    table = renamed.properties(format="structured")
+    assert list(table["name"]) == ["block", "sphere"]
+    assert table["volume"] == pytest.approx(columns["volume"])
+
+    # replacing a part's object invalidates its cached properties
+    renamed.objects["block"].obj = cq.Workplane().box(1, 1, 1)
+    assert renamed.properties()["volume"][0] == pytest.approx(1)
+
+
+def test_properties_of_nested_parts_use_the_location_of_their_sub_assembly():
+    coil = cq.Workplane().box(1, 1, 1)
+    upper = Assembly(name="upper")
+    upper.add(coil, name="coil", loc=cq.Location(cq.Vector(5, 0, 0)))
+    lower = Assembly(name="lower")
+    lower.add(coil, name="coil")
+    assembly = Assembly()
+    assembly.add(upper, loc=cq.Location(cq.Vector(0, 0, 10)))
+    assembly.add(lower, loc=cq.Location(cq.Vector(0, 0, -10)))
+
+    columns = assembly.properties()
+
+    assert columns["name"] == ["upper/coil", "lower/coil"]
+    assert columns["center_of_mass"] == pytest.approx(np.array([[5, 0, 10], [0, 0, -10]]))
+    assert assembly.part_properties("upper/coil")["bounding_box"] == pytest.approx([4.5, -0.5, 9.5, 5.5, 0.5, 10.5])
+    # the sub assembly on its own places the part at its own location
+    assert upper.properties()["center_of_mass"][0] == pytest.approx([5, 0, 0])
+    # moving a sub assembly moves the parts it holds
+    moved = Assembly()
+    moved.add(upper, loc=cq.Location(cq.Vector(0, 20, 0)))
+    assert moved.properties()["center_of_mass"][0] == pytest.approx([5, 20, 0])
+
+
+def test_properties_in_parallel():
+    assembly = Assembly()
+    assembly.add(cq.Workplane().box(1, 2, 3), name="box")
+    assembly.add(cq.Workplane().sphere(1), name="sphere")
+
+    columns = assembly.properties(workers=2)
+
+    assert columns["volume"] == pytest.approx([6, 4 / 3 * 3.141592653589793])
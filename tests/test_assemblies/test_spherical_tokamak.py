@@ -1,5 +1,6 @@
 from pathlib import Path
 
+import cadquery as cq
 import pytest
 
 import paramak
@@ -197,4 +198,65 @@ def test_named_layers_spherical_tokamak():
         .rename("layer_3", "first wall")
         .rename("layer_4", "blanket")
     )
-    assert renamed.names() == ["central column", "tf coil", "first wall", "blanket", "plasma"]
\ No newline at end of file
+    assert renamed.names() == ["central column", "tf coil", "first wall", "blanket", "plasma"]
+
+
+def test_compact_parts_drop_history():
+    "compact=True stores bare shapes with the same names, volumes and metadata"
+
+    radial_build = [
+        (paramak.LayerType.GAP, 10),
+        (paramak.LayerType.SOLID, 50),
+        (paramak.LayerType.GAP, 50),
+        (paramak.LayerType.PLASMA, 300),
+        (paramak.LayerType.GAP, 60),
+        (paramak.LayerType.SOLID, 30),
+    ]
+    full = paramak.spherical_tokamak_from_plasma(radial_build=radial_build, rotation_angle=90)
+    compact = paramak.spherical_tokamak_from_plasma(radial_build=radial_build, rotation_angle=90, compact=True)
+
+    assert compact.names() == full.names()
+    assert compact.elongation == full.elongation
+    for (full_shape, *_), (compact_shape, *_) in zip(full, compact):
+        assert compact_shape.Volume() == pytest.approx(full_shape.Volume())
+    for child in compact.children:
+        assert isinstance(child.obj, cq.Shape)
+    assert all(part["retained_shapes"] == 0 for part in compact.memory_report().values())
+
+
+def test_iter_parts_matches_eager_build():
+    "the part generator yields the same parts, in the same order, as the assembly builder"
+
+    radial_build = [
+        (paramak.LayerType.GAP, 10),
+        (paramak.LayerType.SOLID, 50),
+        (paramak.LayerType.GAP, 50),
+        (paramak.LayerType.PLASMA, 300),
+        (paramak.LayerType.GAP, 60),
+        (paramak.LayerType.SOLID, 10),
+        (paramak.LayerType.SOLID, 30),
+    ]
+    vertical_build = [
+        (paramak.LayerType.SOLID, 30),
+        (paramak.LayerType.SOLID, 10),
+        (paramak.LayerType.GAP, 60),
+        (paramak.LayerType.PLASMA, 700),
+        (paramak.LayerType.GAP, 60),
+        (paramak.LayerType.SOLID, 10),
+        (paramak.LayerType.SOLID, 30),
+    ]
+    cutter = paramak.poloidal_field_coil(height=60, width=60, center_point=(400, 0), rotation_angle=90)
+    arguments = dict(
+        radial_build=radial_build,
+        vertical_build=vertical_build,
+        rotation_angle=90,
+        extra_cut_shapes=[cutter],
+        colors={"plasma": (1, 0, 0)},
+    )
+    eager = paramak.spherical_tokamak(**arguments)
+    parts = list(paramak.iter_spherical_tokamak_parts(**arguments))
+
+    assert [name for name, _, _ in parts] == eager.names()
+    for (name, part, color), (shape, _, _, eager_color) in zip(parts, eager):
+        assert part.val().Volume() == pytest.approx(shape.Volume())
+        assert color.toTuple() == pytest.approx(eager_color.toTuple())
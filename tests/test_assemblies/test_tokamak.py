@@ -1,3 +1,8 @@
+import importlib
+
+import cadquery as cq
+import pytest
+
 import paramak
 
 
@@ -114,4 +119,172 @@ def test_named_layers_tokamak():
         .rename("layer_2", "first wall")
         .rename("layer_3", "blanket")
     )
-    assert renamed.names() == ["central column", "first wall", "blanket", "plasma"]
\ No newline at end of file
+    assert renamed.names() == ["central column", "first wall", "blanket", "plasma"]
+
+
+def test_iter_tokamak_parts_is_lazy_and_matches_eager_build():
+    "parts are only built as the generator is advanced, and match tokamak()"
+
+    arguments = dict(
+        radial_build=[
+            (paramak.LayerType.GAP, 10),
+            (paramak.LayerType.SOLID, 30),
+            (paramak.LayerType.SOLID, 20),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.PLASMA, 300),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.SOLID, 20),
+        ],
+        vertical_build=[
+            (paramak.LayerType.SOLID, 20),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.PLASMA, 700),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.SOLID, 20),
+        ],
+        rotation_angle=90,
+    )
+    with paramak.record_build() as report:
+        parts = paramak.iter_tokamak_parts(**arguments)
+        name, part, _ = next(parts)
+    assert name == "layer_1"
+    assert set(report.parts()) == {"layer_1"}
+
+    eager = paramak.tokamak(**arguments)
+    names = [name] + [name for name, _, _ in parts]
+    assert names == eager.names()
+    assert part.val().Volume() == pytest.approx(eager.objects["layer_1"].obj.val().Volume())
+
+
+def test_lazy_tokamak_builds_parts_on_access():
+    "lazy=True defers building each part until it is accessed"
+
+    arguments = dict(
+        radial_build=[
+            (paramak.LayerType.GAP, 10),
+            (paramak.LayerType.SOLID, 30),
+            (paramak.LayerType.SOLID, 20),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.PLASMA, 300),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.SOLID, 20),
+        ],
+        vertical_build=[
+            (paramak.LayerType.SOLID, 20),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.PLASMA, 700),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.SOLID, 20),
+        ],
+        rotation_angle=90,
+    )
+    eager = paramak.tokamak(**arguments)
+
+    with paramak.record_build() as report:
+        lazy = paramak.tokamak(lazy=True, **arguments)
+        assert lazy.names() == eager.names()
+        assert lazy.major_radius == eager.major_radius
+        assert report.records == []
+
+        plasma = lazy.objects["plasma"].obj
+        assert set(report.parts()) == {"plasma"}
+        assert not lazy.objects["layer_1"].materialized
+
+    assert plasma.val().Volume() == pytest.approx(eager.objects["plasma"].obj.val().Volume())
+    lazy.materialize()
+    for (shape, *_), (eager_shape, *_) in zip(lazy, eager):
+        assert shape.Volume() == pytest.approx(eager_shape.Volume())
+
+    with pytest.raises(ValueError, match="record_build"):
+        paramak.tokamak(lazy=True, profile=True, **arguments)
+
+
+def test_rebuild_from_previous_reuses_unchanged_parts():
+    "only the parts depending on a changed thickness are rebuilt"
+
+    def radial_build(outer_thickness):
+        return [
+            (paramak.LayerType.GAP, 10),
+            (paramak.LayerType.SOLID, 30),
+            (paramak.LayerType.SOLID, 20),
+            (paramak.LayerType.SOLID, 20),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.PLASMA, 300),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.SOLID, 20),
+            (paramak.LayerType.SOLID, outer_thickness),
+        ]
+
+    vertical_build = [
+        (paramak.LayerType.SOLID, 20),
+        (paramak.LayerType.SOLID, 20),
+        (paramak.LayerType.GAP, 50),
+        (paramak.LayerType.PLASMA, 700),
+        (paramak.LayerType.GAP, 50),
+        (paramak.LayerType.SOLID, 20),
+        (paramak.LayerType.SOLID, 20),
+    ]
+    previous = paramak.tokamak(radial_build=radial_build(20), vertical_build=vertical_build, rotation_angle=90)
+
+    with paramak.record_build() as report:
+        rebuilt = paramak.tokamak(
+            radial_build=radial_build(40),
+            vertical_build=vertical_build,
+            rotation_angle=90,
+            colors={"plasma": (1, 0, 0)},
+            previous=previous,
+        )
+
+    assert rebuilt.names() == previous.names()
+    reused_parts = {part for stage, part, *_ in report.records if stage == "reuse"}
+    rebuilt_parts = {part for stage, part, *_ in report.records if stage == "assembly"}
+    assert reused_parts == {"layer_1", "layer_2", "plasma"}
+    assert rebuilt_parts == {"layer_3"}
+    assert rebuilt.objects["layer_1"].obj is previous.objects["layer_1"].obj
+    assert rebuilt.objects["plasma"].obj is previous.objects["plasma"].obj
+    assert rebuilt.objects["plasma"].color.toTuple() == pytest.approx((1, 0, 0, 1))
+
+    fresh = paramak.tokamak(radial_build=radial_build(40), vertical_build=vertical_build, rotation_angle=90)
+    for (shape, *_), (fresh_shape, *_) in zip(rebuilt, fresh):
+        assert shape.Volume() == pytest.approx(fresh_shape.Volume())
+
+    # a part swapped in by the user is not mistaken for the built layer
+    edited = rebuilt.remove("layer_1")
+    edited.add(cq.Workplane().box(1, 1, 1), name="layer_1")
+    assert edited.recipe_keys is None
+    again = paramak.tokamak(
+        radial_build=radial_build(40), vertical_build=vertical_build, rotation_angle=90, previous=edited
+    )
+    assert again.objects["layer_1"].obj.val().Volume() == pytest.approx(fresh.objects["layer_1"].obj.val().Volume())
+
+
+def test_recipe_keys_are_only_made_when_read(monkeypatch):
+    "the extra shapes are not hashed unless the recipe keys are used"
+
+    hashed = []
+    parts_module = importlib.import_module("paramak.assemblies.parts")
+    content_hash = parts_module.content_hash
+    monkeypatch.setattr(parts_module, "content_hash", lambda shape: hashed.append(shape) or content_hash(shape))
+    radial_build = [
+        (paramak.LayerType.GAP, 10),
+        (paramak.LayerType.SOLID, 30),
+        (paramak.LayerType.GAP, 50),
+        (paramak.LayerType.PLASMA, 300),
+        (paramak.LayerType.GAP, 50),
+        (paramak.LayerType.SOLID, 20),
+    ]
+    vertical_build = [
+        (paramak.LayerType.SOLID, 20),
+        (paramak.LayerType.GAP, 50),
+        (paramak.LayerType.PLASMA, 700),
+        (paramak.LayerType.GAP, 50),
+        (paramak.LayerType.SOLID, 20),
+    ]
+    port = cq.Workplane("XZ").center(500, 0).box(50, 50, 1000)
+
+    result = paramak.tokamak(
+        radial_build=radial_build, vertical_build=vertical_build, rotation_angle=90, extra_cut_shapes=[port]
+    )
+    assert hashed == []
+    assert set(result.recipe_keys) == set(result.names())
+    assert hashed != []
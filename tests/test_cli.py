@@ -0,0 +1,59 @@
+import importlib
+import io
+import json
+import os
+
+from paramak.cli import load_specs, main
+from paramak.sweep import read_results
+
+SPEC = {
+    "builder": "spherical_tokamak_from_plasma",
+    "name": "small",
+    "radial_build": [["gap", 10], ["solid", 50], ["gap", 50], ["plasma", 300], ["gap", 60], ["solid", 30]],
+    "rotation_angle": 90,
+    "outputs": ["small.paramak", "small.stl"],
+}
+
+
+def test_load_specs_formats():
+    assert load_specs(json.dumps([SPEC, SPEC])) == [SPEC, SPEC]
+    assert load_specs(json.dumps({"specs": [SPEC]})) == [SPEC]
+    assert load_specs(json.dumps(SPEC) + "\n" + json.dumps(SPEC) + "\n") == [SPEC, SPEC]
+    assert load_specs("builder: tokamak\nradial_build: [[gap, 10]]\n") == [
+        {"builder": "tokamak", "radial_build": [["gap", 10]]}
+    ]
+
+
+def test_build_writes_outputs_and_summary(tmp_path, monkeypatch):
+    broken = {"builder": "spherical_tokamak_from_plasma", "name": "broken", "radial_build": [["gap", 10]]}
+    misspelt = dict(SPEC, builder="spherical_tokamak_from_plasm", name="misspelt")
+    no_builder = {key: value for key, value in SPEC.items() if key not in ("builder", "name")}
+    not_a_mapping = [1, 2]
+    monkeypatch.setattr("sys.stdin", io.StringIO(json.dumps([SPEC, broken, misspelt, no_builder, not_a_mapping])))
+
+    exit_code = main(["build", "-", "-j", "2", "-o", str(tmp_path), "-s", str(tmp_path / "summary.jsonl")])
+
+    assert exit_code == 1
+    assert (tmp_path / "small.paramak").exists()
+    assert (tmp_path / "small.stl").exists()
+    records = {record["name"]: record for record in read_results(tmp_path / "summary.jsonl")}
+    assert records["small"]["status"] == "ok"
+    assert records["small"]["time"] > 0
+    assert records["broken"]["status"] == "failed"
+    # specs without a known builder are recorded as failed without stopping the batch
+    assert records["misspelt"]["status"] == "failed"
+    assert "spherical_tokamak_from_plasm" in records["misspelt"]["error"]
+    assert records["spec_3"]["status"] == "failed"
+    assert "no builder" in records["spec_3"]["error"]
+    assert records["spec_4"]["status"] == "failed"
+    assert "should be a mapping" in records["spec_4"]["error"]
+
+
+def test_build_defaults_to_one_worker_per_cpu(monkeypatch):
+    cli_module = importlib.import_module("paramak.cli")
+    calls = []
+    monkeypatch.setattr(cli_module, "run_cases", lambda jobs, workers, timeout: calls.append(workers) or [])
+    monkeypatch.setattr("sys.stdin", io.StringIO("[]"))
+
+    assert main(["build", "-", "-q"]) == 0
+    assert calls == [os.cpu_count()]
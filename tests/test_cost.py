@@ -0,0 +1,104 @@
+import importlib
+import json
+from concurrent.futures import Future
+from pathlib import Path
+
+import pytest
+
+import paramak
+from paramak.cost import ANGLE_EXPONENT_PRIOR, calibrate, load_calibration
+
+# paramak.sweep is the sweep function, this is its module
+sweep_module = importlib.import_module("paramak.sweep")
+
+BASELINE_PATH = Path(__file__).parent.parent / "benchmarks" / "baseline.json"
+
+
+def radial_build(number_of_layers):
+    solids = [(paramak.LayerType.SOLID, 10)] * number_of_layers
+    return [
+        (paramak.LayerType.GAP, 10),
+        *solids,
+        (paramak.LayerType.GAP, 50),
+        (paramak.LayerType.PLASMA, 300),
+        (paramak.LayerType.GAP, 50),
+        *solids,
+    ]
+
+
+def test_calibration_matches_the_benchmark_baseline():
+    with open(BASELINE_PATH) as file:
+        baseline = json.load(file)
+    expected = calibrate(baseline)
+    assert load_calibration() == pytest.approx(expected)
+
+
+def test_estimate_grows_with_layers_and_cutters():
+    small = paramak.estimate_cost(paramak.spherical_tokamak_from_plasma, radial_build=radial_build(1))
+    large = paramak.estimate_cost("spherical_tokamak_from_plasma", radial_build=radial_build(4))
+    assert large.time > small.time > 0
+    assert large.peak_memory > small.peak_memory
+
+    # JSON specs count one cutter solid per toroidal field coil
+    coils = {
+        "workplane": "toroidal_field_coil_rectangle",
+        "horizontal_start_point": [10, 520],
+        "vertical_mid_point": [860, 0],
+        "thickness": 50,
+        "distance": 40,
+        "azimuthal_placement_angles": [0, 30, 60, 90],
+    }
+    json_spec = {"radial_build": [["gap", 10], ["solid", 10], ["plasma", 300], ["solid", 10]]}
+    without_coils = paramak.estimate_cost("tokamak_from_plasma", **json_spec)
+    with_coils = paramak.estimate_cost("tokamak_from_plasma", extra_cut_shapes=[coils], **json_spec)
+    assert with_coils.time > without_coils.time
+
+
+def test_estimate_grows_with_rotation_angle():
+    narrow = paramak.estimate_cost("tokamak_from_plasma", radial_build=radial_build(2), rotation_angle=90)
+    wide = paramak.estimate_cost("tokamak_from_plasma", radial_build=radial_build(2), rotation_angle=360)
+    assert wide.time >= narrow.time * 4**ANGLE_EXPONENT_PRIOR
+
+
+def test_estimate_depends_on_the_builder():
+    # a tokamak joins each layer after the plasma with the one it mirrors,
+    # a spherical tokamak keeps them apart and cuts the outer layers with the
+    # center column
+    regular = paramak.estimate_cost("tokamak_from_plasma", radial_build=radial_build(3))
+    spherical = paramak.estimate_cost("spherical_tokamak_from_plasma", radial_build=radial_build(3))
+    assert spherical.time > regular.time
+    assert spherical.peak_memory > regular.peak_memory
+
+
+def test_sweep_starts_the_longest_cases_first(tmp_path, monkeypatch):
+    started = []
+
+    def fake_run_case(builder, params, filenames=(), timeout=None):
+        started.append(len(params["radial_build"]))
+        return {"status": "ok", "time": 0.0, "volumes": {}, "outputs": []}
+
+    monkeypatch.setattr(sweep_module, "run_case", fake_run_case)
+    monkeypatch.setattr(sweep_module, "ProcessPoolExecutor", _InlineExecutor)
+    cases = [{"radial_build": radial_build(layers)} for layers in (1, 3, 2)]
+    paramak.sweep("spherical_tokamak_from_plasma", cases, tmp_path / "results.jsonl", workers=2)
+
+    assert started == [len(radial_build(3)), len(radial_build(2)), len(radial_build(1))]
+
+
+class _InlineExecutor:
+    """Runs submitted calls straight away, in submission order."""
+
+    def __init__(self, max_workers=None, initializer=None, initargs=()):
+        if initializer is not None:
+            initializer(*initargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def submit(self, function, *args):
+        future = Future()
+        future.set_result(function(*args))
+        return future
@@ -0,0 +1,25 @@
+import cadquery as cq
+import pytest
+
+
+def test_export_parts_writes_manifest_and_skips_unchanged_parts(make_assembly, tmp_path):
+    assembly = make_assembly()
+    manifest = assembly.export_parts(tmp_path, formats=("step", "brep", "stl"))
+
+    assert [part["name"] for part in manifest["parts"]] == ["box", "sphere"]
+    assert manifest["parts"][0]["volume"] == pytest.approx(6)
+    for name in ["box", "sphere"]:
+        for extension in ["step", "brep", "stl"]:
+            assert (tmp_path / f"{name}.{extension}").exists()
+    assert (tmp_path / "manifest.json").exists()
+
+    modified_times = {path.name: path.stat().st_mtime_ns for path in tmp_path.iterdir()}
+    changed = assembly.edit(remove=["box"]).edit()
+    changed.add(cq.Workplane().box(2, 2, 2), name="box")
+    manifest = changed.export_parts(tmp_path, formats=("step", "brep", "stl"), workers=2)
+
+    assert [part["name"] for part in manifest["parts"]] == ["sphere", "box"]
+    assert manifest["parts"][1]["volume"] == pytest.approx(8)
+    for extension in ["step", "brep", "stl"]:
+        assert (tmp_path / f"sphere.{extension}").stat().st_mtime_ns == modified_times[f"sphere.{extension}"]
+        assert (tmp_path / f"box.{extension}").stat().st_mtime_ns != modified_times[f"box.{extension}"]
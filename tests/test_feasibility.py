@@ -0,0 +1,80 @@
+import numpy as np
+
+import paramak
+from paramak.feasibility import _self_intersects, check_feasibility
+
+GAP, SOLID, PLASMA = paramak.LayerType.GAP, paramak.LayerType.SOLID, paramak.LayerType.PLASMA
+
+RADIAL_BUILD = [
+    (GAP, 10),
+    (SOLID, 30),
+    (SOLID, 50),
+    (SOLID, 10),
+    (SOLID, 120),
+    (SOLID, 20),
+    (GAP, 60),
+    (PLASMA, 300),
+    (GAP, 60),
+    (SOLID, 20),
+    (SOLID, 120),
+    (SOLID, 10),
+]
+
+
+def coil(r, z, size=50):
+    return {"workplane": "poloidal_field_coil", "center_point": [r, z], "width": size, "height": size}
+
+
+def test_feasible_reactors_have_no_issues():
+    for builder in (paramak.tokamak_from_plasma, paramak.spherical_tokamak_from_plasma):
+        for triangularity in (-0.9, 0.55, 1.0):
+            assert check_feasibility(builder, radial_build=RADIAL_BUILD, triangularity=triangularity) == []
+
+
+def test_thick_vertical_build_reaches_into_center_column():
+    radial_build = [(GAP, 10), (SOLID, 30), (SOLID, 20), (GAP, 30), (PLASMA, 300), (GAP, 30), (SOLID, 20)]
+
+    def vertical_build(thickness):
+        return [(SOLID, thickness), (GAP, 30), (PLASMA, 600), (GAP, 30), (SOLID, thickness)]
+
+    issues = check_feasibility("tokamak", radial_build=radial_build, vertical_build=vertical_build(100))
+    assert [(issue.check, issue.part) for issue in issues] == [("overlapping_layers", "layer_2")]
+    assert "layer_1" in issues[0].message
+
+    issues = check_feasibility("tokamak", radial_build=radial_build, vertical_build=vertical_build(400))
+    assert [(issue.check, issue.part) for issue in issues] == [
+        ("negative_radius", "layer_2"),
+        ("overlapping_layers", "layer_2"),
+    ]
+
+
+def test_coil_clearance():
+    # the outer layers of RADIAL_BUILD span R = 660 to 810 at the midplane
+    clashing = check_feasibility("tokamak_from_plasma", radial_build=RADIAL_BUILD, extra_cut_shapes=[coil(700, 0)])
+    assert {issue.check for issue in clashing} == {"coil_clearance"}
+    assert {issue.part for issue in clashing} == {"poloidal_field_coil_1"}
+    assert "overlaps layer_3" in clashing[0].message
+
+    far = [coil(900, 0)]
+    assert check_feasibility("tokamak_from_plasma", radial_build=RADIAL_BUILD, extra_cut_shapes=far) == []
+    close = check_feasibility("tokamak_from_plasma", radial_build=RADIAL_BUILD, extra_cut_shapes=far, clearance=70)
+    assert [issue.message for issue in close] == ["poloidal_field_coil_1 is 65.0 cm from layer_5, less than 70 cm"]
+
+
+def test_coil_touching_a_layer_is_not_reported_as_overlapping():
+    # layer_1 starts at R = 10, the coil spans R = 0 to 10
+    touching = check_feasibility("tokamak_from_plasma", radial_build=RADIAL_BUILD, extra_cut_shapes=[coil(5, 0, 10)])
+    assert [issue.message for issue in touching] == ["poloidal_field_coil_1 touches layer_1"]
+
+
+def test_coil_between_plasma_and_blanket_does_not_overlap_the_blanket():
+    # the gap between the plasma and the first outer layer is R = 600 to 660
+    issues = check_feasibility("tokamak_from_plasma", radial_build=RADIAL_BUILD, extra_cut_shapes=[coil(630, 0, 20)])
+    assert issues == []
+
+
+def test_self_intersects():
+    square = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=float)
+    bow_tie = np.array([[0, 0], [1, 1], [1, 0], [0, 1]], dtype=float)
+    assert not _self_intersects(square, closed=True)
+    assert _self_intersects(bow_tie, closed=True)
@@ -0,0 +1,55 @@
+import pickle
+
+import pytest
+
+import paramak
+from paramak.isolation import BuildTimeoutError
+from paramak.sweep import read_results
+
+RADIAL_BUILD = [
+    (paramak.LayerType.GAP, 10),
+    (paramak.LayerType.SOLID, 50),
+    (paramak.LayerType.GAP, 50),
+    (paramak.LayerType.PLASMA, 300),
+    (paramak.LayerType.GAP, 60),
+    (paramak.LayerType.SOLID, 30),
+]
+
+
+def test_build_with_timeout_returns_the_reactor():
+    reactor = paramak.spherical_tokamak_from_plasma(
+        radial_build=RADIAL_BUILD, rotation_angle=90, timeout=60, profile=True
+    )
+    assert reactor.names() == ["layer_1", "layer_2", "plasma"]
+    assert "revolve" in reactor.build_report.stages()
+
+    with pytest.raises(ValueError, match="PLASMA"):
+        paramak.spherical_tokamak_from_plasma(radial_build=RADIAL_BUILD[:2], timeout=60)
+    with pytest.raises(ValueError, match="lazy"):
+        paramak.spherical_tokamak_from_plasma(radial_build=RADIAL_BUILD, timeout=60, lazy=True)
+
+
+def test_timeout_names_the_running_stage_and_part():
+    with pytest.raises(BuildTimeoutError) as error:
+        paramak.tokamak_from_plasma(radial_build=RADIAL_BUILD, rotation_angle=360, timeout=0.3)
+    assert error.value.stage is not None
+    assert f"in the {error.value.stage} stage" in str(error.value)
+    assert error.value.stages[-1] == (error.value.stage, error.value.part)
+
+    copied = pickle.loads(pickle.dumps(error.value))
+    assert str(copied) == str(error.value)
+
+
+def test_sweep_records_timed_out_cases(tmp_path):
+    cases = [
+        {"radial_build": RADIAL_BUILD, "rotation_angle": 360},
+        {"radial_build": RADIAL_BUILD, "rotation_angle": 90},
+    ]
+    records = paramak.sweep(
+        "spherical_tokamak_from_plasma", cases, tmp_path / "results.csv", workers=2, timeout=0.3
+    )
+    statuses = {record["case"]: record["status"] for record in records}
+    assert statuses[0] == "timeout"
+    timed_out = [record for record in read_results(tmp_path / "results.csv") if record["case"] == 0][0]
+    assert timed_out["stage"]
+    assert "BuildTimeoutError" in timed_out["error"]
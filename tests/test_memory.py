@@ -0,0 +1,47 @@
+import cadquery as cq
+
+import paramak
+from paramak.assemblies.assembly import Assembly
+from paramak.memory import brep_statistics, retained_objects
+
+
+def test_brep_statistics_of_box():
+    statistics = brep_statistics(cq.Workplane().box(1, 1, 1).val())
+
+    assert statistics["solids"] == 1
+    assert statistics["faces"] == 6
+    assert statistics["edges"] == 12
+    assert statistics["vertices"] == 8
+    assert statistics["poles"] == 0
+    assert statistics["estimated_bytes"] > 0
+
+
+def test_brep_statistics_counts_spline_poles():
+    plasma = paramak.plasma_simplified(rotation_angle=90, num_points=50)
+
+    assert brep_statistics(plasma.val())["poles"] > 50
+
+
+def test_retained_objects_of_workplane_history():
+    box = cq.Workplane().box(2, 2, 2)
+    cut_box = box.cut(cq.Workplane().box(1, 1, 3)).cut(cq.Workplane().box(3, 1, 1))
+
+    assert retained_objects(box)["workplanes"] == 1
+    assert retained_objects(cut_box)["workplanes"] == 3
+    assert retained_objects(cut_box)["shapes"] == 2
+    assert retained_objects(cut_box)["estimated_bytes"] > 0
+    assert retained_objects(cut_box.val()) == {"workplanes": 0, "shapes": 0, "estimated_bytes": 0}
+
+
+def test_assembly_memory_report():
+    box = cq.Workplane().box(2, 2, 2).cut(cq.Workplane().box(1, 1, 3))
+    assembly = Assembly()
+    assembly.add(box, name="box")
+    assembly.add(cq.Workplane().sphere(1).val(), name="sphere")
+
+    report = assembly.memory_report()
+
+    assert list(report) == ["box", "sphere"]
+    assert report["box"]["retained_workplanes"] == 2
+    assert report["sphere"]["retained_workplanes"] == 0
+    assert report["sphere"]["faces"] == 1
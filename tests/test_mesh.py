@@ -0,0 +1,81 @@
+import struct
+
+import cadquery as cq
+import numpy as np
+import pytest
+
+from paramak.assemblies.assembly import Assembly
+
+
+def test_tessellate_returns_arrays_in_global_coordinates(make_assembly):
+    meshes = make_assembly().tessellate(tolerance=0.1)
+
+    assert list(meshes) == ["box", "sphere"]
+    vertices, triangles = meshes["box"]
+    assert vertices.shape[1] == 3 and triangles.shape == (12, 3)
+    assert vertices.min(axis=0) == pytest.approx([-0.5, -1, -1.5])
+    assert meshes["sphere"][0][:, 0].min() == pytest.approx(4, abs=0.05)
+
+
+def test_tessellation_is_cached_per_tolerance(make_assembly):
+    assembly = make_assembly()
+    coarse = assembly.tessellate(tolerance=0.1, angular_tolerance=1)
+
+    assert assembly.tessellate(tolerance=0.1, angular_tolerance=1)["sphere"][0] is coarse["sphere"][0]
+    fine = assembly.tessellate(tolerance=0.1, angular_tolerance=0.1)
+    assert len(fine["sphere"][1]) > len(coarse["sphere"][1])
+
+    # renamed parts keep their cached meshes
+    renamed = assembly.rename("sphere", "plasma")
+    assert renamed.tessellate(tolerance=0.1, angular_tolerance=1)["plasma"][0] is coarse["sphere"][0]
+
+
+def test_tessellate_places_nested_parts_at_their_sub_assembly_location():
+    coil = cq.Workplane().box(1, 1, 1)
+    upper = Assembly(name="upper")
+    upper.add(coil, name="coil")
+    lower = Assembly(name="lower")
+    lower.add(coil, name="coil")
+    assembly = Assembly()
+    assembly.add(upper, loc=cq.Location(cq.Vector(0, 0, 10)))
+    assembly.add(lower, loc=cq.Location(cq.Vector(0, 0, -10)))
+
+    meshes = assembly.tessellate()
+
+    assert list(meshes) == ["upper/coil", "lower/coil"]
+    assert meshes["upper/coil"][0][:, 2].min() == pytest.approx(9.5)
+    assert meshes["lower/coil"][0][:, 2].max() == pytest.approx(-9.5)
+    # the sub assembly on its own is meshed at its own location
+    assert upper.tessellate()["coil"][0][:, 2].min() == pytest.approx(-0.5)
+    assert assembly.tessellate()["upper/coil"][0][:, 2].min() == pytest.approx(9.5)
+
+
+def test_tessellate_in_parallel_matches_serial(make_assembly):
+    serial = make_assembly().tessellate(tolerance=0.1)
+    parallel = make_assembly().tessellate(tolerance=0.1, workers=2)
+
+    for name in serial:
+        assert np.allclose(parallel[name][0], serial[name][0])
+        assert np.array_equal(parallel[name][1], serial[name][1])
+
+
+def test_export_mesh_formats(make_assembly, tmp_path):
+    assembly = make_assembly()
+    number_of_triangles = sum(len(triangles) for _, triangles in assembly.tessellate().values())
+
+    assembly.export_mesh(tmp_path / "reactor.stl")
+    with open(tmp_path / "reactor.stl", "rb") as file:
+        file.seek(80)
+        assert struct.unpack("<I", file.read(4))[0] == number_of_triangles
+    assert (tmp_path / "reactor.stl").stat().st_size == 84 + 50 * number_of_triangles
+
+    assembly.export_mesh(tmp_path / "reactor.obj")
+    lines = (tmp_path / "reactor.obj").read_text().splitlines()
+    assert [line for line in lines if line.startswith("o ")] == ["o box", "o sphere"]
+    assert len([line for line in lines if line.startswith("f ")]) == number_of_triangles
+
+    assembly.export_mesh(tmp_path / "reactor.vtk")
+    assert f"POLYGONS {number_of_triangles}" in (tmp_path / "reactor.vtk").read_text()
+
+    with pytest.raises(ValueError):
+        assembly.export_mesh(tmp_path / "reactor.ply")
@@ -0,0 +1,171 @@
+import json
+import os
+import time
+
+import cadquery as cq
+import pytest
+
+import paramak
+from paramak.assemblies.assembly import Assembly
+from paramak.profiling import BuildReport, record_build, stage
+
+
+def test_stage_is_not_recorded_without_an_active_report():
+    with record_build() as report:
+        pass
+    with stage("revolve", "layer_1"):
+        pass
+    assert report.records == []
+
+
+def test_report_summaries_table_and_json(tmp_path):
+    with record_build() as report:
+        with stage("revolve", "layer_1"):
+            pass
+        with stage("revolve", "layer_2"):
+            pass
+        with stage("cut", "layer_1"):
+            pass
+
+    assert report.stages()["revolve"]["calls"] == 2
+    assert report.stages()["cut"]["calls"] == 1
+    assert report.parts()["layer_1"]["calls"] == 2
+    assert report.total_time >= sum(record[3] for record in report.records)
+
+    table = report.table(by="part")
+    assert "layer_1" in table and "layer_2" in table
+
+    report.to_json(tmp_path / "report.json")
+    with open(tmp_path / "report.json") as file:
+        data = json.load(file)
+    assert len(data["records"]) == 3
+    assert set(data["stages"]) == {"revolve", "cut"}
+
+
+def test_table_shares_exclude_nested_stages():
+    with record_build() as report:
+        with stage("layer", "layer_1"):
+            with stage("cut", "layer_1"):
+                time.sleep(0.02)
+            time.sleep(0.01)
+
+    stages = report.stages()
+    assert stages["layer"]["time"] >= stages["cut"]["time"] >= 0.02
+    assert stages["layer"]["self_time"] == pytest.approx(stages["layer"]["time"] - stages["cut"]["time"])
+    assert stages["cut"]["self_time"] == stages["cut"]["time"]
+    assert sum(entry["self_time"] for entry in stages.values()) <= report.total_time
+
+    shares = [float(line.split()[-1].rstrip("%")) for line in report.table().splitlines()[1:-1]]
+    assert sum(shares) <= 100.1
+
+
+def test_tokamak_build_report():
+    my_reactor = paramak.spherical_tokamak_from_plasma(
+        radial_build=[
+            (paramak.LayerType.GAP, 10),
+            (paramak.LayerType.SOLID, 50),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.PLASMA, 300),
+            (paramak.LayerType.GAP, 60),
+            (paramak.LayerType.SOLID, 40),
+        ],
+        rotation_angle=90,
+        profile=True,
+    )
+
+    assert isinstance(my_reactor.build_report, BuildReport)
+    stages = my_reactor.build_report.stages()
+    for expected in ["profile", "wire", "revolve", "cut", "assembly"]:
+        assert expected in stages
+    parts = my_reactor.build_report.parts()
+    for name in my_reactor.names():
+        assert name in parts
+    # the report follows the parts into derived assemblies
+    assert my_reactor.remove("plasma").build_report is my_reactor.build_report
+
+
+def test_build_report_defaults_to_none():
+    my_reactor = paramak.spherical_tokamak_from_plasma(
+        radial_build=[
+            (paramak.LayerType.GAP, 10),
+            (paramak.LayerType.SOLID, 50),
+            (paramak.LayerType.GAP, 50),
+            (paramak.LayerType.PLASMA, 300),
+            (paramak.LayerType.GAP, 60),
+            (paramak.LayerType.SOLID, 40),
+        ],
+        rotation_angle=90,
+    )
+    assert my_reactor.build_report is None
+
+
+def test_chrome_trace_of_nested_spans(tmp_path):
+    filename = tmp_path / "build.json"
+    with paramak.trace_build(filename) as report:
+        paramak.plasma_simplified(rotation_angle=90, name="plasma")
+        paramak.toroidal_field_coil_rectangle(azimuthal_placement_angles=[0, 90], rotation_angle=180)
+
+    with open(filename) as file:
+        trace = json.load(file)
+    events = trace["traceEvents"]
+    assert len(events) == len(report.records)
+    assert all(event["ph"] == "X" for event in events)
+
+    categories = {event["cat"] for event in events}
+    for expected in ["wire", "spline", "revolve", "extrude", "union", "intersect"]:
+        assert expected in categories
+
+    # spline creation is nested within the wire of the part that made it
+    spline = next(event for event in events if event["cat"] == "spline")
+    wire = next(event for event in events if event["cat"] == "wire" and event["args"]["part"] == "plasma")
+    assert spline["args"]["part"] == "plasma"
+    assert wire["ts"] <= spline["ts"] and spline["ts"] + spline["dur"] <= wire["ts"] + wire["dur"]
+
+    revolve = next(event for event in events if event["cat"] == "revolve")
+    assert revolve["args"]["angle"] == 90
+
+
+def test_speedscope_events_are_balanced(tmp_path):
+    filename = tmp_path / "build.speedscope.json"
+    with paramak.trace_build(filename):
+        paramak.plasma_simplified(rotation_angle=90)
+
+    with open(filename) as file:
+        profile = json.load(file)
+    assert profile["profiles"][0]["type"] == "evented"
+
+    open_frames = []
+    for event in profile["profiles"][0]["events"]:
+        if event["type"] == "O":
+            open_frames.append(event["frame"])
+        else:
+            assert open_frames.pop() == event["frame"]
+    assert open_frames == []
+
+
+def test_spans_recorded_in_worker_processes_are_merged(tmp_path):
+    assembly = Assembly()
+    assembly.add(cq.Workplane().box(1, 2, 3), name="box")
+    assembly.add(cq.Workplane().sphere(1), name="sphere", loc=cq.Location(cq.Vector(5, 0, 0)))
+
+    with record_build() as report:
+        assembly.tessellate(workers=2)
+        assembly.export_parts(tmp_path, formats=["brep"], workers=2)
+        paramak.spherical_tokamak_from_plasma(
+            radial_build=[
+                (paramak.LayerType.GAP, 10),
+                (paramak.LayerType.SOLID, 50),
+                (paramak.LayerType.GAP, 50),
+                (paramak.LayerType.PLASMA, 300),
+                (paramak.LayerType.GAP, 60),
+                (paramak.LayerType.SOLID, 40),
+            ],
+            rotation_angle=90,
+            timeout=60,
+        )
+
+    worker_records = [record for record in report.records if record[5] != os.getpid()]
+    assert {"tessellate", "export", "revolve"} <= {record[0] for record in worker_records}
+    assert {record[1] for record in worker_records if record[0] == "tessellate"} == {"box", "sphere"}
+    # the worker spans are placed on the timeline of this report
+    assert all(0 <= record[2] <= report.total_time for record in worker_records)
@@ -0,0 +1,194 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cadquery as cq
+import pytest
+
+from paramak.assemblies.assembly import Assembly
+from paramak.serialization import part_from_state, part_to_state, shape_from_bytes, shape_to_bytes
+
+
+@pytest.fixture
+def make_reactor(make_assembly):
+    """Makes a box and sphere assembly with part attributes, a node color and
+    reactor parameters to round trip."""
+
+    def make_reactor():
+        assembly = make_assembly()
+        box = assembly.objects["box"]
+        box.obj.name = "my_box"
+        box.obj.color = (0.1, 0.2, 0.3)
+        box.color = cq.Color(0.1, 0.2, 0.3, 0.4)
+        assembly.elongation = 2.0
+        assembly.triangularity = 0.55
+        assembly.major_radius = 450
+        assembly.minor_radius = 150
+        return assembly
+
+    return make_reactor
+
+
+def test_shape_bytes_round_trip():
+    shape = cq.Workplane().box(1, 2, 3).edges().fillet(0.1).val()
+    restored = shape_from_bytes(shape_to_bytes(shape))
+
+    assert type(restored) is type(shape)
+    assert restored.Volume() == pytest.approx(shape.Volume())
+    assert len(restored.Faces()) == len(shape.Faces())
+
+
+def test_workplane_part_keeps_plane_and_attributes_but_not_history():
+    box = cq.Workplane("XZ").box(1, 1, 1).cut(cq.Workplane("XZ").box(0.5, 0.5, 5))
+    box.name = "my_box"
+    restored = part_from_state(part_to_state(box))
+
+    assert isinstance(restored, cq.Workplane)
+    assert restored.name == "my_box"
+    assert restored.plane.zDir.toTuple() == box.plane.zDir.toTuple()
+    assert restored.parent is None
+    assert restored.val().Volume() == pytest.approx(box.val().Volume())
+
+
+def test_assembly_pickle_round_trip(make_reactor):
+    assembly = make_reactor()
+    restored = pickle.loads(pickle.dumps(assembly))
+
+    assert isinstance(restored, Assembly)
+    assert restored.names() == assembly.names()
+    assert restored.name == assembly.name
+    for attribute in ["elongation", "triangularity", "major_radius", "minor_radius"]:
+        assert getattr(restored, attribute) == getattr(assembly, attribute)
+    for (shape, name, loc, color), (restored_shape, restored_name, restored_loc, restored_color) in zip(
+        assembly, restored
+    ):
+        assert restored_name == name
+        assert restored_shape.Volume() == pytest.approx(shape.Volume())
+        assert restored_loc.toTuple() == loc.toTuple()
+        assert (restored_color is None) == (color is None)
+        if color is not None:
+            assert restored_color.toTuple() == pytest.approx(color.toTuple())
+    assert restored.objects["box"].obj.name == "my_box"
+    assert restored.objects["box"].obj.parent is None
+
+
+def test_pickle_keeps_material_and_subshapes_but_not_constraints():
+    box = cq.Workplane().box(1, 1, 1)
+    assembly = Assembly()
+    assembly.add(box, name="box", material=cq.Material("steel"), metadata={"batch": 3})
+    assembly.add(cq.Workplane().sphere(1), name="sphere", loc=cq.Location(cq.Vector(5, 0, 0)))
+    node = assembly.objects["box"]
+    top = box.faces(">Z").val()
+    node.addSubshape(top, name="top", color=cq.Color(1, 0, 0), layer="first wall")
+    node.addSubshape(box.edges("|Z").vals()[0], name="edge")
+    assembly.constrain("box", "Fixed")
+
+    restored = pickle.loads(pickle.dumps(assembly)).objects["box"]
+
+    assert restored.material.name == "steel"
+    assert restored.metadata == {"batch": 3}
+    names = {name: subshape for subshape, name in restored._subshape_names.items()}
+    assert set(names) == {"top", "edge"}
+    assert isinstance(names["top"], cq.Face) and isinstance(names["edge"], cq.Edge)
+    # the subshapes are those of the restored part
+    assert names["top"].isSame(restored.obj.faces(">Z").val())
+    assert names["top"].Center().toTuple() == pytest.approx(top.Center().toTuple())
+    assert restored._subshape_colors[names["top"]].toTuple() == pytest.approx((1, 0, 0, 1))
+    assert restored._subshape_layers[names["top"]] == "first wall"
+    assert pickle.loads(pickle.dumps(assembly)).constraints == []
+
+
+def test_nested_assembly_pickle_round_trip():
+    inner = Assembly(name="inner")
+    inner.add(cq.Workplane().box(1, 1, 1), name="box")
+    outer = Assembly(name="outer")
+    outer.add(inner, loc=cq.Location(cq.Vector(0, 0, 10)))
+
+    restored = pickle.loads(pickle.dumps(outer))
+
+    assert restored.objects["inner"].loc.toTuple() == outer.objects["inner"].loc.toTuple()
+    assert "inner/box" in restored.objects
+
+
+def test_assembly_returned_from_worker_process(make_reactor):
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        restored = executor.submit(pickle.loads, pickle.dumps(make_reactor())).result()
+
+    assert restored.names() == ["box", "sphere"]
+    assert restored.major_radius == 450
+
+
+def test_assembly_save_and_load_round_trip(make_reactor, tmp_path):
+    assembly = make_reactor()
+    assembly.save(tmp_path / "reactor.paramak")
+    loaded = Assembly.load(tmp_path / "reactor.paramak")
+
+    assert isinstance(loaded, Assembly)
+    assert loaded.names() == ["box", "sphere"]
+    assert loaded.major_radius == 450
+    assert loaded.objects["box"].color.toTuple() == pytest.approx((0.1, 0.2, 0.3, 0.4))
+    assert loaded.objects["sphere"].loc.toTuple() == assembly.objects["sphere"].loc.toTuple()
+    assert loaded.objects["box"].obj.name == "my_box"
+    assert loaded.objects["box"].obj.color == (0.1, 0.2, 0.3)
+    for (shape, name, _, _), (loaded_shape, loaded_name, _, _) in zip(assembly, loaded):
+        assert loaded_name.split("/")[-1] == name.split("/")[-1]
+        assert loaded_shape.Volume() == pytest.approx(shape.Volume())
+
+
+def test_loaded_assembly_decodes_parts_lazily(make_reactor, tmp_path):
+    assembly = make_reactor()
+    assembly.save(tmp_path / "reactor.paramak")
+    loaded = Assembly.load(tmp_path / "reactor.paramak")
+
+    assert loaded.names() == ["box", "sphere"]
+    properties = loaded.part_properties("sphere")
+    assert properties == pytest.approx(assembly.part_properties("sphere"))
+    assert properties["bounding_box"][0] == pytest.approx(4)
+    assert not loaded.objects["box"].materialized
+    assert not loaded.objects["sphere"].materialized
+
+    assert loaded.objects["sphere"].obj.val().Volume() == pytest.approx(properties["volume"])
+    assert loaded.objects["sphere"].materialized
+    assert not loaded.objects["box"].materialized
+
+
+def test_loaded_nested_parts_keep_their_properties_without_decoding(tmp_path):
+    inner = Assembly(name="inner")
+    inner.add(cq.Workplane().box(1, 1, 1), name="box", loc=cq.Location(cq.Vector(5, 0, 0)))
+    outer = Assembly(name="outer")
+    outer.add(inner, loc=cq.Location(cq.Vector(0, 0, 10)))
+    outer.save(tmp_path / "nested.paramak")
+    loaded = Assembly.load(tmp_path / "nested.paramak")
+
+    properties = loaded.part_properties("inner/box")
+
+    assert properties["center_of_mass"] == pytest.approx([5, 0, 10])
+    assert not loaded.objects["inner/box"].materialized
+
+
+def mapped_files():
+    return Path("/proc/self/maps").read_text()
+
+
+@pytest.mark.skipif(not Path("/proc/self/maps").exists(), reason="reads the memory maps of the process from /proc")
+def test_loaded_file_is_closed_once_every_part_is_decoded(make_reactor, tmp_path):
+    filename = tmp_path / "reactor.paramak"
+    make_reactor().save(filename)
+    loaded = Assembly.load(filename)
+    box = loaded.objects["box"]
+    box.addSubshape(box.obj.faces(">Y").val(), name="side")
+    copied = loaded._copy()
+
+    assert copied.objects["box"]._subshape_names == box._subshape_names
+    assert str(filename) in mapped_files()
+
+    loaded.materialize()
+    assert str(filename) not in mapped_files()
+    # a copy made before the parts were decoded shares the decoded parts
+    assert copied.objects["sphere"].obj is loaded.objects["sphere"].obj
+
+
+def test_assembly_save_other_formats_uses_cadquery(make_reactor, tmp_path):
+    make_reactor().save(str(tmp_path / "reactor.step"))
+
+    assert (tmp_path / "reactor.step").exists()
@@ -0,0 +1,113 @@
+import json
+import os
+import socket
+import threading
+import urllib.request
+from concurrent.futures.process import BrokenProcessPool
+from importlib.metadata import version
+from pathlib import Path
+
+import cadquery as cq
+import pytest
+
+from paramak.server import BuildServer, make_server
+
+SPEC = {
+    "builder": "spherical_tokamak_from_plasma",
+    "radial_build": [["gap", 10], ["solid", 50], ["gap", 50], ["plasma", 300], ["gap", 60], ["solid", 30]],
+    "rotation_angle": 90,
+}
+
+
+@pytest.fixture(scope="module")
+def build_server(tmp_path_factory):
+    with BuildServer(workers=2, cache_directory=tmp_path_factory.mktemp("cache")) as build_server:
+        yield build_server
+
+
+def test_identical_requests_share_a_build_and_are_cached(build_server):
+    params = {key: value for key, value in SPEC.items() if key != "builder"}
+    first = build_server.submit(SPEC["builder"], params, ["step"])
+    second = build_server.submit(SPEC["builder"], params, ["step"])
+    assert first is second
+    assert first.result()["status"] == "ok"
+
+    result = build_server.build({**SPEC, "formats": ["step"]})
+    assert result["cached"]
+    assert set(result["outputs"]) == {"paramak", "step"}
+
+    # a new format is written from the cached build
+    result = build_server.build({**SPEC, "formats": ["stl"]})
+    assert not result["cached"]
+    assert set(result["outputs"]) == {"paramak", "step", "stl"}
+    assert Path(result["outputs"]["stl"]).parent.parent.name == version("paramak")
+
+
+def test_requests_for_other_formats_wait_for_the_build_in_flight(build_server):
+    params = {key: value for key, value in SPEC.items() if key != "builder"}
+    params["rotation_angle"] = 30
+    first = build_server.submit(SPEC["builder"], params, ["step"])
+    second = build_server.submit(SPEC["builder"], params, ["brep"])
+
+    assert first is not second
+    assert build_server.submit(SPEC["builder"], params, ["step", "brep"]) is second
+    assert set(first.result()["outputs"]) == {"paramak", "step"}
+    # the spec is built once, the second request only adds its format
+    assert second.result()["time"] == first.result()["time"]
+    assert set(second.result()["outputs"]) == {"paramak", "step", "brep"}
+    assert build_server.cached(SPEC["builder"], params, ["step", "brep"]) == second.result()
+
+
+def test_a_crashed_worker_pool_is_replaced(tmp_path):
+    with BuildServer(workers=1, cache_directory=tmp_path) as build_server:
+        broken = build_server.executor
+        with pytest.raises(BrokenProcessPool):
+            broken.submit(os._exit, 1).result()
+
+        with pytest.raises(BrokenProcessPool):
+            build_server.build(SPEC)
+        assert build_server.executor is not broken
+        assert build_server.build(SPEC)["status"] == "ok"
+
+
+def test_http_build_returns_paths_and_brep_bytes(build_server, tmp_path):
+    http_server = make_server(build_server, port=0)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{http_server.server_address[1]}"
+
+    def post(spec):
+        request = urllib.request.Request(f"{url}/build", data=json.dumps(spec).encode("utf-8"), method="POST")
+        return urllib.request.urlopen(request)
+
+    try:
+        assert json.load(urllib.request.urlopen(f"{url}/health"))["workers"] == 2
+
+        result = json.load(post({**SPEC, "rotation_angle": 45}))
+        assert result["status"] == "ok"
+        assert set(result["volumes"]) == {"layer_1", "layer_2", "plasma"}
+
+        response = post({**SPEC, "rotation_angle": 45, "result": "brep"})
+        assert response.headers["X-Spec-Hash"] == result["spec_hash"]
+        (tmp_path / "reactor.brep").write_bytes(response.read())
+        assert cq.Shape.importBrep(str(tmp_path / "reactor.brep")).isValid()
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            post({**SPEC, "radial_build": [["gap", 10]]})
+        assert error.value.code == 422
+    finally:
+        http_server.shutdown()
+        http_server.server_close()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+def test_unix_socket_only_replaces_an_old_socket(build_server, tmp_path):
+    socket_path = tmp_path / "paramak.sock"
+    socket_path.write_text("not a socket")
+    with pytest.raises(FileExistsError):
+        make_server(build_server, unix_socket=str(socket_path))
+    assert socket_path.read_text() == "not a socket"
+
+    socket_path.unlink()
+    make_server(build_server, unix_socket=str(socket_path)).server_close()
+    # the socket left by the closed server is replaced
+    make_server(build_server, unix_socket=str(socket_path)).server_close()
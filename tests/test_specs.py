@@ -0,0 +1,89 @@
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+import paramak
+from paramak.specs import build_from_spec, spec_hash
+
+
+def volumes(reactor):
+    columns = reactor.properties()
+    return dict(zip(columns["name"], columns["volume"].tolist()))
+
+
+RADIAL_BUILD = [
+    (paramak.LayerType.GAP, 10),
+    (paramak.LayerType.SOLID, 50),
+    (paramak.LayerType.GAP, 50),
+    (paramak.LayerType.PLASMA, 300),
+    (paramak.LayerType.GAP, 60),
+    (paramak.LayerType.SOLID, 30),
+]
+
+
+def test_builder_accepts_radial_build():
+    from_list = paramak.spherical_tokamak_from_plasma(radial_build=RADIAL_BUILD, rotation_angle=90)
+    from_radial_build = paramak.spherical_tokamak_from_plasma(
+        radial_build=paramak.RadialBuild(RADIAL_BUILD), rotation_angle=90
+    )
+    assert volumes(from_radial_build) == volumes(from_list)
+
+
+def test_reactor_spec_hashes_as_its_json_form():
+    spec = paramak.ReactorSpec(paramak.spherical_tokamak_from_plasma, radial_build=RADIAL_BUILD, rotation_angle=90)
+    json_params = {"radial_build": [[kind.value, thickness] for kind, thickness in RADIAL_BUILD], "rotation_angle": 90}
+
+    assert spec.builder == "spherical_tokamak_from_plasma"
+    assert isinstance(spec.radial_build, paramak.RadialBuild)
+    assert spec.content_hash == spec_hash("spherical_tokamak_from_plasma", json_params)
+    assert spec_hash(spec) == spec.content_hash
+    assert paramak.ReactorSpec.from_json(spec.to_json()) == spec
+    assert pickle.loads(pickle.dumps(spec)) == spec
+    assert len({spec, paramak.ReactorSpec("spherical_tokamak_from_plasma", **json_params)}) == 1
+
+
+def test_reactor_spec_json_round_trip_keeps_extra_shapes():
+    coil = {"workplane": "poloidal_field_coil", "center_point": [500, 300], "height": 40, "width": 40}
+    spec = paramak.ReactorSpec(
+        "spherical_tokamak_from_plasma", radial_build=RADIAL_BUILD, rotation_angle=90, extra_cut_shapes=[coil]
+    )
+
+    data = json.loads(json.dumps(spec.to_json()))
+
+    assert data["extra_cut_shapes"] == [coil]
+    assert paramak.ReactorSpec.from_json(data) == spec
+    assert paramak.ReactorSpec.from_json(data).to_json() == data
+    assert spec.replace(rotation_angle=180).to_json()["extra_cut_shapes"] == [coil]
+    assert pickle.loads(pickle.dumps(spec)).to_json() == data
+
+    # Workplanes given from Python are written as their content hash only
+    built = spec.replace(extra_cut_shapes=list(spec.params["extra_cut_shapes"]))
+    with pytest.raises(ValueError):
+        paramak.ReactorSpec.from_json(built.to_json())
+
+
+def test_spec_hash_is_canonical():
+    expected = spec_hash("spherical_tokamak_from_plasma", {"radial_build": RADIAL_BUILD, "rotation_angle": 90})
+
+    # numbers of any type and arguments given their default value
+    radial_build = [[kind.value, float(thickness)] for kind, thickness in RADIAL_BUILD]
+    for params in [
+        {"radial_build": radial_build, "rotation_angle": 90.0},
+        {"radial_build": RADIAL_BUILD, "rotation_angle": np.float64(90), "triangularity": 0.55},
+        {"radial_build": RADIAL_BUILD, "rotation_angle": np.int64(90), "elongation": 2, "profile": True},
+    ]:
+        assert spec_hash("spherical_tokamak_from_plasma", params) == expected
+
+    assert spec_hash("spherical_tokamak_from_plasma", {"radial_build": RADIAL_BUILD, "rotation_angle": 91}) != expected
+    assert spec_hash("spherical_tokamak_from_plasma", {"radial_build": RADIAL_BUILD}) != expected
+
+
+def test_reactor_spec_replace_and_build():
+    spec = paramak.ReactorSpec("spherical_tokamak_from_plasma", radial_build=RADIAL_BUILD, rotation_angle=90)
+    wider = spec.replace(rotation_angle=180)
+
+    assert wider != spec
+    assert spec.params["rotation_angle"] == 90
+    assert volumes(build_from_spec(wider))["plasma"] > volumes(spec.build())["plasma"]
@@ -0,0 +1,51 @@
+import paramak
+from paramak.specs import spec_hash
+from paramak.store import ResultStore, flatten_parameters
+
+
+def radial_build(blanket_thickness):
+    return [
+        (paramak.LayerType.GAP, 10),
+        (paramak.LayerType.SOLID, 50),
+        (paramak.LayerType.GAP, 50),
+        (paramak.LayerType.PLASMA, 300),
+        (paramak.LayerType.GAP, 60),
+        (paramak.LayerType.SOLID, blanket_thickness),
+    ]
+
+
+def test_flatten_parameters():
+    flat = flatten_parameters({"radial_build": radial_build(30), "rotation_angle": 90, "colors": {"plasma": [1, 0, 0]}})
+    assert flat["rotation_angle"] == 90
+    assert flat["radial_build.5.1"] == 30
+    assert flat["colors.plasma.0"] == 1
+
+
+def test_sweep_stores_results_and_skips_stored_designs(tmp_path):
+    cases = [{"radial_build": radial_build(thickness), "rotation_angle": 90} for thickness in (20, 40)]
+    cases.append({"radial_build": radial_build(20)[:2], "rotation_angle": 90})
+
+    with ResultStore(tmp_path / "designs.sqlite") as store:
+        records = paramak.sweep("spherical_tokamak_from_plasma", cases, tmp_path / "first.jsonl", store=store)
+        assert len(records) == 3
+
+    with ResultStore(tmp_path / "designs.sqlite") as store:
+        # a sweep with a new results file only builds designs not in the store
+        records = paramak.sweep(
+            "spherical_tokamak_from_plasma",
+            cases + [{"radial_build": radial_build(60), "rotation_angle": 90}],
+            tmp_path / "second.jsonl",
+            store=store,
+        )
+        assert [record["case"] for record in records] == [3]
+
+        design = store.get(spec_hash("spherical_tokamak_from_plasma", cases[0]))
+        assert design["status"] == "ok"
+        assert design["version"] == paramak.__version__
+        assert design["parts"]["plasma"]["volume"] > 0
+        assert len(design["parts"]["layer_2"]["bounding_box"]) == 6
+
+        thick = store.query({"radial_build.5.1": (30, None), "rotation_angle": 90})
+        assert sorted(design["params"]["radial_build"][5][1] for design in thick) == [40, 60]
+        assert len(store.query(status="failed")) == 1
+        assert store.query({"elongation": (0, 10)}) == []
@@ -0,0 +1,108 @@
+import importlib
+import os
+import time
+
+import paramak
+from paramak.sweep import read_results
+from paramak.specs import spec_hash
+
+
+def radial_build(blanket_thickness):
+    return [
+        (paramak.LayerType.GAP, 10),
+        (paramak.LayerType.SOLID, 50),
+        (paramak.LayerType.GAP, 50),
+        (paramak.LayerType.PLASMA, 300),
+        (paramak.LayerType.GAP, 60),
+        (paramak.LayerType.SOLID, blanket_thickness),
+    ]
+
+
+CASES = [
+    {"radial_build": radial_build(30), "rotation_angle": 90},
+    # a radial build without a plasma can not be built
+    {"radial_build": radial_build(30)[:3], "rotation_angle": 90},
+    {"radial_build": radial_build(40), "rotation_angle": 90},
+]
+
+
+def test_sweep_records_failures_and_writes_outputs(tmp_path):
+    records = paramak.sweep(
+        paramak.spherical_tokamak_from_plasma,
+        CASES,
+        tmp_path / "results.jsonl",
+        output_directory=tmp_path / "outputs",
+        formats=("paramak",),
+    )
+
+    assert [record["status"] for record in records] == ["ok", "failed", "ok"]
+    assert records[1]["error"]
+    assert set(records[0]["volumes"]) == {"layer_1", "layer_2", "plasma"}
+    assert records[2]["volumes"]["layer_2"] > records[0]["volumes"]["layer_2"]
+    assert records[0]["params"]["radial_build"][0] == ["gap", 10]
+    loaded = paramak.assemblies.assembly.Assembly.load(records[0]["outputs"][0])
+    assert loaded.names() == ["layer_1", "layer_2", "plasma"]
+    assert read_results(tmp_path / "results.jsonl") == records
+
+
+def test_sweep_resumes_without_rebuilding_finished_cases(tmp_path):
+    results_file = tmp_path / "results.csv"
+    paramak.sweep("spherical_tokamak_from_plasma", CASES[:2], results_file)
+
+    records = paramak.sweep("spherical_tokamak_from_plasma", CASES, results_file, workers=2)
+
+    assert [record["case"] for record in records] == [2]
+    assert records[0]["spec_hash"] == spec_hash("spherical_tokamak_from_plasma", CASES[2])
+    stored = read_results(results_file)
+    assert [record["status"] for record in stored] == ["ok", "failed", "ok"]
+    assert stored[0]["volumes"]["plasma"] > 0
+
+    retried = paramak.sweep("spherical_tokamak_from_plasma", CASES, results_file, retry_failed=True)
+    assert [record["case"] for record in retried] == [1]
+
+
+def test_truncated_last_record_is_skipped_and_replaced(tmp_path):
+    for name in ["results.jsonl", "results.csv"]:
+        results_file = tmp_path / name
+        paramak.sweep("spherical_tokamak_from_plasma", CASES[:2], results_file)
+        content = results_file.read_bytes()
+        # a sweep killed while writing the second record
+        results_file.write_bytes(content[: len(content) - 20])
+
+        assert [record["case"] for record in read_results(results_file)] == [0]
+        records = paramak.sweep("spherical_tokamak_from_plasma", CASES[:2], results_file)
+        assert [record["case"] for record in records] == [1]
+        assert [record["status"] for record in read_results(results_file)] == ["ok", "failed"]
+
+
+def crash_on_second_case(builder, params, filenames, timeout):
+    time.sleep(0.2)
+    if params["case"] == 1:
+        os._exit(1)
+    return {"status": "ok", "time": 0.2}
+
+
+def test_only_the_case_killing_its_worker_is_recorded_as_crashed(monkeypatch):
+    # paramak.sweep is the sweep function, the module is looked up by name
+    sweep_module = importlib.import_module("paramak.sweep")
+    monkeypatch.setattr(sweep_module, "run_case", crash_on_second_case)
+    jobs = [(case, "tokamak", {"case": case}, []) for case in range(5)]
+
+    results = dict(sweep_module.run_cases(jobs, workers=2))
+
+    assert sorted(results) == list(range(5))
+    assert results.pop(1)["status"] == "crashed"
+    assert all(result["status"] == "ok" for result in results.values())
+
+
+def test_jobs_queued_for_a_worker_are_not_taken_as_started(monkeypatch):
+    sweep_module = importlib.import_module("paramak.sweep")
+    monkeypatch.setattr(sweep_module, "run_case", crash_on_second_case)
+    jobs = [(case, "tokamak", {"case": case}, []) for case in range(1, 4)]
+
+    lost = []
+    results = list(sweep_module._run_pool(jobs, 1, None, lost))
+
+    # the executor queues the next job before the first one crashes
+    assert results == []
+    assert [(key, started) for (key, *_), _, started in lost] == [(1, True), (2, False), (3, False)]
@@ -1,10 +1,16 @@
+import pickle
+
 import pytest
 
 from paramak.utils import (
+    RadialBuild,
     ValidationError,
     get_gap_after_plasma,
+    get_plasma_index,
     get_plasma_value,
     sum_after_gap_following_plasma,
+    sum_before_after_plasma,
+    sum_up_to_gap_before_plasma,
     sum_up_to_plasma,
     validate_divertor_radial_build,
     validate_plasma_radial_build,
@@ -1054,3 +1060,74 @@ def test_sum_after_gap_following_plasma_not_found():
     ]
     with pytest.raises(ValueError, match="LayerType.PLASMA entry not found"):
         sum_after_gap_following_plasma(radial_build)
+
+
+RADIAL_BUILDS = [
+    [(LayerType.GAP, 10), (LayerType.SOLID, 50), (LayerType.GAP, 5), (LayerType.PLASMA, 50), (LayerType.GAP, 60)],
+    [(LayerType.PLASMA, 50), (LayerType.GAP, 10), (LayerType.SOLID, 2), (LayerType.GAP, 4), (LayerType.SOLID, 3)],
+    [(LayerType.SOLID, 10), (LayerType.PLASMA, 40), (LayerType.SOLID, 60), (LayerType.GAP, 2), (LayerType.SOLID, 8)],
+    [(LayerType.GAP, 10), (LayerType.SOLID, 50, "center_column"), (LayerType.SOLID, 5)],
+    [],
+]
+
+
+@pytest.mark.parametrize("radial_build", RADIAL_BUILDS)
+@pytest.mark.parametrize(
+    "helper",
+    [
+        sum_up_to_gap_before_plasma,
+        sum_up_to_plasma,
+        sum_before_after_plasma,
+        get_plasma_value,
+        get_plasma_index,
+        get_gap_after_plasma,
+        sum_after_gap_following_plasma,
+    ],
+)
+def test_radial_build_helpers_match_lists(radial_build, helper):
+    try:
+        expected = helper(radial_build)
+    except ValueError as error:
+        with pytest.raises(ValueError, match=str(error)):
+            helper(RadialBuild(radial_build))
+    else:
+        assert helper(RadialBuild(radial_build)) == expected
+
+
+def test_radial_build_sequence():
+    radial_build = RadialBuild([("gap", 10), ("solid", 50, "center_column"), ("plasma", 50)])
+    assert list(radial_build) == [
+        (LayerType.GAP, 10),
+        (LayerType.SOLID, 50, "center_column"),
+        (LayerType.PLASMA, 50),
+    ]
+    assert radial_build.plasma_index == 2
+    assert radial_build.cumulative.tolist() == [0, 10, 60, 110]
+    assert radial_build.total == 110
+    assert radial_build.names == (None, "center_column", None)
+    assert isinstance(radial_build[:2], RadialBuild)
+    assert pickle.loads(pickle.dumps(radial_build)) == radial_build
+
+
+@pytest.mark.parametrize(
+    "layer",
+    [(LayerType.GAP, "10"), ("gaps", 10), (LayerType.GAP,), (LayerType.GAP, 10, 1), (LayerType.GAP, None)],
+)
+def test_radial_build_checks_entry_types(layer):
+    with pytest.raises(ValidationError):
+        RadialBuild([layer, (LayerType.PLASMA, 50)])
+
+
+def test_radial_build_is_immutable():
+    radial_build = RadialBuild([(LayerType.GAP, 10), (LayerType.PLASMA, 50)])
+    with pytest.raises(ValueError):
+        radial_build.thicknesses[0] = 20
+    with pytest.raises(ValueError):
+        radial_build.cumulative[-1] = 0
+
+
+def test_radial_build_content_hash():
+    radial_build = RadialBuild([(LayerType.GAP, 10), (LayerType.PLASMA, 50)])
+    assert radial_build == RadialBuild([("gap", 10.0), ("plasma", 50)])
+    assert hash(radial_build) == hash(RadialBuild([("gap", 10.0), ("plasma", 50)]))
+    assert radial_build.content_hash != RadialBuild([(LayerType.GAP, 10), (LayerType.PLASMA, 51)]).content_hash
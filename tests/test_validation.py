@@ -0,0 +1,174 @@
+import random
+
+import numpy as np
+import pytest
+
+from paramak.assemblies.spherical_tokamak import spherical_tokamak_recipes
+from paramak.assemblies.tokamak import tokamak_recipes
+from paramak.utils import LayerType, ValidationError, validate_divertor_radial_build, validate_plasma_radial_build
+from paramak.validation import (
+    ERROR_MESSAGES,
+    BuildError,
+    stack_builds,
+    validate_divertor_radial_builds,
+    validate_radial_builds,
+    validate_vertical_builds,
+)
+
+GAP, SOLID, PLASMA = LayerType.GAP, LayerType.SOLID, LayerType.PLASMA
+
+PLASMA_BUILDS = [
+    [(GAP, 10), (SOLID, 50), (GAP, 5), (PLASMA, 50), (GAP, 60), (SOLID, 2)],
+    [(GAP, 10), (PLASMA, 50), (GAP, 60)],
+    [(SOLID, 10), (PLASMA, 50), (GAP, 60), (SOLID, 2)],
+    [(GAP, 10), (PLASMA, 50), (SOLID, 60)],
+    [(GAP, 10), (SOLID, 50), (GAP, 60)],
+    [(GAP, 10), (PLASMA, 50), (GAP, 60), (PLASMA, 50), (GAP, 60)],
+    [(PLASMA, 50), (GAP, 60), (SOLID, 2)],
+    [(GAP, 10), (SOLID, 50), (GAP, 5), (PLASMA, 50)],
+    [(GAP, 10), (SOLID, 0), (GAP, 5), (PLASMA, 50), (GAP, 60)],
+    [(GAP, 10), (SOLID, -3), (GAP, 5), (PLASMA, 50), (GAP, 60), (PLASMA, 5)],
+    [(GAP, 10), (SOLID, "50"), (GAP, 5), (PLASMA, 50), (GAP, 60)],
+    [(GAP, 10), ("lower_divertor", 50), (GAP, 5), (PLASMA, 50), (GAP, 60)],
+    [],
+    # layer types given as strings, which the single build validator rejects
+    [("gap", 10), ("solid", 50), ("gap", 5), ("plasma", 50), ("gap", 60)],
+    [(GAP, 10), (SOLID, 50), (GAP, 5), (PLASMA, 50), ("gap", 60)],
+    [(GAP, 10), (None, 50), (GAP, 5), (PLASMA, 50), (GAP, 60)],
+    # an entry without a thickness
+    [(GAP, 10), (SOLID,), (GAP, 5), (PLASMA, 50), (GAP, 60)],
+]
+
+
+def scalar_error(validator, build):
+    try:
+        validator(build)
+    except ValidationError as error:
+        return str(error)
+    except IndexError:
+        # the single build validator fails on entries without a thickness,
+        # which the batch validators report as INVALID_THICKNESS
+        return ERROR_MESSAGES[BuildError.INVALID_THICKNESS]
+    return None
+
+
+def test_validate_radial_builds_matches_single_build_validator():
+    valid, codes = validate_radial_builds(*stack_builds(PLASMA_BUILDS))
+
+    for build, ok, code in zip(PLASMA_BUILDS, valid, codes):
+        error = scalar_error(validate_plasma_radial_build, build)
+        assert ok == (error is None)
+        assert (code == BuildError.OK) == ok
+        assert ERROR_MESSAGES[code] in (error or "")
+
+
+def test_validate_radial_builds_checks_names():
+    builds = [
+        [(GAP, 10), (SOLID, 5, "shield"), (GAP, 5), (PLASMA, 50), (GAP, 60), (SOLID, 2, "blanket")],
+        [(GAP, 10), (SOLID, 5, "shield"), (SOLID, 5), (GAP, 5), (PLASMA, 50), (GAP, 60), (SOLID, 2, "shield")],
+        # tokamak names the outer blanket layer after the gap as far before the plasma
+        [(GAP, 10, "blanket"), (SOLID, 5), (GAP, 5), (PLASMA, 50), (GAP, 5), (SOLID, 2, "blanket"), (SOLID, 2)],
+        # spherical_tokamak names the third solid layer layer_3 by default
+        [(GAP, 10), (SOLID, 5, "layer_3"), (SOLID, 5), (GAP, 5), (PLASMA, 50), (GAP, 5), (SOLID, 2)],
+        [(GAP, 10), (SOLID, 5, "plasma"), (GAP, 5), (PLASMA, 50), (GAP, 60), (SOLID, 2)],
+    ]
+    kinds, thicknesses, names = stack_builds(builds)
+
+    valid, codes = validate_radial_builds(kinds, thicknesses, names)
+    assert valid.tolist() == [True, False, False, True, False]
+    assert codes[2] == BuildError.DUPLICATE_NAMES
+
+    valid, codes = validate_radial_builds(kinds, thicknesses, names, builder="spherical_tokamak")
+    assert valid.tolist() == [True, False, True, False, False]
+    assert codes[3] == BuildError.DUPLICATE_NAMES
+
+
+def random_named_build(generator):
+    """Returns a valid radial build with some of its layers named."""
+
+    def layers(count):
+        kinds = [generator.choice([GAP, SOLID]) for _ in range(count)]
+        return [
+            (kind, 10) if generator.random() < 0.5 else (kind, 10, generator.choice(["shield", "layer_1", "layer_2"]))
+            for kind in kinds
+        ]
+
+    return layers(generator.randrange(4)) + [(GAP, 5), (PLASMA, 50), (GAP, 5)] + layers(generator.randrange(4))
+
+
+@pytest.mark.parametrize(
+    "recipes, builder",
+    [(tokamak_recipes, "tokamak"), (spherical_tokamak_recipes, "spherical_tokamak")],
+)
+def test_validate_radial_builds_names_layers_as_the_builder(recipes, builder):
+    generator = random.Random(0)
+    builds = [random_named_build(generator) for _ in range(200)]
+    vertical_build = [(SOLID, 10)] * 8 + [(GAP, 5), (PLASMA, 50), (GAP, 5)] + [(SOLID, 10)] * 8
+
+    valid, codes = validate_radial_builds(*stack_builds(builds), builder=builder)
+
+    for build, ok, code in zip(builds, valid, codes):
+        try:
+            recipes(build, vertical_build, 0.55, 90, [], [], {})
+        except ValueError:
+            assert code == BuildError.DUPLICATE_NAMES
+        else:
+            assert ok
+    assert not valid.all()
+
+
+def test_validate_vertical_builds_rejects_names():
+    builds = [
+        [(SOLID, 10), (GAP, 5), (PLASMA, 50), (GAP, 60), (SOLID, 2)],
+        [(SOLID, 10, "floor"), (GAP, 5), (PLASMA, 50), (GAP, 60), (SOLID, 2)],
+    ]
+    valid, codes = validate_vertical_builds(*stack_builds(builds))
+
+    assert valid.tolist() == [True, False]
+    assert codes[1] == BuildError.NAMED_VERTICAL_LAYER
+
+
+def test_validate_divertor_radial_builds_matches_single_build_validator():
+    builds = [
+        [(GAP, 10), ("lower_divertor", 20)],
+        [(GAP, 10), ("upper_divertor", 20)],
+        [(GAP, 10)],
+        [(GAP, 10), ("lower_divertor", 20), (SOLID, 5)],
+        [(GAP, 10, "gap"), ("lower_divertor", 20)],
+        [(GAP, 10), ("divertor", 20)],
+        [(SOLID, 10), ("lower_divertor", 20)],
+        [(GAP, 10), ("lower_divertor", "20")],
+        [(GAP, 0), ("lower_divertor", 20)],
+    ]
+    valid, codes = validate_divertor_radial_builds(*stack_builds(builds))
+
+    expected = [scalar_error(validate_divertor_radial_build, build) is None for build in builds]
+    assert valid.tolist() == expected
+    assert codes.tolist() == [
+        BuildError.OK,
+        BuildError.OK,
+        BuildError.DIVERTOR_LENGTH,
+        BuildError.DIVERTOR_LENGTH,
+        BuildError.DIVERTOR_NAMED,
+        BuildError.DIVERTOR_TYPE,
+        BuildError.DIVERTOR_NOT_AFTER_GAP,
+        BuildError.INVALID_THICKNESS,
+        BuildError.NON_POSITIVE_THICKNESS,
+    ]
+
+
+def test_validate_radial_builds_with_generated_arrays():
+    # a sweep of blanket thicknesses given directly as arrays
+    thicknesses = np.tile([10.0, 50.0, 5.0, 300.0, 60.0, 0.0], (1000, 1))
+    thicknesses[:, 5] = np.linspace(-10, 100, 1000)
+    kinds = np.tile(["gap", "solid", "gap", "plasma", "gap", "solid"], (1000, 1))
+
+    valid, codes = validate_radial_builds(kinds, thicknesses)
+
+    assert valid.tolist() == (thicknesses[:, 5] > 0).tolist()
+    assert set(codes[~valid].tolist()) == {BuildError.NON_POSITIVE_THICKNESS}
+
+
+def test_validate_radial_builds_checks_shapes():
+    with pytest.raises(ValueError, match="2D arrays of the same shape"):
+        validate_radial_builds([["gap", "plasma"]], [[10.0]])